@@ -0,0 +1,272 @@
+import os
+import json
+import shutil
+import hashlib
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# the cache is shared by every checkout of this repository and every project
+# on the machine. Set PROJECT_DEPENDENCIES_CACHE to use a different
+# directory, or to an empty string to turn the cache off
+cacheDirVariable = "PROJECT_DEPENDENCIES_CACHE"
+cacheSizeVariable = "PROJECT_DEPENDENCIES_CACHE_MB"
+
+defaultCacheSize = 10 * 1024
+
+
+def getCacheDir():
+    cacheDir = os.environ.get(cacheDirVariable)
+
+    if cacheDir is not None:
+        return cacheDir if cacheDir != "" else None
+
+    baseDir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(baseDir, "project-dependencies")
+
+
+def getMaxSize():
+    return int(os.environ.get(cacheSizeVariable, defaultCacheSize)) * 1024 * 1024
+
+
+def getURLKey(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def getBlobPath(cacheDir, sha256):
+    return os.path.join(cacheDir, "blobs", sha256)
+
+
+def getEntryPath(cacheDir, url):
+    return os.path.join(cacheDir, "urls", f"{getURLKey(url)}.json")
+
+
+def getMetadataPath(cacheDir, url):
+    return os.path.join(cacheDir, "metadata", f"{getURLKey(url)}.json")
+
+
+@contextlib.contextmanager
+def lockFile(path):
+    # held across processes, so several installs can share the cache
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def lockURL(url):
+    # only one process downloads a URL at a time. The others wait and then
+    # find it in the cache
+    cacheDir = getCacheDir()
+    locksDir = os.path.join(cacheDir, "locks") if cacheDir is not None else None
+
+    try:
+        if locksDir is not None:
+            os.makedirs(locksDir, exist_ok=True)
+    except OSError:
+        locksDir = None
+
+    # without a cache there is nothing to share
+    if locksDir is None:
+        yield
+        return
+
+    with lockFile(os.path.join(locksDir, f"{getURLKey(url)}.lock")):
+        yield
+
+
+def hashFile(path):
+    sha256 = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def writeJSON(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(data, file)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def copyFile(sourcePath, destinationPath):
+    # copied rather than linked, as some scripts write their results over
+    # the file they downloaded, which would change the cached file too.
+    # Copied to a separate file first, so nobody ever sees half a file
+    temporaryPath = f"{destinationPath}.tmp"
+
+    shutil.copyfile(sourcePath, temporaryPath)
+
+    os.replace(temporaryPath, destinationPath)
+
+
+def readJSON(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def getEntry(url):
+    cacheDir = getCacheDir()
+
+    if cacheDir is None:
+        return None
+
+    return readJSON(getEntryPath(cacheDir, url))
+
+
+def getMetadata(url):
+    # what the server last said about `url`: its ETag, Last-Modified and size,
+    # and the sha256 of the file that was downloaded with them, if any. Kept
+    # apart from the cached files, so it outlives them and is also known for
+    # files that were never downloaded
+    cacheDir = getCacheDir()
+
+    if cacheDir is None:
+        return None
+
+    return readJSON(getMetadataPath(cacheDir, url))
+
+
+def recordMetadata(url, metadata):
+    cacheDir = getCacheDir()
+
+    if cacheDir is None:
+        return
+
+    writeJSON(metadata, getMetadataPath(cacheDir, url))
+
+
+def getBlob(url, expectedDigest=None):
+    # returns the path and sha256 of the cached download of `url`, or None if
+    # it is not cached. Files are stored under their sha256 once it has been
+    # checked, so they are trusted without hashing them again
+    entry = getEntry(url)
+
+    if entry is None:
+        return None
+
+    if expectedDigest is not None and entry["sha256"] != expectedDigest:
+        return None
+
+    blobPath = getBlobPath(getCacheDir(), entry["sha256"])
+
+    try:
+        # the modification time is when the file was last used, so the least
+        # recently used files are removed first
+        os.utime(blobPath)
+    except OSError:
+        return None
+
+    return blobPath, entry["sha256"]
+
+
+def fetch(url, outputPath, expectedDigest=None):
+    # copies a cached download of `url` to `outputPath` and returns its
+    # sha256, or None if it is not cached
+    blob = getBlob(url, expectedDigest)
+
+    if blob is None:
+        return None
+
+    blobPath, sha256 = blob
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(outputPath)), exist_ok=True)
+        copyFile(blobPath, outputPath)
+    except OSError:
+        return None
+
+    return sha256
+
+
+def store(url, path, sha256=None):
+    cacheDir = getCacheDir()
+
+    if cacheDir is None:
+        return
+
+    if sha256 is None:
+        sha256 = hashFile(path)
+
+    with lockFile(os.path.join(cacheDir, "cache.lock")):
+        blobPath = getBlobPath(cacheDir, sha256)
+
+        if not os.path.exists(blobPath):
+            os.makedirs(os.path.dirname(blobPath), exist_ok=True)
+            copyFile(path, blobPath)
+        else:
+            os.utime(blobPath)
+
+        writeJSON({"url": url, "sha256": sha256, "size": os.path.getsize(blobPath)}, getEntryPath(cacheDir, url))
+
+        evict(cacheDir, getMaxSize())
+
+
+def evict(cacheDir, maxSize):
+    # removes the least recently used files until the cache fits
+    blobsDir = os.path.join(cacheDir, "blobs")
+
+    blobs = []
+
+    for name in os.listdir(blobsDir):
+        stat = os.stat(os.path.join(blobsDir, name))
+        blobs.append((stat.st_mtime, stat.st_size, name))
+
+    totalSize = sum(size for mtime, size, name in blobs)
+
+    if totalSize <= maxSize:
+        return
+
+    removed = set()
+
+    for mtime, size, name in sorted(blobs):
+        if totalSize <= maxSize:
+            break
+
+        os.remove(os.path.join(blobsDir, name))
+        removed.add(name)
+        totalSize -= size
+
+    # entries for removed files would never be found again
+    urlsDir = os.path.join(cacheDir, "urls")
+
+    for name in os.listdir(urlsDir):
+        entryPath = os.path.join(urlsDir, name)
+
+        try:
+            with open(entryPath) as entryFile:
+                if json.load(entryFile)["sha256"] in removed:
+                    os.remove(entryPath)
+        except (OSError, ValueError, KeyError):
+            continue
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+import http.client
+import urllib.parse
+
+import artifactcache
+import downloader
+
+# a mirror lists every file it holds in index.json, as
+# `{"files": ["<Lib>_<version>/<version>_<Platform>.zip", ...]}`. GitHub
+# releases are listed through GitHub's API instead
+indexName = "index.json"
+gitHubAPIURL = "https://api.github.com/repos/"
+gitHubPageSize = 100
+
+# indexes are used for this long, in seconds, both by this process and by
+# other runs through the cache, so newly published files are soon noticed
+# however long the process runs for
+maxAge = 10 * 60
+
+# where files are published to when its index was fetched and the set of
+# files published there, or None if the index could not be fetched
+indexes = {}
+indexesLock = threading.Lock()
+
+
+def getGitHubRepository(source):
+    # `https://github.com/<owner>/<repo>/releases/download/` to
+    # `<owner>/<repo>`, or None if `source` is not a GitHub release
+    parts = urllib.parse.urlsplit(source)
+
+    if parts.netloc != "github.com":
+        return None
+
+    segments = parts.path.strip("/").split("/")
+
+    if len(segments) < 2:
+        return None
+
+    return f"{segments[0]}/{segments[1]}"
+
+
+def fetchJSON(url, headers=None):
+    finalURL, key, connection, response = downloader.openURL(url, headers=headers)
+
+    try:
+        body = response.read()
+    except (http.client.HTTPException, OSError):
+        connection.close()
+        raise
+
+    downloader.finishResponse(key, connection, response)
+
+    return json.loads(body)
+
+
+def fetchGitHubIndex(repository):
+    headers = {"Accept": "application/vnd.github+json"}
+
+    # without a token, GitHub only allows 60 requests an hour
+    token = os.environ.get("GITHUB_TOKEN")
+
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    files = []
+    page = 1
+
+    while True:
+        releases = fetchJSON(f"{gitHubAPIURL}{repository}/releases?per_page={gitHubPageSize}&page={page}", headers)
+
+        for release in releases:
+            for asset in release.get("assets", []):
+                files.append(f"{release['tag_name']}/{asset['name']}")
+
+        if len(releases) < gitHubPageSize:
+            return files
+
+        page += 1
+
+
+def fetchIndex(source):
+    repository = getGitHubRepository(source)
+
+    if repository is not None:
+        return fetchGitHubIndex(repository)
+
+    return fetchJSON(f"{source}{indexName}")["files"]
+
+
+def getCachedIndexPath(source):
+    cacheDir = artifactcache.getCacheDir()
+
+    if cacheDir is None:
+        return None
+
+    return os.path.join(cacheDir, "indexes", f"{artifactcache.getURLKey(source)}.json")
+
+
+def isExpired(fetched):
+    return time.time() - fetched > maxAge
+
+
+def loadCachedIndex(source):
+    # returns when the index was fetched and its files, or None
+    cachedPath = getCachedIndexPath(source)
+
+    if cachedPath is None:
+        return None
+
+    cached = artifactcache.readJSON(cachedPath)
+
+    if cached is None or cached.get("files") is None or isExpired(cached.get("fetched", 0)):
+        return None
+
+    return cached["fetched"], cached["files"]
+
+
+def saveCachedIndex(source, files):
+    cachedPath = getCachedIndexPath(source)
+
+    if cachedPath is None:
+        return
+
+    try:
+        artifactcache.writeJSON({"source": source, "fetched": time.time(), "files": files}, cachedPath)
+    except OSError as error:
+        print(f"Failed to cache the index of `{source}`: {error}")
+
+
+def getIndex(source, fetch=True):
+    # without `fetch`, only an index already fetched is used, so nothing
+    # waits on the network. Held while fetching, so each index is only
+    # fetched once however many downloads ask for it at the same time
+    with indexesLock:
+        if source in indexes and not isExpired(indexes[source][0]):
+            return indexes[source][1]
+
+        loaded = loadCachedIndex(source)
+
+        if loaded is not None:
+            fetched, files = loaded
+        elif not fetch:
+            return None
+        else:
+            fetched, files = time.time(), None
+
+            try:
+                files = fetchIndex(source)
+                saveCachedIndex(source, files)
+            except (downloader.DownloadError, http.client.HTTPException, OSError, ValueError, KeyError, TypeError) as error:
+                print(f"Failed to fetch the index of `{source}`: {error}")
+
+        indexes[source] = (fetched, set(files) if files is not None else None)
+
+        return indexes[source][1]
+
+
+def isPublished(source, releasePath, fetch=True):
+    # whether `releasePath` has been published to `source`, or None if that
+    # is not known
+    index = getIndex(source, fetch)
+
+    if index is None:
+        return None
+
+    return releasePath in index
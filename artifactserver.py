@@ -0,0 +1,315 @@
+import os
+import io
+import json
+import argparse
+import email.utils
+import http.server
+import functools
+import urllib.parse
+
+
+# release tags to the directory of the library that builds them
+releaseLibraries = {
+    "SDL": "sdl",
+    "SDL_image": "sdl_image",
+    "SDL_net": "sdl_net",
+    "SDL_ttf": "sdl_ttf",
+    "SDL_mixer": "sdl_mixer",
+    "catch2": "catch2",
+    "glew": "glew",
+    "libSodium": "libsodium",
+    "sqlite3": "sqlite3",
+    "v8": "v8",
+}
+
+rootDir = os.path.dirname(os.path.abspath(__file__))
+
+
+def configureArguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--directory", action="store", default=os.getcwd(), help="directory of artifacts to serve")
+    parser.add_argument("-l", "--libraries", action="store_true", default=False, help="serve the pre-built binaries in this repository's library directories, laid out the same as its releases, so it can be used as a mirror")
+    parser.add_argument("-p", "--port", action="store", type=int, default=8000, help="port to listen on")
+    parser.add_argument("-b", "--bind", action="store", default="127.0.0.1", help="address to listen on")
+    args = parser.parse_args()
+
+    return args
+
+
+def getLibraryPath(directory, releasePath):
+    # where a library's build.py saves `<Lib>_<version>/<file>`, or None if
+    # it is not a pre-built binary
+    parts = releasePath.strip("/").split("/")
+
+    if len(parts) != 2:
+        return None
+
+    tag, fileName = parts
+    releaseName, separator, version = tag.rpartition("_")
+    libraryName = releaseLibraries.get(releaseName)
+
+    if libraryName is None or not fileName.endswith(".zip"):
+        return None
+
+    libDir = os.path.join(directory, libraryName, "lib")
+
+    # the same on every platform
+    if fileName == f"{version}.zip":
+        return os.path.join(libDir, fileName)
+
+    # v8 names its zips after the version alone
+    prefix = f"v8_{version}_" if libraryName == "v8" else f"{version}_"
+
+    if not fileName.startswith(prefix):
+        return None
+
+    platformName = fileName[len(prefix):-len(".zip")]
+    localName = f"v8_{version}.zip" if libraryName == "v8" else fileName
+
+    return os.path.join(libDir, platformName, localName)
+
+
+def getLibraryFiles(directory):
+    # the release paths of every pre-built binary in the library directories
+    files = []
+
+    for releaseName, libraryName in releaseLibraries.items():
+        libDir = os.path.join(directory, libraryName, "lib")
+
+        if not os.path.isdir(libDir):
+            continue
+
+        for name in os.listdir(libDir):
+            path = os.path.join(libDir, name)
+
+            # the same on every platform
+            if os.path.isfile(path) and name.endswith(".zip"):
+                version = name[:-len(".zip")]
+                files.append(f"{releaseName}_{version}/{name}")
+                continue
+
+            if not os.path.isdir(path):
+                continue
+
+            platformName = name
+
+            for fileName in os.listdir(path):
+                if libraryName == "v8" and fileName.startswith("v8_") and fileName.endswith(".zip"):
+                    version = fileName[len("v8_"):-len(".zip")]
+                    files.append(f"v8_{version}/v8_{version}_{platformName}.zip")
+                elif fileName.endswith(f"_{platformName}.zip"):
+                    version = fileName[:-len(f"_{platformName}.zip")]
+                    files.append(f"{releaseName}_{version}/{fileName}")
+
+    return files
+
+
+def getDirectoryFiles(directory):
+    # every `<tag>/<file>` in `directory`
+    files = []
+
+    for tag in os.listdir(directory):
+        tagDir = os.path.join(directory, tag)
+
+        if os.path.isdir(tagDir):
+            files += [f"{tag}/{name}" for name in os.listdir(tagDir) if os.path.isfile(os.path.join(tagDir, name))]
+
+    return files
+
+
+def getETag(stat):
+    return f"\"{stat.st_size:x}-{stat.st_mtime_ns:x}\""
+
+
+def isNotModified(headers, etag, stat):
+    # the client already has this version of the file. An If-None-Match wins
+    # over an If-Modified-Since, as an ETag is exact
+    ifNoneMatch = headers.get("If-None-Match")
+
+    if ifNoneMatch is not None:
+        return ifNoneMatch.strip() == "*" or etag in [t.strip() for t in ifNoneMatch.split(",")]
+
+    ifModifiedSince = headers.get("If-Modified-Since")
+
+    if ifModifiedSince is None:
+        return False
+
+    try:
+        since = email.utils.parsedate_to_datetime(ifModifiedSince)
+    except (TypeError, ValueError):
+        return False
+
+    return int(stat.st_mtime) <= since.timestamp()
+
+
+def parseRange(rangeHeader, size):
+    # only a single range of `bytes=<start>-<end>`, `bytes=<start>-` or
+    # `bytes=-<suffix length>` is supported, which is all downloader.py asks
+    # for. Returns the first and last byte, or None if the range is invalid
+    if not rangeHeader.startswith("bytes=") or "," in rangeHeader:
+        return None
+
+    start, separator, end = rangeHeader[len("bytes="):].partition("-")
+
+    try:
+        if start == "":
+            start = max(0, size - int(end))
+            end = size - 1
+        else:
+            start = int(start)
+            end = min(int(end), size - 1) if end != "" else size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        return None
+
+    return (start, end)
+
+
+class ArtifactRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # keeps connections open between requests, as a real mirror would
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, libraries=False, **kwargs):
+        self.libraries = libraries
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+        if not self.libraries:
+            return super().translate_path(path)
+
+        releasePath = urllib.parse.unquote(urllib.parse.urlsplit(path).path)
+        libraryPath = getLibraryPath(self.directory, releasePath)
+
+        # anything else is not found
+        return libraryPath or os.path.join(self.directory, "__not_a_release")
+
+    def handle(self):
+        # clients hang up on a response they do not want, such as a whole
+        # file sent when they only wanted to know whether it had changed
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass
+
+    def send_head(self):
+        self.remaining = None
+
+        path = self.translate_path(self.path)
+
+        # the index artifactindex.py reads, unless one is being served
+        if urllib.parse.urlsplit(self.path).path == "/index.json" and not os.path.isfile(path):
+            return self.sendIndex()
+
+        # directory listings and missing files are handled as before
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        file = open(path, "rb")
+        stat = os.fstat(file.fileno())
+        size = stat.st_size
+        etag = getETag(stat)
+
+        if isNotModified(self.headers, etag, stat):
+            file.close()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+            self.end_headers()
+            return None
+
+        start = 0
+        end = size - 1
+        status = 200
+
+        rangeHeader = self.headers.get("Range")
+        ifRange = self.headers.get("If-Range")
+
+        # a range is only honored if the file has not changed since the
+        # client last saw it
+        if rangeHeader is not None and (ifRange is None or ifRange == etag):
+            byteRange = parseRange(rangeHeader, size)
+
+            if byteRange is None:
+                file.close()
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+            start, end = byteRange
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+
+        self.end_headers()
+
+        file.seek(start)
+        self.remaining = end - start + 1
+
+        return file
+
+    def sendIndex(self):
+        files = getLibraryFiles(self.directory) if self.libraries else getDirectoryFiles(self.directory)
+        body = json.dumps({"files": sorted(files)}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        return io.BytesIO(body)
+
+    def copyfile(self, source, outputfile):
+        if self.remaining is None:
+            return super().copyfile(source, outputfile)
+
+        try:
+            while self.remaining > 0:
+                chunk = source.read(min(64 * 1024, self.remaining))
+
+                if not chunk:
+                    break
+
+                outputfile.write(chunk)
+                self.remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # clients hang up on a response they do not want, such as a
+            # whole file sent in place of a range
+            self.close_connection = True
+
+
+def createServer(directory, port=8000, bind="127.0.0.1", libraries=False):
+    # port 0 picks any free port, which is then in server.server_address
+    handler = functools.partial(ArtifactRequestHandler, directory=directory, libraries=libraries)
+
+    return http.server.ThreadingHTTPServer((bind, port), handler)
+
+
+if __name__ == "__main__":
+    args = configureArguments()
+
+    # libraries are always served from this repository
+    if args.libraries:
+        args.directory = rootDir
+
+    server = createServer(args.directory, args.port, args.bind, args.libraries)
+
+    print(f"Serving `{args.directory}` on http://{args.bind}:{server.server_address[1]}/...")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    server.server_close()
@@ -1,9 +1,17 @@
 import os
-import shutil
+import sys
 import platform
 import argparse
-import subprocess
-import zipfile
+
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import downloader
+
+defaultVersion = "17.0.1"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -23,21 +31,7 @@ def createDirectories(path):
         print(error)
 
 
-def removeDirectory(path):
-    print(f"Removing directory: {path}")
-
-    try:
-        shutil.rmtree(path)
-    except OSError as error:
-        print(error)
-
-
-def runCmd(cmd, cwd=None):
-    print(f"Running command: {cmd}")
-    subprocess.run(cmd, cwd=cwd)
-
-
-def install(path, version):
+def install(version, path, libraryDir):
     print("Starting install...")
 
     installDir = getFullInstallDir(path)
@@ -48,15 +42,12 @@ def install(path, version):
 
     osName = platform.system()
 
-    if version is None or len(version) <= 0:
-        version = "17.0.1"
-
     if osName == "Windows":
-        installForWindows(installDir, version)
+        installForWindows(installDir, version, libraryDir)
     elif osName == "Darwin":
-        installForDarwin(installDir, version)
+        installForDarwin(installDir, version, libraryDir)
     elif osName == "Linux":
-        installForLinux(installDir, version)
+        installForLinux(installDir, version, libraryDir)
     else:
         print("Unknown OS: " + osName)
 
@@ -82,100 +73,120 @@ def getFullInstallDir(path):
     return installDir
 
 
-def installForWindows(installDir, version):
-    print("Installing for Windows...")
+def getDownloadURL(version):
+    osName = platform.system()
+
+    if osName == "Windows":
+        return f"https://github.com/richardjhughes/project-dependencies/releases/download/LLVM_{version}/LLVM_{version}_Windows.zip"
+    elif osName == "Darwin":
+        return f"https://github.com/llvm/llvm-project/releases/download/llvmorg-{version}/clang+llvm-{version}-arm64-apple-darwin22.0.tar.xz"
+    elif osName == "Linux":
+        return f"https://github.com/llvm/llvm-project/releases/download/llvmorg-{version}/clang+llvm-{version}-x86_64-linux-gnu-ubuntu-20.04.tar.xz"
 
-    tempDir = os.path.join(os.getcwd(), "__temp")
+    return ""
 
-    createDirectories(tempDir)
 
-    cwd = os.getcwd()
-    os.chdir(tempDir)
+def extractArchive(installDir, version, stripComponents):
+    # extracted as it is downloaded, so the archive is never written to disk
+    # and read back
+    try:
+        digests.downloadAndExtract("clang", version, platform.system(), getDownloadURL(version), installDir, stripComponents)
+    except downloader.DownloadError as error:
+        print(error)
+        return False
 
-    filename = "clang.zip"
+    return True
 
-    # download clang
-    cmd = ["curl", "-L", f"https://github.com/richardjhughes/project-dependencies/releases/download/LLVM_{version}/LLVM_{version}_Windows.zip", "-o", filename]
-    runCmd(cmd)
 
-    # install
-    with zipfile.ZipFile(filename) as zip:
-        zip.extractall(installDir)
+def installForWindows(installDir, version, libraryDir):
+    print("Installing for Windows...")
 
-    os.chdir(cwd)
-    removeDirectory(tempDir)
+    if not extractArchive(installDir, version, 0):
+        print("Failed to download clang.")
+        return
 
     print("Installed for Windows.")
 
 
-def installForDarwin(installDir, version):
+def installForDarwin(installDir, version, libraryDir):
     print("Installing for Darwin...")
 
-    tempDir = os.path.join(os.getcwd(), "__temp")
+    if not extractArchive(installDir, version, 1):
+        print("Failed to download clang.")
+        return
+
+    print("Installed for Darwin.")
 
-    createDirectories(tempDir)
 
-    cwd = os.getcwd()
-    os.chdir(tempDir)
+def installForLinux(installDir, version, libraryDir):
+    print("Installing for Linux...")
 
-    filename = "clang.tar.xf"
+    if not extractArchive(installDir, version, 1):
+        print("Failed to download clang.")
+        return
 
-    # download clang
-    cmd = ["curl", "-L", f"https://github.com/llvm/llvm-project/releases/download/llvmorg-{version}/clang+llvm-{version}-arm64-apple-darwin22.0.tar.xz", "-o", filename]
-    runCmd(cmd)
+    print("Installed for Linux.")
 
-    # install
-    cmd = ["tar", "-C", f"{installDir}", "-xf", f"{filename}", "--strip-components", "1"]
-    runCmd(cmd)
 
-    os.chdir(cwd)
-    removeDirectory(tempDir)
+def isClangAlreadyInstalled(path):
+    clangPath = os.path.join(getFullInstallDir(path), "bin", "clang-cl.exe" if platform.system() == "Windows" else "clang")
 
-    print("Installed for Darwin.")
+    if os.path.exists(clangPath):
+        return True
+    else:
+        return False
 
 
-def installForLinux(installDir, version):
-    print("Installing for Linux...")
+def isInstalled(path, version=None):
+    return isClangAlreadyInstalled(path)
 
-    tempDir = os.path.join(os.getcwd(), "__temp")
 
-    createDirectories(tempDir)
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the files whose sha256 is checked, as (library, version, platform, url,
+    # path). The archive is extracted as it downloads rather than kept, so
+    # the path is only somewhere to put it
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-    cwd = os.getcwd()
-    os.chdir(tempDir)
+    url = getDownloadURL(version)
 
-    filename = "clang.tar.xf"
+    if url == "":
+        return []
 
-    # download clang
-    cmd = ["curl", "-L", f"https://github.com/llvm/llvm-project/releases/download/llvmorg-{version}/clang+llvm-{version}-x86_64-linux-gnu-ubuntu-20.04.tar.xz", "-o", filename]
-    runCmd(cmd)
+    return [("clang", version, platform.system(), url, os.path.join(libraryDir, "__temp", url.split("/")[-1]))]
 
-    # install
-    cmd = ["tar", "-C", f"{installDir}", "-xf", f"{filename}", "--strip-components", "1"]
-    runCmd(cmd)
 
-    os.chdir(cwd)
-    removeDirectory(tempDir)
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    # nothing is kept on disk besides the install itself
+    return []
 
-    print("Installed for Linux.")
 
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-def isClangAlreadyInstalled(path):
-    clangPath = os.path.join(getFullInstallDir(path), "bin", "clang-cl.exe" if platform.system() == "Windows" else "clang")
+    if isClangAlreadyInstalled(path) or getDownloadURL(version) == "":
+        return []
 
-    if os.path.exists(clangPath):
-        return True
-    else:
-        return False
+    # downloaded and extracted in one go
+    return [("extract", getDownloadURL(version), downloader.getKnownSize(getDownloadURL(version)))]
+
+
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing clang...")
 
+    if isClangAlreadyInstalled(path):
+        print("Clang already installed.")
+    else:
+        install(version, path, libraryDir)
 
-print("Installing clang...")
+    print("Installed clang.")
 
-args = configureArguments()
 
-if isClangAlreadyInstalled(args.path):
-    print("Clang already installed.")
-else:
-    install(args.path, args.version)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed clang.")
+    run(args.path, args.version)
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import argparse
+import threading
+import socketserver
+import concurrent.futures
+
+import install_all
+import scheduler
+import downloader
+import daemonclient
+
+
+def configureArguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--socket", action="store", required=True, help="path to the daemon's socket")
+    parser.add_argument("--status", action="store_true", default=False, help="print what a running daemon is doing and exit")
+    parser.add_argument("--forget", action="store_true", default=False, help="make a running daemon forget what it has installed and exit")
+    parser.add_argument("-j", "--jobs", action="store", type=int, default=os.cpu_count(), help="maximum number of libraries to build at the same time")
+    parser.add_argument("--download-jobs", action="store", type=int, default=4, help="maximum number of libraries to download at the same time")
+    parser.add_argument("--extract-jobs", action="store", type=int, default=os.cpu_count(), help="maximum number of libraries to extract at the same time")
+    args = parser.parse_args()
+
+    return args
+
+
+def createState(stageLimits):
+    return {
+        "stageLimits": stageLimits,
+        # shared by every request, so requests running at the same time keep
+        # within the stage limits and the machine's cores and memory between
+        # them
+        "pool": scheduler.createPool(stageLimits),
+        "started": time.time(),
+        "lock": threading.Lock(),
+        # task names that finished without failing. Task names hold the
+        # library, version and stage, and the project for extract tasks, so
+        # a task is never run twice for the same thing
+        "finished": set(),
+        # task name to the future of the request running it
+        "running": {},
+        "requests": 0,
+    }
+
+
+def runShared(state, taskName, function, cores):
+    # a task already being run for another request is waited on instead of
+    # being run again, so concurrent requests for the same library only
+    # build it once
+    with state["lock"]:
+        if taskName in state["finished"]:
+            return
+
+        future = state["running"].get(taskName)
+        isOwner = future is None
+
+        if isOwner:
+            future = concurrent.futures.Future()
+            state["running"][taskName] = future
+
+    if not isOwner:
+        return future.result()
+
+    try:
+        function(cores)
+    except Exception as error:
+        future.set_exception(error)
+        raise
+    else:
+        with state["lock"]:
+            state["finished"].add(taskName)
+        future.set_result(None)
+    finally:
+        with state["lock"]:
+            state["running"].pop(taskName, None)
+
+
+def forgetRemoved(state, libraries):
+    # tasks whose files have since been removed are run again, as a library
+    # deleted from a project would otherwise not be installed again until the
+    # daemon was told to forget everything
+    stageFunctions = install_all.getStageFunctions()
+
+    removed = []
+
+    for name, versions in libraries.items():
+        if not install_all.isJournaled(name):
+            continue
+
+        for version, paths in versions.items():
+            versionName = install_all.getVersionName(name, version)
+
+            if not all(os.path.exists(p) for p in install_all.getLibraryArtifacts(name, version)):
+                removed += [f"{versionName}:{stage}" for stage in stageFunctions[name] if stage != "extract"]
+
+            for path in paths:
+                if not install_all.isLibraryInstalled(name, path, version):
+                    removed.append(f"{versionName}:extract ({path})")
+
+    with state["lock"]:
+        state["finished"].difference_update(removed)
+
+
+def install(state, paths):
+    projects = install_all.getProjects(paths)
+    libraries = install_all.getLibraryProjects(projects)
+
+    forgetRemoved(state, libraries)
+
+    tasks = {}
+
+    for name, (function, dependencies, stage, needs) in install_all.getInstallTasks(libraries).items():
+        tasks[name] = (lambda cores, name=name, function=function: runShared(state, name, function, cores), dependencies, stage, needs)
+
+    failed = scheduler.runTasks(tasks, state["stageLimits"], pool=state["pool"])
+
+    # only connections no other request is using are closed
+    downloader.closeIdleConnections()
+
+    return {"failed": failed}
+
+
+def plan(state, paths):
+    plans = []
+
+    for installPath, deps in install_all.getProjects(paths):
+        plans.append((installPath, install_all.getPlan(installPath, deps)))
+
+    return {"plans": plans}
+
+
+def status(state):
+    with state["lock"]:
+        return {
+            "uptime": time.time() - state["started"],
+            "requests": state["requests"],
+            "running": sorted(state["running"]),
+            "finished": sorted(state["finished"]),
+        }
+
+
+def handleRequest(state, request):
+    with state["lock"]:
+        state["requests"] += 1
+
+    action = request.get("action")
+
+    if action == "install":
+        return install(state, request["paths"])
+
+    if action == "plan":
+        return plan(state, request["paths"])
+
+    if action == "status":
+        return status(state)
+
+    # forgets everything installed, for when libraries or projects have been
+    # changed behind the daemon's back
+    if action == "forget":
+        with state["lock"]:
+            state["finished"].clear()
+        return {}
+
+    return {"error": f"Unknown action `{action}`."}
+
+
+def serve(socketPath, state):
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                response = handleRequest(state, json.loads(self.rfile.readline()))
+            except Exception as error:
+                response = {"error": str(error)}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    # a socket left behind by a daemon that did not shut down cleanly
+    if os.path.exists(socketPath):
+        os.remove(socketPath)
+
+    with socketserver.ThreadingUnixStreamServer(socketPath, RequestHandler) as server:
+        print(f"Listening on `{socketPath}`...")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socketPath)
+
+    print("Stopped.")
+
+
+def printStatus(socketPath):
+    response = daemonclient.sendRequest(socketPath, {"action": "status"})
+
+    print(f"Up for {response['uptime']:.0f}s, served {response['requests']} requests.")
+    print(f"Running {len(response['running'])} tasks:")
+
+    for name in response["running"]:
+        print(f"    {name}")
+
+    print(f"Finished {len(response['finished'])} tasks.")
+
+
+if __name__ == "__main__":
+    args = configureArguments()
+
+    if not daemonclient.isSupported():
+        print("The daemon is not supported on this platform.")
+        raise SystemExit(1)
+
+    if args.status:
+        printStatus(args.socket)
+        raise SystemExit
+
+    if args.forget:
+        daemonclient.sendRequest(args.socket, {"action": "forget"})
+        print("Forgotten.")
+        raise SystemExit
+
+    serve(args.socket, createState(install_all.getStageLimits(args)))
@@ -0,0 +1,24 @@
+import json
+import socket
+
+# what install_all.py needs to talk to a running daemon.py, kept apart from
+# the daemon itself, which imports install_all
+
+
+def isSupported():
+    return hasattr(socket, "AF_UNIX")
+
+
+def sendRequest(socketPath, request):
+    # each request and response is a single line of JSON
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socketPath)
+        connection.sendall(json.dumps(request).encode() + b"\n")
+
+        with connection.makefile("rb") as reader:
+            response = json.loads(reader.readline())
+
+    if "error" in response:
+        raise Exception(response["error"])
+
+    return response
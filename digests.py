@@ -0,0 +1,126 @@
+import os
+import json
+
+import artifactcache
+import mirrors
+import downloader
+
+# the sha256 of every pre-built binary, by library, version and platform.
+# This file is committed, and only written by `install_all.py
+# --record-digests`, so every machine checks downloads against the same
+# digests
+digestsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "digests.json")
+
+
+def getRecordedPath():
+    # binaries missing from digestsPath are trusted the first time they are
+    # downloaded on this machine, and recorded in the cache so they must
+    # match from then on. Returns None if the cache is turned off
+    cacheDir = artifactcache.getCacheDir()
+
+    if cacheDir is None:
+        return None
+
+    return os.path.join(cacheDir, "digests.json")
+
+
+def load(path):
+    try:
+        with open(path) as digestsFile:
+            return json.load(digestsFile)
+    except (OSError, ValueError):
+        return {}
+
+
+def findDigest(digests, library, version, platformName):
+    return digests.get(library, {}).get(version, {}).get(platformName)
+
+
+def getDigest(library, version, platformName):
+    digest = findDigest(load(digestsPath), library, version, platformName)
+
+    recordedPath = getRecordedPath()
+
+    if digest is None and recordedPath is not None:
+        digest = findDigest(load(recordedPath), library, version, platformName)
+
+    return digest
+
+
+def recordDigest(library, version, platformName, digest, path):
+    # locked, as libraries are downloaded at the same time, and read again
+    # under the lock so no other download's digest is lost
+    with artifactcache.lockFile(f"{path}.lock"):
+        digests = load(path)
+
+        digests.setdefault(library, {}).setdefault(version, {})[platformName] = digest
+
+        save(digests, path)
+
+
+def save(digests, path):
+    with open(f"{path}.tmp", "w") as digestsFile:
+        json.dump(digests, digestsFile, indent=4, sort_keys=True)
+        digestsFile.write("\n")
+
+    os.replace(f"{path}.tmp", path)
+
+
+def recordDownloads(downloads):
+    # downloads each of `downloads`, given as (library, version, platform,
+    # url, path), and records its sha256 in digestsPath, to be committed. A
+    # download that does not match a sha256 already recorded, here or on
+    # this machine, is not recorded. Returns the URLs that failed
+    failed = []
+
+    # only written from here, one download at a time, so it needs no lock
+    digests = load(digestsPath)
+
+    for library, version, platformName, url, outputPath in downloads:
+        try:
+            digest = mirrors.download(url, outputPath, expectedDigest=getDigest(library, version, platformName))
+        except downloader.DownloadError as error:
+            print(f"Failed to record the sha256 of `{url}`: {error}")
+            failed.append(url)
+            continue
+
+        print(f"Recording sha256 {digest} for {library} {version} ({platformName}).")
+
+        digests.setdefault(library, {}).setdefault(version, {})[platformName] = digest
+        save(digests, digestsPath)
+
+    return failed
+
+
+def recordFirstUse(library, version, platformName, digest):
+    recordedPath = getRecordedPath()
+
+    print(f"No sha256 for {library} {version} ({platformName}) in `{digestsPath}`, trusting {digest}.")
+
+    if recordedPath is not None:
+        recordDigest(library, version, platformName, digest, recordedPath)
+
+
+def download(library, version, platformName, url, outputPath, onProgress=None):
+    # downloads from the fastest mirror. Raises downloader.DownloadError if
+    # the download does not match the recorded digest
+    expectedDigest = getDigest(library, version, platformName)
+
+    digest = mirrors.download(url, outputPath, expectedDigest=expectedDigest, onProgress=onProgress)
+
+    if expectedDigest is None:
+        recordFirstUse(library, version, platformName, digest)
+
+    return digest
+
+
+def downloadAndExtract(library, version, platformName, url, outputDir, stripComponents=0):
+    # the same as `download`, for archives extracted as they are downloaded
+    expectedDigest = getDigest(library, version, platformName)
+
+    digest = mirrors.downloadAndExtract(url, outputDir, stripComponents, expectedDigest=expectedDigest)
+
+    if expectedDigest is None:
+        recordFirstUse(library, version, platformName, digest)
+
+    return digest
@@ -0,0 +1,669 @@
+import os
+import ssl
+import json
+import hashlib
+import threading
+import http.client
+import urllib.parse
+import concurrent.futures
+
+import artifactcache
+
+# how long to wait for a server to accept a connection or send more data
+defaultTimeout = 60
+
+# how much of a download is held in memory before it is written out
+bufferSize = 1024 * 1024
+
+maxRedirects = 10
+
+# asking for only the size should not wait long on a server that is not
+# answering
+sizeTimeout = 5
+
+# large downloads are split into parts of at least this size, each fetched
+# over its own connection
+minPartSize = 8 * 1024 * 1024
+maxConnections = 4
+
+# how often, in seconds, the parts of a download that have arrived in order
+# are hashed while the rest are still downloading
+hashInterval = 1
+
+sslContext = ssl.create_default_context()
+
+# connections left open by finished requests, ready for the next request to
+# the same host, so each download does not pay for a new TLS handshake
+idleConnections = {}
+idleConnectionsLock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ResourceChangedError(DownloadError):
+    pass
+
+
+class HTTPStatusError(DownloadError):
+    # the server answered, but with an error such as 404 Not Found
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def getConnectionKey(url):
+    parts = urllib.parse.urlsplit(url)
+
+    if parts.scheme not in ["http", "https"]:
+        raise DownloadError(f"Unsupported URL: {url}")
+
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+
+    return (parts.scheme, parts.hostname, port)
+
+
+def createConnection(key, timeout):
+    scheme, host, port = key
+
+    if scheme == "https":
+        return http.client.HTTPSConnection(host, port, timeout=timeout, context=sslContext)
+
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def takeIdleConnection(key):
+    with idleConnectionsLock:
+        connections = idleConnections.get(key, [])
+
+        if len(connections) > 0:
+            return connections.pop()
+
+    return None
+
+
+def releaseConnection(key, connection):
+    with idleConnectionsLock:
+        idleConnections.setdefault(key, []).append(connection)
+
+
+def closeIdleConnections():
+    # called once the downloads are done, rather than leaving the sockets for
+    # the servers to time out, or for a long running daemon to pile up
+    with idleConnectionsLock:
+        for connections in idleConnections.values():
+            for connection in connections:
+                connection.close()
+
+        idleConnections.clear()
+
+
+def getPathAndQuery(url):
+    parts = urllib.parse.urlsplit(url)
+
+    path = parts.path or "/"
+
+    if parts.query:
+        path += f"?{parts.query}"
+
+    return path
+
+
+def sendRequest(method, url, headers, timeout):
+    key = getConnectionKey(url)
+    connection = takeIdleConnection(key)
+
+    if connection is not None:
+        # the socket is already open, so it no longer reads the connection's
+        # timeout
+        connection.timeout = timeout
+
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+        try:
+            connection.request(method, getPathAndQuery(url), headers=headers)
+            return key, connection, connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            # the server closed the connection while it was idle
+            connection.close()
+
+    connection = createConnection(key, timeout)
+
+    try:
+        connection.request(method, getPathAndQuery(url), headers=headers)
+        return key, connection, connection.getresponse()
+    except (http.client.HTTPException, OSError) as error:
+        connection.close()
+        raise DownloadError(f"Failed to request `{url}`: {error}")
+
+
+def finishResponse(key, connection, response):
+    # a connection can only be used again once its response has been read
+    # to the end
+    if response.isclosed() and not response.will_close:
+        releaseConnection(key, connection)
+    else:
+        connection.close()
+
+
+def openURL(url, headers=None, method="GET", timeout=defaultTimeout):
+    # follows redirects, as GitHub serves release assets from a different
+    # host. Returns the response along with what is needed to finish it
+    headers = dict(headers or {})
+    headers.setdefault("User-Agent", "project-dependencies")
+
+    for i in range(maxRedirects + 1):
+        key, connection, response = sendRequest(method, url, headers, timeout)
+
+        if response.status in [301, 302, 303, 307, 308]:
+            location = response.getheader("Location")
+            response.read()
+            finishResponse(key, connection, response)
+
+            if location is None:
+                raise DownloadError(f"Redirect without a location from `{url}`")
+
+            url = urllib.parse.urljoin(url, location)
+            continue
+
+        # the range asked for is past the end of the file, so the file is not
+        # the one that was partly downloaded
+        if response.status == 416:
+            response.read()
+            finishResponse(key, connection, response)
+            raise ResourceChangedError(f"`{url}` changed since it was partly downloaded")
+
+        # anything else that is not a success is a failure, rather than an
+        # error page saved in place of the file
+        if response.status >= 400:
+            response.read()
+            finishResponse(key, connection, response)
+            raise HTTPStatusError(f"Failed to download `{url}`: {response.status} {response.reason}", response.status)
+
+        return url, key, connection, response
+
+    raise DownloadError(f"Too many redirects for `{url}`")
+
+
+def copyResponse(response, outputFile, onProgress=None, sha256=None):
+    expectedSize = response.getheader("Content-Length")
+    size = 0
+
+    while True:
+        chunk = response.read(bufferSize)
+
+        if not chunk:
+            break
+
+        outputFile.write(chunk)
+        size += len(chunk)
+
+        # hashed as it arrives, so the file is never read back for it
+        if sha256 is not None:
+            sha256.update(chunk)
+
+        if onProgress is not None:
+            # progress is only recorded once the bytes have left this process
+            outputFile.flush()
+            onProgress(len(chunk))
+
+    # a connection dropped part way through looks the same as the end of the
+    # response, apart from the size
+    if expectedSize is not None and size != int(expectedSize):
+        raise DownloadError(f"Expected {expectedSize} bytes but received {size}")
+
+    return size
+
+
+def getStatePath(partialPath):
+    return f"{partialPath}.json"
+
+
+def loadState(partialPath, url):
+    # what is known about a partial download left by an earlier run: the URL
+    # it came from, what identifies that version of the file on the server,
+    # its size and how far each part got
+    if not os.path.exists(partialPath):
+        return None
+
+    try:
+        with open(getStatePath(partialPath)) as stateFile:
+            state = json.load(stateFile)
+    except (OSError, ValueError):
+        return None
+
+    if state.get("url") != url or state.get("validator") is None:
+        return None
+
+    return state
+
+
+def saveState(state, partialPath):
+    statePath = getStatePath(partialPath)
+
+    with open(f"{statePath}.tmp", "w") as stateFile:
+        json.dump(state, stateFile)
+
+    os.replace(f"{statePath}.tmp", statePath)
+
+
+def removePartial(partialPath):
+    for path in [partialPath, getStatePath(partialPath)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def getTotalSize(response):
+    # from `Content-Range: bytes <start>-<end>/<total>`
+    contentRange = response.getheader("Content-Range", "")
+
+    if not contentRange.startswith("bytes ") or contentRange.endswith("/*"):
+        return None
+
+    return int(contentRange.split("/")[1])
+
+
+def getRangeStart(response):
+    return int(response.getheader("Content-Range")[len("bytes "):].split("-")[0])
+
+
+def getParts(start, end, connections):
+    # splits the bytes from `start` up to `end` into evenly sized ranges
+    partCount = max(1, min(connections, (end - start) // minPartSize))
+    partSize = -(-(end - start) // partCount)
+
+    return [(s, min(s + partSize, end)) for s in range(start, end, partSize)]
+
+
+def getValidator(response):
+    # a download can only be carried on from a server that supports ranges
+    if response.status != 206 and response.getheader("Accept-Ranges") != "bytes":
+        return None
+
+    # a weak ETag cannot be used with If-Range, but the modification date can
+    etag = response.getheader("ETag")
+
+    if etag is not None and not etag.startswith("W/"):
+        return etag
+
+    return response.getheader("Last-Modified")
+
+
+def getResponseMetadata(response, size):
+    # what is needed to ask the server later whether the file has changed,
+    # without downloading it again
+    return {"etag": response.getheader("ETag"), "lastModified": response.getheader("Last-Modified"), "size": size}
+
+
+def getConditionalHeaders(metadata):
+    headers = {}
+
+    if metadata.get("etag") is not None:
+        headers["If-None-Match"] = metadata["etag"]
+
+    if metadata.get("lastModified") is not None:
+        headers["If-Modified-Since"] = metadata["lastModified"]
+
+    return headers
+
+
+def isUnchanged(url, sha256, timeout=defaultTimeout):
+    # asks the server whether the file downloaded from `url` with `sha256` is
+    # still the one it has. A 304 Not Modified answers without the file being
+    # sent again
+    metadata = artifactcache.getMetadata(url)
+
+    if metadata is None or metadata.get("sha256") != sha256:
+        return False
+
+    headers = getConditionalHeaders(metadata)
+
+    if len(headers) == 0:
+        return False
+
+    try:
+        finalURL, key, connection, response = openURL(url, headers=headers, timeout=timeout)
+    except (DownloadError, http.client.HTTPException, OSError) as error:
+        # without a connection, what was downloaded before is the best there is
+        print(f"Failed to check whether `{url}` has changed: {error}")
+        return True
+
+    if response.status == 304:
+        response.read()
+        finishResponse(key, connection, response)
+        return True
+
+    # the whole file is on its way, which is not wanted here
+    connection.close()
+
+    return False
+
+
+def getKnownSize(url):
+    # the size of `url` recorded by an earlier download or getDownloadSize,
+    # or None if there is none. Never asks the server, so it is cheap enough
+    # for planning
+    if url == "":
+        return None
+
+    metadata = artifactcache.getMetadata(url)
+
+    if metadata is not None and metadata.get("size") is not None:
+        return metadata["size"]
+
+    # downloaded from a mirror, which the metadata is recorded under
+    entry = artifactcache.getEntry(url)
+
+    if entry is not None:
+        return entry.get("size")
+
+    return None
+
+
+def getDownloadSize(url, timeout=sizeTimeout):
+    # the size of `url` without downloading it, or None if it is not known.
+    # The server is only asked the first time, and what it says is recorded
+    # for getKnownSize
+    size = getKnownSize(url)
+
+    if size is not None or url == "":
+        return size
+
+    try:
+        finalURL, key, connection, response = openURL(url, method="HEAD", timeout=timeout)
+
+        response.read()
+        finishResponse(key, connection, response)
+    except (DownloadError, http.client.HTTPException, OSError):
+        return None
+
+    contentLength = response.getheader("Content-Length")
+
+    metadata = getResponseMetadata(response, int(contentLength) if contentLength is not None else None)
+
+    try:
+        artifactcache.recordMetadata(url, metadata)
+    except OSError:
+        pass
+
+    return metadata["size"]
+
+
+def isPartFinished(part):
+    start, end, done = part
+
+    return end is not None and start + done >= end
+
+
+def recordProgress(state, stateLock, partialPath, part, onProgress=None):
+    # `onProgress` is also told the size of each chunk, from whichever thread
+    # downloaded it
+    def recordChunk(size):
+        with stateLock:
+            part[2] += size
+            saveState(state, partialPath)
+
+        if onProgress is not None:
+            onProgress(size)
+
+    return recordChunk
+
+
+def openPart(state, stateLock, headers, timeout):
+    # the URL redirected to may have stopped working since, as GitHub
+    # redirects to signed URLs that expire after a few minutes. The original
+    # URL is then asked again, following its redirects to wherever they lead
+    # now. `If-Range` still keeps the bytes already downloaded
+    with stateLock:
+        finalURL = state["finalURL"]
+
+    if finalURL != state["url"]:
+        try:
+            return openURL(finalURL, headers=headers, timeout=timeout)
+        except HTTPStatusError as error:
+            print(f"{error}, asking `{state['url']}` again...")
+
+    finalURL, key, connection, response = openURL(state["url"], headers=headers, timeout=timeout)
+
+    with stateLock:
+        state["finalURL"] = finalURL
+
+    return finalURL, key, connection, response
+
+
+def downloadPart(state, stateLock, partialPath, part, timeout, onProgress):
+    start, end, done = part
+
+    # if the file has changed since the download started, the server sends
+    # all of it instead of mixing parts of two different files
+    headers = {
+        "Range": f"bytes={start + done}-{end - 1 if end is not None else ''}",
+        "If-Range": state["validator"],
+    }
+
+    finalURL, key, connection, response = openPart(state, stateLock, headers, timeout)
+
+    try:
+        if response.status != 206 or getRangeStart(response) != start + done:
+            raise ResourceChangedError(f"`{state['url']}` changed since it was partly downloaded")
+
+        if state["size"] is not None and getTotalSize(response) != state["size"]:
+            raise ResourceChangedError(f"`{state['url']}` changed since it was partly downloaded")
+
+        # each part has its own handle, so parts can be written at their own
+        # positions at the same time
+        with open(partialPath, "r+b") as partialFile:
+            partialFile.seek(start + done)
+            copyResponse(response, partialFile, recordProgress(state, stateLock, partialPath, part, onProgress))
+    except (http.client.HTTPException, OSError, DownloadError):
+        connection.close()
+        raise
+
+    finishResponse(key, connection, response)
+
+
+def startDownload(url, partialPath, stateLock, timeout, connections, sha256, onProgress):
+    # the first request asks for the first part only. A server that supports
+    # ranges answers with that part and the total size, so the rest can be
+    # split between several connections. A server that does not sends the
+    # whole file, which is then downloaded as a single stream
+    headers = {"Range": f"bytes=0-{minPartSize - 1}"}
+
+    finalURL, key, connection, response = openURL(url, headers=headers, timeout=timeout)
+
+    try:
+        totalSize = getTotalSize(response) if response.status == 206 else None
+
+        if totalSize is not None:
+            parts = [[0, min(minPartSize, totalSize), 0]]
+            parts += [[start, end, 0] for start, end in getParts(minPartSize, totalSize, connections) if start < end]
+        else:
+            contentLength = response.getheader("Content-Length")
+            parts = [[0, int(contentLength) if contentLength is not None else None, 0]]
+
+        # the parts are requested from where the redirects ended, so each
+        # part does not follow them again
+        metadata = getResponseMetadata(response, totalSize if totalSize is not None else parts[0][1])
+
+        state = {"url": url, "finalURL": finalURL, "validator": getValidator(response), "size": totalSize, "parts": parts, "metadata": metadata}
+
+        with open(partialPath, "wb") as partialFile:
+            if totalSize is not None:
+                # reserve the whole file, so every part has a place to go
+                partialFile.truncate(totalSize)
+
+            saveState(state, partialPath)
+
+            copyResponse(response, partialFile, recordProgress(state, stateLock, partialPath, parts[0], onProgress), sha256)
+    except (http.client.HTTPException, OSError, DownloadError):
+        connection.close()
+        raise
+
+    finishResponse(key, connection, response)
+
+    # a single stream of unknown length is finished once it ends
+    parts[0][1] = parts[0][1] if parts[0][1] is not None else parts[0][2]
+
+    return state
+
+
+def hashPrefix(state, stateLock, partialPath, sha256, hashedSize):
+    # hashes what has arrived since `hashedSize` that follows straight on
+    # from it, so by the time the last part arrives little is left to hash.
+    # Parts that arrive out of order wait until the parts before them have
+    # arrived. Returns how much of the file has been hashed
+    with stateLock:
+        parts = sorted((start, start + done) for start, end, done in state["parts"])
+
+    prefixEnd = hashedSize
+
+    for start, arrivedEnd in parts:
+        if start <= prefixEnd < arrivedEnd:
+            prefixEnd = arrivedEnd
+
+    with open(partialPath, "rb") as partialFile:
+        partialFile.seek(hashedSize)
+
+        while hashedSize < prefixEnd:
+            chunk = partialFile.read(min(bufferSize, prefixEnd - hashedSize))
+
+            if not chunk:
+                break
+
+            sha256.update(chunk)
+            hashedSize += len(chunk)
+
+    return hashedSize
+
+
+def downloadToFile(url, partialPath, timeout, connections, onProgress, onArrived):
+    # returns the sha256 of the downloaded file, and what the server said
+    # about it. `onArrived` is told how much of the file has arrived in order
+    # from the start each time that grows
+    stateLock = threading.Lock()
+    sha256 = hashlib.sha256()
+    hashedSize = 0
+
+    state = loadState(partialPath, url)
+
+    if state is not None:
+        print(f"Resuming download of `{url}`...")
+
+        # where `url` redirected to last time is not trusted to still work
+        state["finalURL"] = url
+    else:
+        state = startDownload(url, partialPath, stateLock, timeout, connections, sha256, onProgress)
+
+        # the first part arrives in order from the start of the file
+        hashedSize = state["parts"][0][2]
+
+    remainingParts = [p for p in state["parts"] if not isPartFinished(p)]
+
+    if len(remainingParts) > 0:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(remainingParts)) as executor:
+            futures = [executor.submit(downloadPart, state, stateLock, partialPath, part, timeout, onProgress) for part in remainingParts]
+            pending = futures
+
+            while len(pending) > 0:
+                done, pending = concurrent.futures.wait(pending, timeout=hashInterval, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                if any(f.exception() is not None for f in done):
+                    break
+
+                hashedSize = hashPrefix(state, stateLock, partialPath, sha256, hashedSize)
+
+                if onArrived is not None:
+                    onArrived(hashedSize)
+
+            for future in futures:
+                future.result()
+
+    # the parts that arrived last, or all of a download an earlier run had
+    # finished
+    hashedSize = hashPrefix(state, stateLock, partialPath, sha256, hashedSize)
+
+    if onArrived is not None:
+        onArrived(hashedSize)
+
+    return sha256.hexdigest(), state.get("metadata")
+
+
+def fetchCached(url, cacheKey, outputPath, expectedDigest, timeout):
+    # a cached download without a sha256 to check it against may be out of
+    # date, so the server is asked whether it has changed first
+    if expectedDigest is None:
+        entry = artifactcache.getEntry(cacheKey)
+
+        if entry is not None and not isUnchanged(url, entry["sha256"], timeout):
+            return None
+
+    return artifactcache.fetch(cacheKey, outputPath, expectedDigest)
+
+
+def download(url, outputPath, timeout=defaultTimeout, connections=maxConnections, expectedDigest=None, cacheKey=None, onProgress=None, onArrived=None):
+    # downloads to a separate file first, so an interrupted download is never
+    # mistaken for a finished one. The partial file is kept if the download
+    # fails, and the next download of the same URL carries on from it.
+    # Returns the sha256 of the file, which must match `expectedDigest` if
+    # one is given. The file is cached under `cacheKey` if given, so copies
+    # of the same file on different mirrors share one cached copy.
+    # `onProgress` is called with the size of each chunk as it arrives, and
+    # `onArrived` with how much of `<outputPath>.part` can be read in order,
+    # or 0 if it has been thrown away. Neither is called for a cached file
+    cacheKey = cacheKey or url
+    outputDir = os.path.dirname(outputPath)
+    partialPath = f"{outputPath}.part"
+
+    if outputDir != "":
+        os.makedirs(outputDir, exist_ok=True)
+
+    digest = fetchCached(url, cacheKey, outputPath, expectedDigest, timeout)
+
+    if digest is not None:
+        print(f"Using cached download of `{url}`.")
+        return digest
+
+    with artifactcache.lockURL(cacheKey):
+        # another process may have downloaded it while this one waited
+        digest = fetchCached(url, cacheKey, outputPath, expectedDigest, timeout)
+
+        if digest is not None:
+            print(f"Using cached download of `{url}`.")
+            return digest
+
+        try:
+            try:
+                digest, metadata = downloadToFile(url, partialPath, timeout, connections, onProgress, onArrived)
+            except ResourceChangedError as error:
+                # only now is what was downloaded so far of no use
+                print(f"{error}, downloading it again...")
+                removePartial(partialPath)
+
+                if onArrived is not None:
+                    onArrived(0)
+
+                digest, metadata = downloadToFile(url, partialPath, timeout, connections, onProgress, onArrived)
+        except (http.client.HTTPException, OSError) as error:
+            raise DownloadError(f"Failed to download `{url}`: {error}")
+
+        if expectedDigest is not None and digest != expectedDigest:
+            removePartial(partialPath)
+            raise DownloadError(f"`{url}` is corrupt or has changed: expected sha256 {expectedDigest} but downloaded {digest}")
+
+        os.replace(partialPath, outputPath)
+
+        if os.path.exists(getStatePath(partialPath)):
+            os.remove(getStatePath(partialPath))
+
+        try:
+            artifactcache.store(cacheKey, outputPath, digest)
+
+            # downloads resumed from before this was recorded have none
+            if metadata is not None:
+                artifactcache.recordMetadata(url, dict(metadata, sha256=digest))
+        except OSError as error:
+            print(f"Failed to cache `{url}`: {error}")
+
+    return digest
@@ -15,8 +15,18 @@ def install():
     runCmd(cmd)
 
 
-print("Installing doxygen...")
+def plan():
+    # brew decides whether it is already installed
+    return [("install", "doxygen", None)]
 
-install()
 
-print("Installed doxygen.")
+def run():
+    print("Installing doxygen...")
+
+    install()
+
+    print("Installed doxygen.")
+
+
+if __name__ == "__main__":
+    run()
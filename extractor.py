@@ -0,0 +1,282 @@
+import os
+import shutil
+import tarfile
+import zipfile
+import threading
+import http.client
+
+import artifactcache
+import downloader
+
+class ArrivalReader:
+    # hands tarfile the part of a download that has arrived in order from
+    # the start, waiting for more whenever it catches up
+    def __init__(self, arrival, partialPath, archivePath):
+        self.arrival = arrival
+        self.partialPath = partialPath
+        self.archivePath = archivePath
+        self.file = None
+        self.position = 0
+
+    def read(self, size=-1):
+        condition = self.arrival["condition"]
+
+        with condition:
+            condition.wait_for(lambda: self.arrival["restarted"] or self.arrival["finished"] or self.arrival["size"] > self.position)
+
+            if self.arrival["restarted"]:
+                raise DownloadRestartedError(f"`{self.archivePath}` was downloaded again from the start")
+
+            if self.arrival["failed"]:
+                raise downloader.DownloadError(f"Failed to download `{self.archivePath}`")
+
+            finished = self.arrival["finished"]
+            available = self.arrival["size"] - self.position
+
+        # the partial file keeps being read once it is renamed into place
+        if self.file is None:
+            self.file = open(self.archivePath if finished else self.partialPath, "rb")
+            self.file.seek(self.position)
+
+        if size is None or size < 0 or size > available:
+            size = available
+
+        chunk = self.file.read(size)
+        self.position += len(chunk)
+
+        return chunk
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class DownloadRestartedError(Exception):
+    # what was read so far was thrown away by the download
+    pass
+
+
+def isZip(url):
+    return url.split("?")[0].lower().endswith(".zip")
+
+
+def getStrippedName(name, stripComponents):
+    # the same as `tar --strip-components`. Returns None for anything inside
+    # the stripped directories themselves
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ["", "."]]
+
+    if len(parts) <= stripComponents:
+        return None
+
+    return "/".join(parts[stripComponents:])
+
+
+def extractTar(fileobj, outputDir, stripComponents):
+    # `r|*` reads the archive front to back without seeking, decompressing
+    # xz, gzip or bzip2 as it goes
+    filterArgs = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            name = getStrippedName(member.name, stripComponents)
+
+            if name is None:
+                continue
+
+            member.name = name
+
+            # hard links point at another file in the archive, which has been
+            # moved by the stripping too
+            if member.islnk():
+                linkName = getStrippedName(member.linkname, stripComponents)
+
+                if linkName is None:
+                    continue
+
+                member.linkname = linkName
+
+            archive.extract(member, outputDir, **filterArgs)
+
+
+def extractZip(file, outputDir, stripComponents):
+    with zipfile.ZipFile(file) as archive:
+        for member in archive.infolist():
+            name = getStrippedName(member.filename, stripComponents)
+
+            if name is None:
+                continue
+
+            # zips mark directories with a trailing slash
+            member.filename = f"{name}/" if member.is_dir() else name
+
+            archive.extract(member, outputDir)
+
+
+def extractFile(url, file, outputDir, stripComponents):
+    if isZip(url):
+        extractZip(file, outputDir, stripComponents)
+    else:
+        extractTar(file, outputDir, stripComponents)
+
+
+def checkDigest(url, digest, expectedDigest):
+    if expectedDigest is not None and digest != expectedDigest:
+        raise downloader.DownloadError(f"`{url}` is corrupt or has changed: expected sha256 {expectedDigest} but downloaded {digest}")
+
+
+def extractCached(url, cacheKey, outputDir, stripComponents, expectedDigest):
+    blob = artifactcache.getBlob(cacheKey, expectedDigest)
+
+    if blob is None:
+        return None
+
+    blobPath, digest = blob
+
+    # without a sha256 to check it against it may be out of date
+    if expectedDigest is None and not downloader.isUnchanged(url, digest):
+        return None
+
+    print(f"Using cached download of `{url}`.")
+
+    with open(blobPath, "rb") as blobFile:
+        extractFile(url, blobFile, outputDir, stripComponents)
+
+    return digest
+
+
+def createArrival():
+    return {
+        "condition": threading.Condition(),
+        # how much of the download can be read in order from the start
+        "size": 0,
+        "finished": False,
+        "failed": False,
+        "restarted": False,
+    }
+
+
+def recordArrival(arrival):
+    # called from the download's thread
+    def onArrived(size):
+        with arrival["condition"]:
+            if size < arrival["size"]:
+                arrival["restarted"] = True
+
+            arrival["size"] = size
+            arrival["condition"].notify_all()
+
+    return onArrived
+
+
+def downloadInBackground(url, archivePath, cacheKey, expectedDigest, timeout, arrival):
+    result = {}
+
+    def run():
+        try:
+            result["digest"] = downloader.download(url, archivePath, timeout=timeout, expectedDigest=expectedDigest, cacheKey=cacheKey, onArrived=recordArrival(arrival))
+        except Exception as error:
+            result["error"] = error
+
+        with arrival["condition"]:
+            if "error" in result:
+                arrival["failed"] = True
+            else:
+                arrival["size"] = os.path.getsize(archivePath)
+
+            arrival["finished"] = True
+            arrival["condition"].notify_all()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    return thread, result
+
+
+def extractDownload(url, cacheKey, archivePath, outputDir, stripComponents, expectedDigest, timeout):
+    # downloads with downloader.download, so large archives are still fetched
+    # over several connections and carry on from where an interrupted
+    # download stopped. A tar is extracted from the start of the download
+    # while the rest is still arriving
+    print(f"Downloading and extracting `{url}`...")
+
+    # zips keep their list of files at the end, so the whole zip has to
+    # arrive before anything can be extracted. Windows cannot rename the
+    # download into place while it is being read
+    if isZip(url) or os.name == "nt":
+        digest = downloader.download(url, archivePath, timeout=timeout, expectedDigest=expectedDigest, cacheKey=cacheKey)
+
+        with open(archivePath, "rb") as archiveFile:
+            extractFile(url, archiveFile, outputDir, stripComponents)
+
+        return digest
+
+    arrival = createArrival()
+    thread, result = downloadInBackground(url, archivePath, cacheKey, expectedDigest, timeout, arrival)
+
+    reader = ArrivalReader(arrival, f"{archivePath}.part", archivePath)
+    extractError = None
+
+    try:
+        extractTar(reader, outputDir, stripComponents)
+    except Exception as error:
+        extractError = error
+    finally:
+        reader.close()
+
+    # a tar that fails to extract may only be short of the rest of the
+    # download, so the download's own error is the one reported
+    thread.join()
+
+    if "error" in result:
+        raise result["error"]
+
+    if isinstance(extractError, DownloadRestartedError):
+        print(f"{extractError}, extracting it again...")
+
+        shutil.rmtree(outputDir)
+        os.makedirs(outputDir)
+
+        with open(archivePath, "rb") as archiveFile:
+            extractTar(archiveFile, outputDir, stripComponents)
+    elif extractError is not None:
+        raise extractError
+
+    return result["digest"]
+
+
+def downloadAndExtract(url, outputDir, stripComponents=0, expectedDigest=None, timeout=downloader.defaultTimeout, cacheKey=None):
+    # extracts a tar as it is downloaded, instead of waiting for all of it.
+    # Everything is extracted to a separate directory first, and only moved
+    # into place once the download is complete and checked. The archive is
+    # downloaded next to `outputDir`, and removed once extracted; an
+    # interrupted download is left there for the next one to carry on from.
+    # Returns the sha256 of the download, which must match `expectedDigest`
+    # if one is given. `cacheKey` is the same as for downloader.download
+    cacheKey = cacheKey or url
+    partialDir = f"{outputDir}.part"
+    archivePath = f"{outputDir}.download"
+
+    shutil.rmtree(partialDir, ignore_errors=True)
+    os.makedirs(partialDir)
+
+    try:
+        digest = extractCached(url, cacheKey, partialDir, stripComponents, expectedDigest)
+
+        if digest is None:
+            digest = extractDownload(url, cacheKey, archivePath, partialDir, stripComponents, expectedDigest, timeout)
+    except downloader.DownloadError:
+        shutil.rmtree(partialDir, ignore_errors=True)
+        raise
+    except (http.client.HTTPException, OSError, tarfile.TarError, zipfile.BadZipFile) as error:
+        shutil.rmtree(partialDir, ignore_errors=True)
+        raise downloader.DownloadError(f"Failed to download and extract `{url}`: {error}")
+
+    # the cache keeps its own copy
+    if os.path.exists(archivePath):
+        os.remove(archivePath)
+
+    # an empty or half finished install left behind is replaced
+    shutil.rmtree(outputDir, ignore_errors=True)
+    os.replace(partialDir, outputDir)
+
+    return digest
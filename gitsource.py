@@ -0,0 +1,208 @@
+import os
+import stat
+import shutil
+import tarfile
+import subprocess
+
+import artifactcache
+import extractor
+
+gitPath = shutil.which("git")
+
+
+def runGit(args, cwd=None):
+    # checking out a tag is expected, so git need not explain it
+    cmd = [gitPath, "-c", "advice.detachedHead=false"] + args
+
+    print(f"Running command: {cmd}")
+
+    return subprocess.run(cmd, cwd=cwd).returncode == 0
+
+
+def removeReadOnly(function, path, excinfo):
+    # git marks its objects read-only, which stops Windows removing them
+    os.chmod(path, stat.S_IWRITE)
+    function(path)
+
+
+def removeClone(sourcePath):
+    if os.path.exists(sourcePath):
+        print(f"Removing directory: {sourcePath}")
+        shutil.rmtree(sourcePath, onerror=removeReadOnly)
+
+
+def getMirrorPath(url):
+    # a bare mirror of every repository cloned from is kept in the cache,
+    # shared by every checkout of this repository on the machine. Returns
+    # None if the cache is turned off
+    cacheDir = artifactcache.getCacheDir()
+
+    if cacheDir is None:
+        return None
+
+    return os.path.join(cacheDir, "git", f"{artifactcache.getURLKey(url)}.git")
+
+
+def hasTag(repositoryPath, tag):
+    result = subprocess.run([gitPath, "rev-parse", "--verify", "--quiet", f"refs/tags/{tag}^{{commit}}"], cwd=repositoryPath, stdout=subprocess.DEVNULL)
+
+    return result.returncode == 0
+
+
+def updateMirror(url, tag, mirrorPath):
+    # creates the mirror the first time, and only fetches what is new after
+    # that. Tags do not move, so a mirror that has the tag is used as it is,
+    # without asking the server anything
+    if os.path.isdir(mirrorPath):
+        if hasTag(mirrorPath, tag):
+            return True
+
+        print(f"Updating the mirror of `{url}`...")
+
+        if not runGit(["fetch", "--tags", "origin"], mirrorPath):
+            return False
+    else:
+        print(f"Creating a mirror of `{url}`...")
+
+        partialPath = f"{mirrorPath}.part"
+        removeClone(partialPath)
+
+        if not runGit(["clone", "--mirror", url, partialPath]):
+            removeClone(partialPath)
+            return False
+
+        os.replace(partialPath, mirrorPath)
+
+    return hasTag(mirrorPath, tag)
+
+
+# each of these clones without checking anything out, and returns the
+# revision of the tag in the clone, or None if it failed
+
+def cloneMirror(url, tag, sourcePath):
+    # cloned from the mirror on disk, so nothing is fetched. Git hard links
+    # the mirror's objects where it can instead of copying them, but the
+    # clone owns its objects rather than borrowing them, so it keeps working
+    # if the cache is cleared or moved
+    mirrorPath = getMirrorPath(url)
+
+    if mirrorPath is None:
+        return None
+
+    try:
+        with artifactcache.lockFile(f"{mirrorPath}.lock"):
+            if not updateMirror(url, tag, mirrorPath):
+                print(f"Failed to mirror `{url}` at `{tag}`.")
+                return None
+
+            if not runGit(["clone", "--no-checkout", mirrorPath, sourcePath]):
+                return None
+    except OSError as error:
+        print(f"Failed to mirror `{url}`: {error}")
+        return None
+
+    # the clone looks the same as one straight from `url`
+    if not runGit(["remote", "set-url", "origin", url], sourcePath):
+        return None
+
+    return f"tags/{tag}"
+
+
+def cloneShallow(url, tag, sourcePath):
+    # only the commit the tag points at
+    if not runGit(["clone", "--depth", "1", "--branch", tag, "--single-branch", "--no-tags", "--no-checkout", url, sourcePath]):
+        return None
+
+    return "HEAD"
+
+
+def cloneFull(url, tag, sourcePath):
+    # every commit, but only the files that are read are fetched, for
+    # servers that support partial clones. Others ignore the filter
+    if not runGit(["clone", "--filter=blob:none", "--no-checkout", url, sourcePath]):
+        return None
+
+    return f"tags/{tag}"
+
+
+def cloneTag(url, tag, branch, sourcePath, checkout=True):
+    # clones `url` at `tag` into `sourcePath`, and creates `branch` at it so
+    # the scripts can tell which version has been cloned. A clone of another
+    # version, or one left half finished, is replaced. Without `checkout`
+    # the files are left out, for callers that only read them from the
+    # branch. Returns whether the clone succeeded
+    removeClone(sourcePath)
+
+    os.makedirs(os.path.dirname(sourcePath), exist_ok=True)
+
+    revision = cloneMirror(url, tag, sourcePath)
+
+    if revision is None:
+        # without the cache, only what this clone needs is fetched
+        removeClone(sourcePath)
+
+        revision = cloneShallow(url, tag, sourcePath)
+
+    if revision is None:
+        print(f"Failed to clone only `{tag}` of `{url}`, cloning all of it instead...")
+
+        removeClone(sourcePath)
+
+        revision = cloneFull(url, tag, sourcePath)
+
+    if revision is None or not runGit(["branch", branch, revision], sourcePath):
+        print(f"Failed to clone `{url}` at `{tag}`.")
+        return False
+
+    # the branch is often named the same as the tag, which is expected
+    return not checkout or runGit(["-c", "core.warnAmbiguousRefs=false", "checkout", branch], sourcePath)
+
+
+def archive(sourcePath, revision, paths, outputDir):
+    # writes only `paths` of `revision` to `outputDir`, straight from git's
+    # objects, without checking anything out. Returns the files written
+    partialDir = f"{outputDir}.part"
+
+    # the clone may have failed
+    if not os.path.isdir(sourcePath):
+        print(f"Failed to find the clone `{sourcePath}`.")
+        return None
+
+    removeClone(partialDir)
+    os.makedirs(partialDir)
+
+    cmd = [gitPath, "archive", "--format=tar", revision, "--"] + paths
+
+    print(f"Running command: {cmd}")
+
+    try:
+        process = subprocess.Popen(cmd, cwd=sourcePath, stdout=subprocess.PIPE)
+    except OSError as error:
+        print(f"Failed to run git: {error}")
+        removeClone(partialDir)
+        return None
+
+    extracted = False
+
+    try:
+        extractor.extractTar(process.stdout, partialDir, 0)
+        extracted = True
+    except (OSError, tarfile.TarError) as error:
+        print(f"Failed to extract `{revision}` of `{sourcePath}`: {error}")
+    finally:
+        process.stdout.close()
+
+    if process.wait() != 0 or not extracted:
+        removeClone(partialDir)
+        return None
+
+    files = []
+
+    for root, dirs, names in os.walk(partialDir):
+        files += [os.path.relpath(os.path.join(root, n), partialDir).replace(os.sep, "/") for n in names]
+
+    # anything installed before is replaced
+    removeClone(outputDir)
+    os.replace(partialDir, outputDir)
+
+    return sorted(files)
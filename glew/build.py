@@ -1,19 +1,28 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
-version = "2.2.0"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import mirrors
+import downloader
+
+defaultVersion = "2.2.0"
 # the git tree does not contain the generated source
 # it is far simpler to build from the release package which does contain the
 # generated source
-gitUrl = "https://github.com/nigels-com/glew/releases/download/glew-2.2.0/glew-2.2.0.zip"
+gitUrl = "https://github.com/nigels-com/glew/releases/download/glew-{version}/glew-{version}.zip"
 
-curlPath = shutil.which("curl")
 cmakePath = shutil.which("cmake")
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
@@ -45,85 +54,82 @@ def runCmd(cmd, cwd=None):
     subprocess.run(cmd, cwd=cwd)
 
 
-def runCmdIgnoreError(cmd):
-    print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
-
-
 def getZipOutputPath(tempDirPath):
     path = os.path.join(tempDirPath, "glew_source")
     return path
 
-def getBuildPath(zipOutputPath):
+def getBuildPath(version, zipOutputPath):
     path = os.path.join(zipOutputPath, f"glew-{version}", "build", "cmake", "build")
     return path
 
 
-def build(tempDirPath):
-    print("Starting build...")
+def isSourceDownloaded(version, tempDirPath):
+    cmakeListsPath = os.path.join(getZipOutputPath(tempDirPath), f"glew-{version}", "build", "cmake", "CMakeLists.txt")
 
-    createDirectories(tempDirPath)
+    return os.path.exists(cmakeListsPath)
 
-    os.chdir(tempDirPath)
+
+def downloadSource(version, tempDirPath):
+    zipOutputPath = getZipOutputPath(tempDirPath)
+
+    if isSourceDownloaded(version, tempDirPath):
+        print("Source already downloaded.")
+        return zipOutputPath
+
+    createDirectories(tempDirPath)
 
     # get the code
     zipPath = os.path.join(tempDirPath, "glew.zip")
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{zipPath}", f"{gitUrl}"]
-    runCmd(cmd)
+    digests.download("glew", version, "source", gitUrl.format(version=version), zipPath)
 
-    zipOutputPath = getZipOutputPath(tempDirPath)
     with zipfile.ZipFile(zipPath, "r") as zip:
         zip.extractall(zipOutputPath)
 
-    os.chdir(zipOutputPath)
+    return zipOutputPath
 
-    buildDir = getBuildPath(zipOutputPath)
-    createDirectories(buildDir)
 
-    os.chdir(buildDir)
+def build(version, tempDirPath, jobs):
+    print("Starting build...")
+
+    zipOutputPath = downloadSource(version, tempDirPath)
+
+    buildDir = getBuildPath(version, zipOutputPath)
+    createDirectories(buildDir)
 
     cmd = [cmakePath, ".."]
-    runCmd(cmd)
+    runCmd(cmd, buildDir)
 
     cmd = [cmakePath, "--build", ".", "--config", "Release"]
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    if jobs is not None:
+        cmd += ["--parallel", f"{jobs}"]
+    runCmd(cmd, buildDir)
 
     print("Finished build.")
 
 
-def saveResults(tempDirPath):
+def saveResults(version, libraryDir, tempDirPath):
     print("Saving results...")
 
     zipOutputPath = getZipOutputPath(tempDirPath)
-    buildDir = getBuildPath(zipOutputPath)
+    buildDir = getBuildPath(version, zipOutputPath)
 
     platformLibName = getPlatformLibName()
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
     includeDir = os.path.join(tempDirPath, "glew_source", f"glew-{version}", "include", "GL")
 
-    saveBinaries(destLibDir, platformLibName, buildDir, includeDir)
+    saveBinaries(version, destLibDir, platformLibName, buildDir, includeDir)
 
     print("Saved results.")
 
 
-def saveBinaries(destLibDir, platformLibName, buildDir, includeDir):
+def saveBinaries(version, destLibDir, platformLibName, buildDir, includeDir):
     createDirectories(destLibDir)
 
     resultsLibDir = os.path.join(buildDir, "lib")
     resultsBinDir = os.path.join(buildDir, "bin")
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     with zipfile.ZipFile(zipDir, "w") as zip:
         for root, dirs, files in os.walk(resultsLibDir):
@@ -143,25 +149,23 @@ def getPlatformLibName():
     return platform.system()
 
 
-def getZipPath(destLibDir, platformLibName):
+def getZipPath(version, destLibDir, platformLibName):
     return os.path.join(destLibDir, f"{version}_{platformLibName}.zip")
 
 
-def doesNeedBuilding():
+def doesNeedBuilding(version, libraryDir):
     platformLibName = getPlatformLibName()
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     isBuilt = os.path.exists(zipDir)
 
     return not isBuilt
 
 
-def downloadBinaries():
-    print("Trying to download pre-built binaries...")
-
+def getBinaryURL(version):
     downloadURLWindows = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/glew_{version}/{version}_Windows.zip"
     downloadURLDarwin = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/glew_{version}/{version}_Darwin.zip"
     downloadURLLinux = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/glew_{version}/{version}_Linux.zip"
@@ -176,55 +180,136 @@ def downloadBinaries():
     elif systemName == "Linux":
         url = downloadURLLinux
     else:
-        print(f"Unknown system name: {systemName}")
-        return False
+        return ""
+
+    return url
+
+
+def downloadBinaries(version, libraryDir):
+    print("Trying to download pre-built binaries...")
+
+    url = getBinaryURL(version)
 
     if url == "":
+        print(f"Unknown system name: {platform.system()}")
+        return False
+
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
         return False
 
     platformLibName = getPlatformLibName()
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
-    zipDir = getZipPath(destLibDir, platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
-    result = downloadBinary(url, zipDir)
+    result = downloadBinary(url, zipDir, version, platformLibName)
 
     print("Finished trying.")
 
     return result
 
 
-def downloadBinary(url, outputPath):
+def downloadBinary(url, outputPath, version, platformName):
     print(f"Trying to download url: '{url}' to path: '{outputPath}'")
 
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{outputPath}", f"{url}"]
-
-    if runCmdIgnoreError(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("glew", version, platformName, url, outputPath)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
 
-print(f"Building glew version {version}...")
 
-args = configureArguments()
+def download(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
+    tempDirPath = os.path.join(libraryDir, "__temp")
 
-cwd = os.getcwd()
-tempDirPath = os.path.join(cwd, "__temp")
+    if not doesNeedBuilding(version, libraryDir):
+        return
 
-if doesNeedBuilding():
-    if downloadBinaries():
+    if downloadBinaries(version, libraryDir):
         print("Downloaded pre-built binaries.")
     else:
-        build(tempDirPath)
+        downloadSource(version, tempDirPath)
+
+
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, libraryDir):
+        return []
+
+    url = getBinaryURL(version)
+
+    if url == "":
+        return []
+
+    platformLibName = getPlatformLibName()
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("glew", version, platformLibName, url, zipDir)]
+
+
+def plan(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, libraryDir):
+        return []
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    # a previous run already fell back to building from source
+    if isSourceDownloaded(version, tempDirPath):
+        return [("build", getZipOutputPath(tempDirPath), None)]
+
+    # no pre-built binaries have been published, going by the indexes
+    # already fetched
+    if not mirrors.isAvailable(getBinaryURL(version), fetchIndexes=False):
+        return [("build", getZipOutputPath(tempDirPath), None)]
+
+    platformLibName = getPlatformLibName()
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("download", zipDir, downloader.getKnownSize(getBinaryURL(version)))]
+
+
+def run(version=None, libraryDir=libraryDir, jobs=None):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print(f"Building glew version {version}...")
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    if doesNeedBuilding(version, libraryDir):
+        download(version, libraryDir)
+
+        if doesNeedBuilding(version, libraryDir):
+            build(version, tempDirPath, jobs)
+
+            saveResults(version, libraryDir, tempDirPath)
+    else:
+        print("glew is already built...")
+
+    print(f"Built glew version {version}.")
+
 
-        saveResults(tempDirPath)
-else:
-    print("glew is already built...")
+if __name__ == "__main__":
+    args = configureArguments()
 
-print(f"Built glew version {version}.")
\ No newline at end of file
+    run(args.version)
@@ -4,7 +4,9 @@ import platform
 import argparse
 import zipfile
 
-version = "2.2.0"
+defaultVersion = "2.2.0"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -70,15 +72,15 @@ def getPlatformName():
     return platformName
 
 
-def getBinaryOutPath():
+def getBinaryOutPath(libraryDir):
     platformName = getPlatformName()
 
-    binaryOut = os.path.join(os.getcwd(), "lib", platformName)
+    binaryOut = os.path.join(libraryDir, "lib", platformName)
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath):
+def getOutputZipPath(version, binaryOutPath):
     platformName = getPlatformName()
 
     zipPath = os.path.join(binaryOutPath, f"{version}_{platformName}.zip")
@@ -86,9 +88,9 @@ def getOutputZipPath(binaryOutPath):
     return zipPath
 
 
-def install(path):
-    binaryPath = getBinaryOutPath()
-    zipPath = getOutputZipPath(binaryPath)
+def install(version, path, libraryDir):
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
 
     installDir = getFullInstallDir(path)
 
@@ -98,16 +100,50 @@ def install(path):
         zip.extractall(installDir)
 
 
-print("Installing GLEW...")
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    return [zipPath]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing GLEW...")
+
+    if isAlreadyInstalled(path):
+        print("GLEW already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed GLEW.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("GLEW already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed GLEW.")
\ No newline at end of file
+    run(args.path, args.version)
@@ -1,15 +1,23 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
-version = "0.9.9.8"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gitsource
+
+defaultVersion = "0.9.9.8"
 gitURL = "https://github.com/g-truc/glm.git"
 
 gitPath = shutil.which("git")
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-p", "--path", action="store", required=True, help="path to install in")
@@ -56,51 +64,112 @@ def isAlreadyInstalled(path):
     return filesExist
 
 
-def install(path):
-    cwd = os.getcwd()
+def getTempDirPath(libraryDir):
+    return os.path.join(libraryDir, "__temp", "glm")
+
+
+def getSourcePath(libraryDir):
+    return os.path.join(getTempDirPath(libraryDir), "glm")
+
+
+def getBranchPath(version, libraryDir):
+    # checking out the version creates a branch named after it
+    return os.path.join(getSourcePath(libraryDir), ".git", "refs", "heads", f"{version}")
+
+
+def isSourceDownloaded(version, libraryDir):
+    return os.path.exists(getBranchPath(version, libraryDir))
+
+
+def downloadSource(version, libraryDir):
+    sourcePath = getSourcePath(libraryDir)
+
+    if isSourceDownloaded(version, libraryDir):
+        print("Source already downloaded.")
+        return sourcePath
 
     # get the source code
-    tempDirPath = os.path.join(cwd, "__temp", "glm")
+    tempDirPath = getTempDirPath(libraryDir)
     createDirectories(tempDirPath)
 
-    os.chdir(tempDirPath)
+    # only the version we want, not the whole history
+    gitsource.cloneTag(gitURL, f"{version}", f"{version}", sourcePath)
 
-    cmd = [gitPath, "clone", f"{gitURL}"]
-    runCmd(cmd)
+    return sourcePath
 
-    os.chdir(os.path.join(os.getcwd(), "glm"))
 
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/{version}", "-b", f"{version}"]
-    runCmd(cmd)
+def install(version, path, libraryDir):
+    repoPath = downloadSource(version, libraryDir)
 
     installDir = getFullInstallDir(path)
 
     # copy the code
     # git archive will only create a package file from the repo, so
     # package as a zip then unzip to the install directory
-    archivePath = os.path.join(cwd, "__temp", "glm.zip")
+    archivePath = os.path.join(libraryDir, "__temp", "glm.zip")
     cmd = [gitPath, "archive", "--output", f"{archivePath}", "HEAD"]
-    runCmd(cmd)
+    runCmd(cmd, repoPath)
 
     createDirectories(installDir)
 
     with zipfile.ZipFile(archivePath, "r") as zip:
         zip.extractall(installDir)
 
-    os.chdir(cwd)
 
+def download(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return
+
+    downloadSource(version, libraryDir)
+
+
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    # the branch holds the commit that was checked out
+    return [getBranchPath(version, libraryDir)]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    steps = []
+
+    if not isSourceDownloaded(version, libraryDir):
+        steps.append(("download", gitURL, None))
+
+    steps.append(("extract", getFullInstallDir(path), None))
+
+    return steps
+
+
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing glm...")
 
-print("Installing glm...")
+    if isAlreadyInstalled(path):
+        print("glm already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed glm.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("glm already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed glm.")
\ No newline at end of file
+    run(args.path, args.version)
@@ -1,23 +1,60 @@
 import os
 import json
-import shutil
 import platform
 import argparse
-import subprocess
+import tempfile
+import threading
+import importlib.util
+
+import daemonclient
+import journal
+import jobserver
+import mirrors
+import digests
+import downloader
+import prefetch
+import scheduler
+
+rootDir = os.path.dirname(os.path.abspath(__file__))
+
+loadedModules = {}
+loadedModulesLock = threading.Lock()
 
-pythonPath = shutil.which("python3")
 
 def configureArguments():
     parser = argparse.ArgumentParser()
-    parser.add_argument("-p", "--path", action="store", required=True, help="path to project")
+    parser.add_argument("-p", "--path", action="store", nargs="+", required=True, help="paths to projects")
+    parser.add_argument("-j", "--jobs", action="store", type=int, default=os.cpu_count(), help="maximum number of libraries to build at the same time")
+    parser.add_argument("--download-jobs", action="store", type=int, default=4, help="maximum number of libraries to download at the same time")
+    parser.add_argument("--jobserver", action="store", type=int, required=False, help="share this many build jobs between every build through a GNU make jobserver")
+    parser.add_argument("--plan", action="store_true", default=False, help="print what would be downloaded, built and extracted without doing it")
+    parser.add_argument("--extract-jobs", action="store", type=int, default=os.cpu_count(), help="maximum number of libraries to extract at the same time")
+    parser.add_argument("--daemon", action="store", required=False, help="socket of a running daemon.py to hand the work to")
+    parser.add_argument("--no-journal", action="store_true", default=False, help="check every library instead of skipping those the journal says are unchanged")
+    parser.add_argument("--mirror", action="append", required=False, help="URL of a mirror of the pre-built binaries to try before the releases. Can be given more than once, in order of preference")
+    parser.add_argument("--prefetch", action="store_true", default=False, help="download every pre-built binary needed at the same time, before anything is built or extracted")
+    parser.add_argument("--record-digests", action="store_true", default=False, help="download every pre-built binary the projects use, for this platform, and record its sha256 in digests.json to be committed")
+    parser.add_argument("--prefetch-per-host", action="store", type=int, default=prefetch.defaultPerHost, help="maximum number of pre-built binaries to prefetch from the same host at the same time")
     args = parser.parse_args()
 
     return args
 
 
-def runCmd(cmd, cwd=None):
-    print(f"Running command: {cmd}")
-    subprocess.run(cmd, cwd=cwd)
+def loadModule(libraryName, scriptName):
+    # each library's scripts live in their own directory and share names
+    # (build.py, install.py), so load them by path under a unique name
+    with loadedModulesLock:
+        key = (libraryName, scriptName)
+
+        if key not in loadedModules:
+            modulePath = os.path.join(rootDir, libraryName, f"{scriptName}.py")
+            spec = importlib.util.spec_from_file_location(f"{libraryName}_{scriptName}", modulePath)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            loadedModules[key] = module
+
+        return loadedModules[key]
 
 
 def getProjectDependencies(path):
@@ -51,268 +88,388 @@ def installClang(path, deps):
 
     print("Installing clang...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['clang']}"]
+    version = deps.get("clang")
 
-    installPath = os.path.join(os.getcwd(), "clang", "install.py")
+    install = loadModule("clang", "install")
 
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", path] + version
-    runCmd(cmd)
+    # install
+    install.run(path, version)
 
     print("Installed clang.")
 
 
-def installv8(path, deps):
+def downloadv8(path, deps):
     if len(deps) > 0 and not "v8" in deps.keys():
         return
 
-    print("Installing v8...")
+    print("Downloading v8...")
+
+    version = deps.get("v8")
+
+    build = loadModule("v8", "build")
+
+    build.download(version)
+
+    if platform.system() == "Darwin":
+        build.download(version, build_for_ios=True)
+        build.download(version, build_for_ios_simulator=True)
+
+    print("Downloaded v8.")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['v8']}"]
 
-    cwd = os.getcwd()
-    os.chdir("v8")
+def buildv8(path, deps, jobs):
+    if len(deps) > 0 and not "v8" in deps.keys():
+        return
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    print("Building v8...")
 
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    version = deps.get("v8")
 
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", path] + version
-    runCmd(cmd)
+    build = loadModule("v8", "build")
+
+    build.run(version, jobs=jobs)
 
     if platform.system() == "Darwin":
         # iOS
-        cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-        runCmd(cmd)
-
-        cmd = [f"{pythonPath}", f"{installPath}", "-p", path, "-ios"] + version
-        runCmd(cmd)
+        build.run(version, build_for_ios=True, jobs=jobs)
 
         # iOS Simulator
-        cmd = [f"{pythonPath}", f"{buildPath}", "-iossim"] + version
-        runCmd(cmd)
+        build.run(version, build_for_ios_simulator=True, jobs=jobs)
+
+    print("Built v8.")
+
+
+def installv8(path, deps):
+    if len(deps) > 0 and not "v8" in deps.keys():
+        return
+
+    print("Installing v8...")
+
+    version = deps.get("v8")
 
-        cmd = [f"{pythonPath}", f"{installPath}", "-p", path, "-iossim"] + version
-        runCmd(cmd)
+    install = loadModule("v8", "install")
 
-    os.chdir(cwd)
+    install.run(path, version)
+
+    if platform.system() == "Darwin":
+        # iOS
+        install.run(path, version, buildForiOS=True)
+
+        # iOS Simulator
+        install.run(path, version, buildForiOSSimulator=True)
 
     print("Installed v8.")
 
 
-def installSDL(path, deps):
+def downloadSDL(path, deps):
     if len(deps) > 0 and not "sdl" in deps.keys():
         return
 
-    print("Installing SDL...")
+    print("Downloading SDL...")
+
+    version = deps.get("sdl")
+
+    build = loadModule("sdl", "build")
+
+    build.download(version)
+
+    print("Downloaded SDL.")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sdl']}"]
 
-    cwd = os.getcwd()
-    os.chdir("sdl")
+def buildSDL(path, deps, jobs):
+    if len(deps) > 0 and not "sdl" in deps.keys():
+        return
+
+    print("Building SDL...")
+
+    version = deps.get("sdl")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    build = loadModule("sdl", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
 
     # # build ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-    #     runCmd(cmd)
+    #     build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built SDL.")
+
+
+def installSDL(path, deps):
+    if len(deps) > 0 and not "sdl" in deps.keys():
+        return
+
+    print("Installing SDL...")
+
+    version = deps.get("sdl")
+
+    install = loadModule("sdl", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # # install ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-    #     runCmd(cmd)
-
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-iossim"] + version
-    #     runCmd(cmd)
-
-    os.chdir(cwd)
+    #     install.run(path, version, buildForiOS=True)
+    #     install.run(path, version, buildForiOSSimulator=True)
 
     print("Installed SDL.")
 
 
-def installSDLimage(path, deps):
+def downloadSDLimage(path, deps):
     if len(deps) > 0 and not "sdl_image" in deps.keys():
         return
 
-    print("Installing SDL image...")
+    print("Downloading SDL image...")
+
+    version = deps.get("sdl_image")
+
+    build = loadModule("sdl_image", "build")
+
+    build.download(version)
+
+    print("Downloaded SDL image.")
+
+
+def buildSDLimage(path, deps, jobs):
+    if len(deps) > 0 and not "sdl_image" in deps.keys():
+        return
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sdl_image']}"]
+    print("Building SDL image...")
 
-    cwd = os.getcwd()
-    os.chdir("sdl_image")
+    version = deps.get("sdl_image")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    build = loadModule("sdl_image", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
 
     # # build ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-    #     runCmd(cmd)
+    #     build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built SDL image.")
+
+
+def installSDLimage(path, deps):
+    if len(deps) > 0 and not "sdl_image" in deps.keys():
+        return
+
+    print("Installing SDL image...")
+
+    version = deps.get("sdl_image")
+
+    install = loadModule("sdl_image", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # # install ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-    #     runCmd(cmd)
-
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-iossim"] + version
-    #     runCmd(cmd)
-
-    os.chdir(cwd)
+    #     install.run(path, version, buildForiOS=True)
+    #     install.run(path, version, buildForiOSSimulator=True)
 
     print("Installed SDL image.")
 
 
-def installSDLnet(path, deps):
+def downloadSDLnet(path, deps):
     if len(deps) > 0 and not "sdl_net" in deps.keys():
         return
 
-    print("Installing SDL net...")
+    print("Downloading SDL net...")
+
+    version = deps.get("sdl_net")
+
+    build = loadModule("sdl_net", "build")
+
+    build.download(version)
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sdl_net']}"]
+    print("Downloaded SDL net.")
 
-    cwd = os.getcwd()
-    os.chdir("sdl_net")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+def buildSDLnet(path, deps, jobs):
+    if len(deps) > 0 and not "sdl_net" in deps.keys():
+        return
+
+    print("Building SDL net...")
+
+    version = deps.get("sdl_net")
+
+    build = loadModule("sdl_net", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
 
     # # build ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-    #     runCmd(cmd)
+    #     build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built SDL net.")
+
+
+def installSDLnet(path, deps):
+    if len(deps) > 0 and not "sdl_net" in deps.keys():
+        return
+
+    print("Installing SDL net...")
+
+    version = deps.get("sdl_net")
+
+    install = loadModule("sdl_net", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # # install ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-    #     runCmd(cmd)
-
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-iossim"] + version
-    #     runCmd(cmd)
-
-    os.chdir(cwd)
+    #     install.run(path, version, buildForiOS=True)
+    #     install.run(path, version, buildForiOSSimulator=True)
 
     print("Installed SDL net.")
 
 
-def installSDLttf(path, deps):
+def downloadSDLttf(path, deps):
     if len(deps) > 0 and not "sdl_ttf" in deps.keys():
         return
 
-    print("Installing SDL ttf...")
+    print("Downloading SDL ttf...")
+
+    version = deps.get("sdl_ttf")
+
+    build = loadModule("sdl_ttf", "build")
+
+    build.download(version)
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sdl_ttf']}"]
+    print("Downloaded SDL ttf.")
 
-    cwd = os.getcwd()
-    os.chdir("sdl_ttf")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+def buildSDLttf(path, deps, jobs):
+    if len(deps) > 0 and not "sdl_ttf" in deps.keys():
+        return
+
+    print("Building SDL ttf...")
+
+    version = deps.get("sdl_ttf")
+
+    build = loadModule("sdl_ttf", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
 
     # # build ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-    #     runCmd(cmd)
+    #     build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built SDL ttf.")
+
+
+def installSDLttf(path, deps):
+    if len(deps) > 0 and not "sdl_ttf" in deps.keys():
+        return
+
+    print("Installing SDL ttf...")
+
+    version = deps.get("sdl_ttf")
+
+    install = loadModule("sdl_ttf", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # # install ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-    #     runCmd(cmd)
-
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-iossim"] + version
-    #     runCmd(cmd)
-
-    os.chdir(cwd)
+    #     install.run(path, version, buildForiOS=True)
+    #     install.run(path, version, buildForiOSSimulator=True)
 
     print("Installed SDL ttf.")
 
 
-def installSDLmixer(path, deps):
+def downloadSDLmixer(path, deps):
     if len(deps) > 0 and not "sdl_mixer" in deps.keys():
         return
 
-    print("Installing SDL mixer...")
+    print("Downloading SDL mixer...")
+
+    version = deps.get("sdl_mixer")
+
+    build = loadModule("sdl_mixer", "build")
+
+    build.download(version)
+
+    print("Downloaded SDL mixer.")
+
+
+def buildSDLmixer(path, deps, jobs):
+    if len(deps) > 0 and not "sdl_mixer" in deps.keys():
+        return
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sdl_mixer']}"]
+    print("Building SDL mixer...")
 
-    cwd = os.getcwd()
-    os.chdir("sdl_mixer")
+    version = deps.get("sdl_mixer")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    build = loadModule("sdl_mixer", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
 
     # # build ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-    #     runCmd(cmd)
+    #     build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built SDL mixer.")
+
+
+def installSDLmixer(path, deps):
+    if len(deps) > 0 and not "sdl_mixer" in deps.keys():
+        return
+
+    print("Installing SDL mixer...")
+
+    version = deps.get("sdl_mixer")
+
+    install = loadModule("sdl_mixer", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # # install ios
     # if platform.system() == "Darwin":
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-    #     runCmd(cmd)
+    #     install.run(path, version, buildForiOS=True)
+    #     install.run(path, version, buildForiOSSimulator=True)
 
-    #     cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-iossim"] + version
-    #     runCmd(cmd)
+    print("Installed SDL mixer.")
 
-    os.chdir(cwd)
 
-    print("Installed SDL mixer.")
+def downloadCatch2(path, deps):
+    if len(deps) > 0 and not "catch2" in deps.keys():
+        return
+
+    print("Downloading catch2...")
+
+    version = deps.get("catch2")
+
+    build = loadModule("catch2", "build")
+
+    build.download(version)
+
+    print("Downloaded catch2.")
+
+
+def buildCatch2(path, deps, jobs):
+    if len(deps) > 0 and not "catch2" in deps.keys():
+        return
+
+    print("Building catch2...")
+
+    version = deps.get("catch2")
+
+    build = loadModule("catch2", "build")
+
+    # build standard
+    build.run(version, jobs=jobs)
+
+    print("Built catch2.")
 
 
 def installCatch2(path, deps):
@@ -321,27 +478,29 @@ def installCatch2(path, deps):
 
     print("Installing catch2...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['catch2']}"]
+    version = deps.get("catch2")
 
-    cwd = os.getcwd()
-    os.chdir("catch2")
+    install = loadModule("catch2", "install")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    # install
+    install.run(path, version)
 
-    # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    print("Installed catch2.")
 
-    # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
 
-    os.chdir(cwd)
+def downloadNlohmannJson(path, deps):
+    if len(deps) > 0 and not "nlohmann_json" in deps.keys():
+        return
+
+    print("Downloading nlohmann json...")
 
-    print("Installed catch2.")
+    version = deps.get("nlohmann_json")
+
+    install = loadModule("nlohmann_json", "install")
+
+    install.download(path, version)
+
+    print("Downloaded nlohmann json.")
 
 
 def installNlohmannJson(path, deps):
@@ -350,84 +509,135 @@ def installNlohmannJson(path, deps):
 
     print("Installing nlohmann json...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['nlohmann_json']}"]
+    version = deps.get("nlohmann_json")
 
-    cwd = os.getcwd()
-    os.chdir("nlohmann_json")
-
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("nlohmann_json", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run(path, version)
 
     print("Installed nlohmann json.")
 
 
+def downloadRangesV3(path, deps):
+    if len(deps) > 0 and not "ranges-v3" in deps.keys():
+        return
+
+    print("Downloading ranges-v3...")
+
+    version = deps.get("ranges-v3")
+
+    install = loadModule("ranges-v3", "install")
+
+    install.download(path, version)
+
+    print("Downloaded ranges-v3.")
+
+
 def installRangesV3(path, deps):
     if len(deps) > 0 and not "ranges-v3" in deps.keys():
         return
 
     print("Installing ranges-v3...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['ranges-v3']}"]
+    version = deps.get("ranges-v3")
 
-    cwd = os.getcwd()
-    os.chdir("ranges-v3")
-
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("ranges-v3", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run(path, version)
 
     print("Installed ranges-v3.")
 
 
-def installlibSodium(path, deps):
+def downloadlibSodium(path, deps):
     if len(deps) > 0 and not "libsodium" in deps.keys():
         return
 
-    print("Installing libSodium...")
+    print("Downloading libSodium...")
+
+    version = deps.get("libsodium")
+
+    build = loadModule("libsodium", "build")
+
+    build.download(version)
+
+    if platform.system() == "Darwin":
+        build.download(version, buildiOS=True)
+
+    print("Downloaded libSodium.")
+
+
+def buildlibSodium(path, deps, jobs):
+    if len(deps) > 0 and not "libsodium" in deps.keys():
+        return
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['libsodium']}"]
+    print("Building libSodium...")
 
-    cwd = os.getcwd()
-    os.chdir("libsodium")
+    version = deps.get("libsodium")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    build = loadModule("libsodium", "build")
 
     # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    build.run(version, jobs=jobs)
+
+    # build ios
+    # libSodium does not have a separate ios simulator build
+    if platform.system() == "Darwin":
+        build.run(version, buildiOS=True, jobs=jobs)
+
+    print("Built libSodium.")
+
+
+def installlibSodium(path, deps):
+    if len(deps) > 0 and not "libsodium" in deps.keys():
+        return
+
+    print("Installing libSodium...")
+
+    version = deps.get("libsodium")
+
+    install = loadModule("libsodium", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
+    install.run(path, version)
 
     # install ios
-    # libSodium does not have a separate ios simulator build
     if platform.system() == "Darwin":
-        cmd = [f"{pythonPath}", f"{buildPath}", "-ios"] + version
-        runCmd(cmd)
+        install.run(path, version, buildForiOS=True)
 
-        cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}", "-ios"] + version
-        runCmd(cmd)
+    print("Installed libSodium.")
 
-    os.chdir(cwd)
 
-    print("Installed libSodium.")
+def downloadsqlite3(path, deps):
+    if len(deps) > 0 and not "sqlite3" in deps.keys():
+        return
+
+    print("Downloading sqlite3...")
+
+    version = deps.get("sqlite3")
+
+    build = loadModule("sqlite3", "build")
+
+    build.download(version)
+
+    print("Downloaded sqlite3.")
+
+
+def buildsqlite3(path, deps, jobs):
+    if len(deps) > 0 and not "sqlite3" in deps.keys():
+        return
+
+    print("Building sqlite3...")
+
+    version = deps.get("sqlite3")
+
+    build = loadModule("sqlite3", "build")
+
+    # build standard
+    build.run(version, jobs=jobs)
+
+    print("Built sqlite3.")
 
 
 def installsqlite3(path, deps):
@@ -436,27 +646,45 @@ def installsqlite3(path, deps):
 
     print("Installing sqlite3...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['sqlite3']}"]
+    version = deps.get("sqlite3")
 
-    cwd = os.getcwd()
-    os.chdir("sqlite3")
+    install = loadModule("sqlite3", "install")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    # install
+    install.run(path, version)
 
-    # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    print("Installed sqlite3.")
 
-    # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
 
-    os.chdir(cwd)
+def downloadGLEW(path, deps):
+    if len(deps) > 0 and not "glew" in deps.keys():
+        return
+
+    print("Downloading GLEW...")
 
-    print("Installed sqlite3.")
+    version = deps.get("glew")
+
+    build = loadModule("glew", "build")
+
+    build.download(version)
+
+    print("Downloaded GLEW.")
+
+
+def buildGLEW(path, deps, jobs):
+    if len(deps) > 0 and not "glew" in deps.keys():
+        return
+
+    print("Building GLEW...")
+
+    version = deps.get("glew")
+
+    build = loadModule("glew", "build")
+
+    # build standard
+    build.run(version, jobs=jobs)
+
+    print("Built GLEW.")
 
 
 def installGLEW(path, deps):
@@ -465,27 +693,30 @@ def installGLEW(path, deps):
 
     print("Installing GLEW...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['glew']}"]
+    version = deps.get("glew")
 
-    cwd = os.getcwd()
-    os.chdir("glew")
+    install = loadModule("glew", "install")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    # install
+    install.run(path, version)
 
-    # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    print("Installed GLEW.")
 
-    # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
 
-    os.chdir(cwd)
+def downloadNinja(path, deps):
+    if len(deps) > 0 and not "ninja" in deps.keys():
+        return
 
-    print("Installed GLEW.")
+    print("Downloading Ninja...")
+
+    version = deps.get("ninja")
+
+    build = loadModule("ninja", "build")
+
+    # ninja is never built from source, only downloaded
+    build.run(version)
+
+    print("Downloaded Ninja.")
 
 
 def installNinja(path, deps):
@@ -494,27 +725,29 @@ def installNinja(path, deps):
 
     print("Installing Ninja...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['ninja']}"]
+    version = deps.get("ninja")
 
-    cwd = os.getcwd()
-    os.chdir("ninja")
+    install = loadModule("ninja", "install")
 
-    buildPath = os.path.join(os.getcwd(), "build.py")
-    installPath = os.path.join(os.getcwd(), "install.py")
+    # install
+    install.run(path, version)
 
-    # build standard
-    cmd = [f"{pythonPath}", f"{buildPath}"] + version
-    runCmd(cmd)
+    print("Installed Ninja.")
 
-    # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
 
-    os.chdir(cwd)
+def downloadGLM(path, deps):
+    if len(deps) > 0 and not "glm" in deps.keys():
+        return
 
-    print("Installed Ninja.")
+    print("Downloading glm...")
+
+    version = deps.get("glm")
+
+    install = loadModule("glm", "install")
+
+    install.download(path, version)
+
+    print("Downloaded glm.")
 
 
 def installGLM(path, deps):
@@ -523,20 +756,12 @@ def installGLM(path, deps):
 
     print("Installing glm...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['glm']}"]
-
-    cwd = os.getcwd()
-    os.chdir("glm")
+    version = deps.get("glm")
 
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("glm", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run(path, version)
 
     print("Installed glm.")
 
@@ -547,16 +772,10 @@ def installSAIL(path, deps):
 
     print("Installing SAIL...")
 
-    cwd = os.getcwd()
-    os.chdir("sail")
-
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("sail", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}"]
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run()
 
     print("Installed SAIL.")
 
@@ -567,112 +786,654 @@ def installDoxygen(path, deps):
 
     print("Installing doxygen...")
 
-    cwd = os.getcwd()
-    os.chdir("doxygen")
-
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("doxygen", "install")
 
     # install standard
-    cmd = [f"{pythonPath}", f"{installPath}"]
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run()
 
     print("Installed doxygen.")
 
 
+def downloadVulkan(path, deps):
+    if len(deps) > 0 and not "vulkan" in deps.keys():
+        return
+
+    print("Downloading vulkan...")
+
+    version = deps.get("vulkan")
+
+    install = loadModule("vulkan", "install")
+
+    install.download(path, version)
+
+    print("Downloaded vulkan.")
+
+
 def installVulkan(path, deps):
     if len(deps) > 0 and not "vulkan" in deps.keys():
         return
 
     print("Installing vulkan...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['vulkan']}"]
-
-    cwd = os.getcwd()
-    os.chdir("vulkan")
+    version = deps.get("vulkan")
 
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("vulkan", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run(path, version)
 
     print("Installed vulkan.")
 
 
+def downloadVulkanMemoryAllocator(path, deps):
+    if len(deps) > 0 and not "vulkan_memory_allocator" in deps.keys():
+        return
+
+    print("Downloading vulkan memory allocator...")
+
+    version = deps.get("vulkan_memory_allocator")
+
+    install = loadModule("vulkan_memory_allocator", "install")
+
+    install.download(path, version)
+
+    print("Downloaded vulkan memory allocator.")
+
+
 def installVulkanMemoryAllocator(path, deps):
     if len(deps) > 0 and not "vulkan_memory_allocator" in deps.keys():
         return
 
     print("Installing vulkan memory allocator...")
 
-    version = []
-    if len(deps) > 0:
-        version = ["-v", f"{deps['vulkan_memory_allocator']}"]
-
-    cwd = os.getcwd()
-    os.chdir("vulkan_memory_allocator")
+    version = deps.get("vulkan_memory_allocator")
 
-    installPath = os.path.join(os.getcwd(), "install.py")
+    install = loadModule("vulkan_memory_allocator", "install")
 
     # install
-    cmd = [f"{pythonPath}", f"{installPath}", "-p", f"{path}"] + version
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    install.run(path, version)
 
     print("Installed vulkan memory allocator.")
 
 
-print("Installing all dependencies...")
+def getStageFunctions():
+    # each library is installed in up to three stages: downloading its
+    # pre-built binaries or source, building it and extracting it into the
+    # project
+    return {
+        # clang is extracted as it is downloaded
+        "clang": {"extract": installClang},
+        "v8": {"download": downloadv8, "build": buildv8, "extract": installv8},
+        "sdl": {"download": downloadSDL, "build": buildSDL, "extract": installSDL},
+        "sdl_image": {"download": downloadSDLimage, "build": buildSDLimage, "extract": installSDLimage},
+        "sdl_net": {"download": downloadSDLnet, "build": buildSDLnet, "extract": installSDLnet},
+        "sdl_ttf": {"download": downloadSDLttf, "build": buildSDLttf, "extract": installSDLttf},
+        "sdl_mixer": {"download": downloadSDLmixer, "build": buildSDLmixer, "extract": installSDLmixer},
+        "catch2": {"download": downloadCatch2, "build": buildCatch2, "extract": installCatch2},
+        "nlohmann_json": {"download": downloadNlohmannJson, "extract": installNlohmannJson},
+        "ranges-v3": {"download": downloadRangesV3, "extract": installRangesV3},
+        "libsodium": {"download": downloadlibSodium, "build": buildlibSodium, "extract": installlibSodium},
+        "sqlite3": {"download": downloadsqlite3, "build": buildsqlite3, "extract": installsqlite3},
+        "glew": {"download": downloadGLEW, "build": buildGLEW, "extract": installGLEW},
+        "ninja": {"download": downloadNinja, "extract": installNinja},
+        "glm": {"download": downloadGLM, "extract": installGLM},
+        "sail": {"extract": installSAIL},
+        "doxygen": {"extract": installDoxygen},
+        "vulkan": {"download": downloadVulkan, "extract": installVulkan},
+        "vulkan_memory_allocator": {"download": downloadVulkanMemoryAllocator, "extract": installVulkanMemoryAllocator},
+    }
+
+
+def getLibraryTools():
+    # the tools each library's scripts run, so upgrading one of them is
+    # noticed by the journal
+    return {
+        "clang": [],
+        "v8": ["git"],
+        "sdl": ["git", "cmake"],
+        "sdl_image": ["git", "sh", "make"],
+        "sdl_net": ["git", "sh", "make"],
+        "sdl_ttf": ["git", "cmake"],
+        "sdl_mixer": ["git", "sh", "make"],
+        "catch2": ["git", "cmake"],
+        "nlohmann_json": ["git"],
+        "ranges-v3": ["git"],
+        "libsodium": ["git", "sh", "make"],
+        "sqlite3": ["git", "sh", "make"],
+        "glew": ["cmake"],
+        "ninja": ["cmake"],
+        "glm": ["git"],
+        "vulkan": [],
+        "vulkan_memory_allocator": [],
+    }
+
+
+def isJournaled(name):
+    # brew decides for itself what needs installing, and does not report
+    # failures back, so those libraries are always handed to brew
+    return name in getLibraryTools()
+
+
+def getLibraryArtifacts(name, version):
+    install = loadModule(name, "install")
+
+    artifactPaths = install.getArtifactPaths(version)
+
+    # the iOS builds installed by installv8 and installlibSodium
+    if platform.system() == "Darwin":
+        if name == "v8":
+            artifactPaths += install.getArtifactPaths(version, buildForiOS=True)
+            artifactPaths += install.getArtifactPaths(version, buildForiOSSimulator=True)
+        elif name == "libsodium":
+            artifactPaths += install.getArtifactPaths(version, buildForiOS=True)
+
+    return artifactPaths
+
+
+def isLibraryInstalled(name, path, version):
+    # only looks for the installed files, so it is cheap enough to check
+    # every library on every run, and a library whose files were removed is
+    # installed again however unchanged its inputs are
+    install = loadModule(name, "install")
+
+    if not install.isInstalled(path, version):
+        return False
+
+    # the iOS builds installed by installv8 and installlibSodium
+    if platform.system() == "Darwin":
+        if name == "v8":
+            return install.isInstalled(path, version, buildForiOS=True) and install.isInstalled(path, version, buildForiOSSimulator=True)
+        elif name == "libsodium":
+            return install.isInstalled(path, version, buildForiOS=True)
+
+    return True
+
+
+def getLibraryFingerprint(projectJournal, name, version):
+    return journal.getFingerprint(projectJournal, name, version, getLibraryTools()[name], getLibraryArtifacts(name, version))
+
+
+def getLibraryProjects(projects, journals=None):
+    # maps each library to the versions wanted and, for each version, the
+    # install paths of the projects that want it. Projects whose journal
+    # shows the library is installed and nothing it depends on has changed
+    # are left out
+    libraries = {}
 
-args = configureArguments()
+    for name in getStageFunctions():
+        for path, deps in projects:
+            if len(deps) > 0 and not name in deps.keys():
+                continue
 
-deps = getProjectDependencies(args.path)
+            if journals is not None and isJournaled(name):
+                if journal.isFinished(journals[path], name, deps.get(name), getLibraryFingerprint(journals[path], name, deps.get(name)), isLibraryInstalled(name, path, deps.get(name))):
+                    continue
 
-installPath = os.path.join(args.path, "libraries")
+            versions = libraries.setdefault(name, {})
+            versions.setdefault(deps.get(name), []).append(path)
+
+    return libraries
+
+
+def runForEachPath(function, paths, deps):
+    for path in paths:
+        function(path, deps)
+
+
+def runBuild(function, path, deps, cores, buildJobserver):
+    if buildJobserver is None:
+        function(path, deps, cores)
+        return
+
+    # an explicit job count would make the build ignore the jobserver, so
+    # the jobserver alone decides how many jobs it runs. Every jobserver
+    # client runs its first job without asking, so that job's token is
+    # taken here for as long as the build runs
+    token = jobserver.acquire(buildJobserver)
+
+    try:
+        function(path, deps, None)
+    finally:
+        jobserver.release(buildJobserver, token)
+
+
+def getVersionName(name, version):
+    return f"{name} {version or '(default version)'}"
+
+
+def getInstallTasks(libraries, buildJobserver=None):
+    # a library is only built once all of the libraries it depends on have
+    # been installed
+    dependencies = {
+        "sdl": ["ninja"],
+        "sdl_image": ["sdl"],
+        "sdl_net": ["sdl"],
+        "sdl_ttf": ["sdl", "ninja"],
+        "sdl_mixer": ["sdl"],
+        "catch2": ["ninja"],
+        "glew": ["ninja"],
+        # brew holds a global lock, so only one brew install can run at a time
+        "doxygen": ["sail"],
+    }
+
+    # the cores and peak memory each library's build is expected to use, so
+    # concurrent builds are kept within what the machine has
+    gigabyte = 1024 * 1024 * 1024
+    buildRequirements = {
+        # linking v8 alone can use most of a 16 GB machine
+        "v8": {"cores": 16, "memory": 12 * gigabyte},
+        "sdl": {"cores": 8, "memory": 2 * gigabyte},
+        "sdl_image": {"cores": 4, "memory": 1 * gigabyte},
+        "sdl_net": {"cores": 2, "memory": 1 * gigabyte},
+        "sdl_ttf": {"cores": 4, "memory": 1 * gigabyte},
+        "sdl_mixer": {"cores": 4, "memory": 1 * gigabyte},
+        "catch2": {"cores": 8, "memory": 3 * gigabyte},
+        "libsodium": {"cores": 4, "memory": 1 * gigabyte},
+        "sqlite3": {"cores": 1, "memory": 1 * gigabyte},
+        "glew": {"cores": 2, "memory": 1 * gigabyte},
+    }
+
+    stageFunctions = getStageFunctions()
+
+    # the download and build stages write to the library's own directory, so
+    # they are shared by every project wanting the same version. Only the
+    # extract stage writes to a project
+    lastTaskNames = {}
+
+    tasks = {}
+
+    for name, versions in libraries.items():
+        lastTaskNames[name] = []
+        previousTaskName = None
+
+        for version, paths in versions.items():
+            versionName = getVersionName(name, version)
+            libraryDeps = {name: version} if version is not None else {}
+
+            for stage, function in stageFunctions[name].items():
+                taskDependencies = []
+
+                # different versions of a library share the same directories,
+                # so they are downloaded and built one after the other
+                if previousTaskName is not None:
+                    taskDependencies.append(previousTaskName)
+
+                # downloads do not need anything else to be installed first,
+                # so they can run ahead of the libraries being built
+                if stage != "download":
+                    for d in dependencies.get(name, []):
+                        taskDependencies += lastTaskNames.get(d, [])
+
+                if stage == "extract":
+                    for path in paths:
+                        taskName = f"{versionName}:{stage} ({path})"
+                        tasks[taskName] = (lambda cores, function=function, path=path, libraryDeps=libraryDeps: function(path, libraryDeps), taskDependencies, stage, {})
+
+                        lastTaskNames[name].append(taskName)
+                    continue
+
+                taskName = f"{versionName}:{stage}"
+
+                if stage == "build":
+                    # v8 builds with the ninja from depot_tools, which is only
+                    # fetched during the build and may be too old to use the
+                    # jobserver, so it is passed the cores it was given
+                    libraryJobserver = buildJobserver if name != "v8" else None
+
+                    # builds only write to the library's own directory
+                    tasks[taskName] = (lambda cores, function=function, path=paths[0], libraryDeps=libraryDeps, libraryJobserver=libraryJobserver: runBuild(function, path, libraryDeps, cores, libraryJobserver), taskDependencies, stage, buildRequirements.get(name, {}))
+                else:
+                    # libraries that are only downloaded skip the download
+                    # for a project that already has them installed, so every
+                    # project gets to ask for it. Anything already downloaded
+                    # is skipped
+                    tasks[taskName] = (lambda cores, function=function, paths=paths, libraryDeps=libraryDeps: runForEachPath(function, paths, libraryDeps), taskDependencies, stage, {})
+
+                previousTaskName = taskName
+
+    return tasks
+
+
+def recordFinished(libraries, failed, journals):
+    stageFunctions = getStageFunctions()
+
+    for name, versions in libraries.items():
+        if not isJournaled(name):
+            continue
+
+        for version, paths in versions.items():
+            versionName = getVersionName(name, version)
+
+            for path in paths:
+                taskNames = [f"{versionName}:{stage}" for stage in stageFunctions[name] if stage != "extract"]
+                taskNames.append(f"{versionName}:extract ({path})")
+
+                if any(t in failed for t in taskNames):
+                    continue
+
+                # some steps only print their errors, so only record the
+                # library once nothing is left to do for it
+                if len(getLibraryPlan(name, path, version)) > 0:
+                    continue
+
+                fingerprint = getLibraryFingerprint(journals[path], name, version)
+                journal.record(journals[path], name, version, list(stageFunctions[name]), fingerprint)
+
+    for path, projectJournal in journals.items():
+        journal.save(projectJournal, path)
+
+
+def printSharedWork(libraries):
+    projectCount = len(set(path for versions in libraries.values() for paths in versions.values() for path in paths))
+
+    if projectCount < 2:
+        return
+
+    stageFunctions = getStageFunctions()
+
+    shared = {}
+
+    for name, versions in libraries.items():
+        for version, paths in versions.items():
+            for stage in stageFunctions[name]:
+                if stage != "extract":
+                    shared[stage] = shared.get(stage, 0) + len(paths) - 1
+
+    print(f"Shared work between {projectCount} projects:")
+
+    for stage, count in shared.items():
+        print(f"    {count} {stage} steps avoided")
+
+
+def getLibraryPlan(name, path, version):
+    # only looks at what is already on disk, and asks for the size of
+    # downloads that are not already known, so this never runs a command
+    steps = []
+
+    if os.path.exists(os.path.join(rootDir, name, "build.py")):
+        build = loadModule(name, "build")
+        steps += build.plan(version)
+
+    install = loadModule(name, "install")
+
+    # brew decides for itself what needs installing
+    if name in ["sail", "doxygen"]:
+        return install.plan()
+
+    steps += install.plan(path, version)
+
+    # the iOS builds installed by installv8 and installlibSodium
+    if platform.system() == "Darwin":
+        if name == "v8":
+            steps += build.plan(version, build_for_ios=True)
+            steps += install.plan(path, version, buildForiOS=True)
+            steps += build.plan(version, build_for_ios_simulator=True)
+            steps += install.plan(path, version, buildForiOSSimulator=True)
+        elif name == "libsodium":
+            steps += build.plan(version, buildiOS=True)
+            steps += install.plan(path, version, buildForiOS=True)
+
+    return steps
+
+
+def getLibraryDownloads(name, version):
+    # the pre-built binaries the library's download stage would fetch
+    if not os.path.exists(os.path.join(rootDir, name, "build.py")):
+        return []
+
+    build = loadModule(name, "build")
+
+    if name == "v8":
+        downloads = build.get_downloads(version)
+
+        # the iOS builds downloaded by downloadv8
+        if platform.system() == "Darwin":
+            downloads += build.get_downloads(version, build_for_ios=True)
+            downloads += build.get_downloads(version, build_for_ios_simulator=True)
+
+        return downloads
+
+    downloads = build.getDownloads(version)
+
+    # the iOS build downloaded by downloadlibSodium
+    if platform.system() == "Darwin" and name == "libsodium":
+        downloads += build.getDownloads(version, buildiOS=True)
+
+    return downloads
+
+
+def getDigestDownloads(name, version, libraryDir):
+    # every file of the library checked against digests.json, downloaded to
+    # `libraryDir` instead of the library's own directory. Nothing is built
+    # there, so the binaries already installed are included too
+    if os.path.exists(os.path.join(rootDir, name, "build.py")):
+        build = loadModule(name, "build")
+
+        if name == "v8":
+            return build.get_downloads(version, library_dir=libraryDir)
+
+        return build.getDownloads(version, libraryDir=libraryDir)
+
+    install = loadModule(name, "install")
+
+    if not hasattr(install, "getDownloads"):
+        return []
+
+    return install.getDownloads(version, libraryDir=libraryDir)
+
+
+def recordDigests(projects):
+    libraries = getLibraryProjects(projects)
+
+    print("Recording the sha256 of every pre-built binary...")
+
+    # the downloads are thrown away afterwards. The cache keeps a copy
+    with tempfile.TemporaryDirectory() as tempDir:
+        downloads = []
+
+        for name, versions in libraries.items():
+            for version in versions:
+                downloads += getDigestDownloads(name, version, os.path.join(tempDir, name))
+
+        failed = digests.recordDownloads(downloads)
+
+    if len(failed) > 0:
+        print(f"Failed to record: {failed}")
+
+    print(f"Recorded the sha256 of every pre-built binary in `{digests.digestsPath}`.")
+
+
+def getDownloads(libraries):
+    downloads = []
+
+    for name, versions in libraries.items():
+        for version in versions:
+            downloads += getLibraryDownloads(name, version)
+
+    return downloads
+
+
+def formatSize(size):
+    if size is None:
+        return "size unknown"
+
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def getPlan(path, deps):
+    # the steps still needed by each library the project wants, as
+    # (name, version, steps)
+    plan = []
+
+    for name in getStageFunctions():
+        if len(deps) > 0 and not name in deps.keys():
+            continue
+
+        version = deps.get(name)
+        plan.append((name, version, getLibraryPlan(name, path, version)))
+
+    return plan
+
+
+def printPlan(path, plan):
+    print(f"Planned work for {path}:")
+
+    totals = {}
+
+    for name, version, steps in plan:
+        print(f"{name} {version or '(default version)'}:")
+
+        if len(steps) == 0:
+            print("    already installed")
+
+        for action, target, size in steps:
+            print(f"    {action}: {target} ({formatSize(size)})")
+
+            count, knownSize = totals.get(action, (0, 0))
+            totals[action] = (count + 1, knownSize + (size or 0))
+
+    print("Total:")
+
+    if len(totals) == 0:
+        print("    nothing to do")
+
+    for action, (count, knownSize) in totals.items():
+        print(f"    {action}: {count} ({formatSize(knownSize)} known)")
+
+
+def getProjects(paths):
+    projects = []
+
+    for projectPath in paths:
+        deps = getProjectDependencies(projectPath)
+        installPath = os.path.join(projectPath, "libraries")
+
+        projects.append((installPath, deps))
+
+    return projects
+
+
+def getStageLimits(args):
+    return {
+        "download": max(1, args.download_jobs),
+        "build": max(1, args.jobs),
+        "extract": max(1, args.extract_jobs),
+    }
+
+
+def getDaemonUnsupportedFlags(args):
+    # the daemon installs with the settings it was started with, so these
+    # would be ignored
+    flags = {
+        "--mirror": args.mirror is not None,
+        "--jobserver": args.jobserver is not None,
+        "--prefetch": args.prefetch,
+        "--no-journal": args.no_journal,
+        "--record-digests": args.record_digests,
+    }
+
+    return [flag for flag, isSet in flags.items() if isSet]
+
+
+def runWithDaemon(args):
+    # hand the work to a running daemon.py, which already has the libraries
+    # loaded and remembers what it has installed
+    unsupportedFlags = getDaemonUnsupportedFlags(args)
+
+    if len(unsupportedFlags) > 0:
+        print(f"{', '.join(unsupportedFlags)} cannot be used with --daemon, as the daemon installs with the settings it was started with.")
+        raise SystemExit(1)
+
+    paths = [os.path.abspath(p) for p in args.path]
+
+    if args.plan:
+        response = daemonclient.sendRequest(args.daemon, {"action": "plan", "paths": paths})
+
+        for installPath, plan in response["plans"]:
+            printPlan(installPath, [(name, version, [tuple(s) for s in steps]) for name, version, steps in plan])
+        return
+
+    print("Installing all dependencies with the daemon...")
+
+    response = daemonclient.sendRequest(args.daemon, {"action": "install", "paths": paths})
+
+    if len(response["failed"]) > 0:
+        print(f"Failed to install: {response['failed']}")
+
+    print("Installed all dependencies.")
+
+
+def main():
+    args = configureArguments()
+
+    # read by every download, including those in the libraries' scripts
+    if args.mirror is not None:
+        os.environ[mirrors.mirrorsVariable] = " ".join(args.mirror)
+
+    if args.daemon is not None:
+        runWithDaemon(args)
+        return
+
+    projects = getProjects(args.path)
+
+    if args.record_digests:
+        recordDigests(projects)
+        return
+
+    if args.plan:
+        for installPath, deps in projects:
+            printPlan(installPath, getPlan(installPath, deps))
+        return
 
-installClang(installPath, deps)
+    print("Installing all dependencies...")
 
-installv8(installPath, deps)
+    journals = None
 
-installSDL(installPath, deps)
+    if not args.no_journal:
+        journals = {installPath: journal.load(installPath) for installPath, deps in projects}
 
-installSDLimage(installPath, deps)
+    libraries = getLibraryProjects(projects, journals)
 
-installSDLnet(installPath, deps)
+    # the download stages then find the binaries already there
+    if args.prefetch:
+        failedPrefetches = prefetch.run(getDownloads(libraries), args.prefetch_per_host)
 
-installSDLttf(installPath, deps)
+        if len(failedPrefetches) > 0:
+            print(f"Failed to prefetch, leaving them for the download stages: {failedPrefetches}")
 
-installSDLmixer(installPath, deps)
+    buildJobserver = None
 
-installCatch2(installPath, deps)
+    if args.jobserver is not None:
+        unsupportedReason = jobserver.getUnsupportedReason()
 
-installNlohmannJson(installPath, deps)
+        if unsupportedReason is None:
+            buildJobserver = jobserver.create(max(1, args.jobserver))
 
-installRangesV3(installPath, deps)
+            # every build started from here inherits the jobserver
+            os.environ["MAKEFLAGS"] = jobserver.getMakeFlags(buildJobserver)
+        else:
+            # each build is passed the cores it was given instead
+            print(f"A jobserver cannot be used: {unsupportedReason}.")
 
-installlibSodium(installPath, deps)
+    tasks = getInstallTasks(libraries, buildJobserver)
 
-installsqlite3(installPath, deps)
+    failed = scheduler.runTasks(tasks, getStageLimits(args))
 
-installGLEW(installPath, deps)
+    if buildJobserver is not None:
+        jobserver.close(buildJobserver)
 
-installNinja(installPath, deps)
+    downloader.closeIdleConnections()
 
-installGLM(installPath, deps)
+    if journals is not None:
+        recordFinished(libraries, failed, journals)
 
-installSAIL(installPath, deps)
+    printSharedWork(libraries)
 
-installDoxygen(installPath, deps)
+    if len(failed) > 0:
+        print(f"Failed to install: {failed}")
 
-installVulkan(installPath, deps)
+    print("Installed all dependencies.")
 
-installVulkanMemoryAllocator(installPath, deps)
 
-print("Installed all dependencies.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
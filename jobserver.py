@@ -0,0 +1,89 @@
+import os
+import re
+import shutil
+import tempfile
+import subprocess
+
+# the first versions that find a fifo jobserver through MAKEFLAGS. Older
+# versions of make stop with an error at `--jobserver-auth=fifo:`, and older
+# versions of ninja ignore it and run as many jobs as they like
+minimumVersions = {
+    "make": (4, 4),
+    "ninja": (1, 13),
+}
+
+
+def getToolVersion(tool):
+    # the version of `tool` on the PATH as a tuple, None if it is not there,
+    # or () if its version could not be read
+    toolPath = shutil.which(tool)
+
+    if toolPath is None:
+        return None
+
+    try:
+        output = subprocess.run([toolPath, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ()
+
+    match = re.search(r"(\d+)\.(\d+)", output)
+
+    if match is None:
+        return ()
+
+    return tuple(int(part) for part in match.groups())
+
+
+def getUnsupportedReason():
+    # why a jobserver cannot be used here, or None if it can. Every build
+    # tool that is installed must understand it
+    if not hasattr(os, "mkfifo"):
+        return "fifos are not supported on this platform"
+
+    for tool, minimumVersion in minimumVersions.items():
+        version = getToolVersion(tool)
+
+        if version is not None and version < minimumVersion:
+            return f"{tool} {'.'.join(str(v) for v in minimumVersion)} or newer is needed"
+
+    return None
+
+
+def isSupported():
+    return getUnsupportedReason() is None
+
+
+def create(tokens):
+    # a GNU make jobserver: a fifo holding one byte per job that may run.
+    # GNU make 4.4 and newer, and ninja 1.13 and newer, find it through
+    # MAKEFLAGS and take a byte before starting each job beyond their first
+    directory = tempfile.mkdtemp(prefix="project-dependencies-")
+    path = os.path.join(directory, "jobserver")
+
+    os.mkfifo(path, 0o600)
+
+    # opened for reading and writing so that neither end blocks while no
+    # build has the fifo open
+    fd = os.open(path, os.O_RDWR)
+
+    os.write(fd, b"+" * tokens)
+
+    return {"directory": directory, "path": path, "fd": fd, "tokens": tokens}
+
+
+def getMakeFlags(jobserver):
+    return f"-j{jobserver['tokens']} --jobserver-auth=fifo:{jobserver['path']}"
+
+
+def acquire(jobserver):
+    # blocks until a token is free
+    return os.read(jobserver["fd"], 1)
+
+
+def release(jobserver, token):
+    os.write(jobserver["fd"], token)
+
+
+def close(jobserver):
+    os.close(jobserver["fd"])
+    shutil.rmtree(jobserver["directory"], ignore_errors=True)
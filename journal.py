@@ -0,0 +1,102 @@
+import os
+import json
+import shutil
+import hashlib
+import platform
+
+fileName = "journal.json"
+
+
+def getJournalPath(installPath):
+    return os.path.join(installPath, fileName)
+
+
+def load(installPath):
+    # the libraries installed into a project, each with the fingerprint of
+    # everything that went into installing it
+    try:
+        with open(getJournalPath(installPath)) as journalFile:
+            return json.load(journalFile)
+    except (OSError, ValueError):
+        return {"libraries": {}, "artifacts": {}}
+
+
+def save(journal, installPath):
+    journalPath = getJournalPath(installPath)
+    partialPath = f"{journalPath}.part"
+
+    os.makedirs(installPath, exist_ok=True)
+
+    # written to a separate file first, so an interrupted run never leaves a
+    # half written journal behind
+    with open(partialPath, "w") as journalFile:
+        json.dump(journal, journalFile, indent=4, sort_keys=True)
+
+    os.replace(partialPath, journalPath)
+
+
+def getToolIdentity(name):
+    # running every tool to ask for its version would take longer than the
+    # rest of a run, and an upgrade always replaces the executable, so its
+    # size and modification time stand in for the version
+    toolPath = shutil.which(name)
+
+    if toolPath is None:
+        return None
+
+    toolPath = os.path.realpath(toolPath)
+    stat = os.stat(toolPath)
+
+    return [toolPath, stat.st_size, stat.st_mtime_ns]
+
+
+def getArtifactHash(journal, artifactPath):
+    try:
+        stat = os.stat(artifactPath)
+    except OSError:
+        return None
+
+    # hashing a large archive on every run would take seconds, so the hash
+    # is only worked out again once the file has changed
+    cached = journal["artifacts"].get(artifactPath)
+
+    if cached is not None and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+        return cached["sha256"]
+
+    sha256 = hashlib.sha256()
+
+    with open(artifactPath, "rb") as artifactFile:
+        for chunk in iter(lambda: artifactFile.read(1024 * 1024), b""):
+            sha256.update(chunk)
+
+    journal["artifacts"][artifactPath] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha256.hexdigest()}
+
+    return sha256.hexdigest()
+
+
+def getFingerprint(journal, name, version, tools, artifactPaths):
+    inputs = {
+        "library": name,
+        "version": version,
+        "platform": [platform.system(), platform.machine()],
+        "tools": {tool: getToolIdentity(tool) for tool in tools},
+        "artifacts": {path: getArtifactHash(journal, path) for path in artifactPaths},
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def isFinished(journal, name, version, fingerprint, installed):
+    # the fingerprint only covers what went into the install, so whether the
+    # installed files are still there is checked by the caller and passed in
+    # as `installed`
+    if not installed:
+        return False
+
+    entry = journal["libraries"].get(name)
+
+    return entry is not None and entry["version"] == version and entry["fingerprint"] == fingerprint
+
+
+def record(journal, name, version, steps, fingerprint):
+    journal["libraries"][name] = {"version": version, "steps": steps, "fingerprint": fingerprint}
@@ -1,18 +1,27 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
-version = "1.0.18"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import mirrors
+import downloader
+import gitsource
+
+defaultVersion = "1.0.18"
 gitUrl = "https://github.com/jedisct1/libsodium.git"
 
-gitPath = shutil.which("git")
-curlPath = shutil.which("curl")
 shPath = shutil.which("sh")
 makePath = shutil.which("make")
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
@@ -45,20 +54,33 @@ def runCmd(cmd, cwd=None):
     subprocess.run(cmd, cwd=cwd)
 
 
-def runCmdIgnoreError(cmd):
-    print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
+def getSourcePath(tempDirPath):
+    return os.path.join(tempDirPath, "libsodium")
+
+
+def isSourceDownloaded(version, tempDirPath):
+    # checking out the version creates a branch named after it
+    branchPath = os.path.join(getSourcePath(tempDirPath), ".git", "refs", "heads", f"{version}")
+
+    return os.path.exists(branchPath)
+
+
+def downloadSource(version, tempDirPath):
+    sourcePath = getSourcePath(tempDirPath)
+
+    if isSourceDownloaded(version, tempDirPath):
+        print("Source already downloaded.")
+        return sourcePath
+
+    createDirectories(tempDirPath)
+
+    # only the version we want, not the whole history
+    gitsource.cloneTag(gitUrl, f"{version}", f"{version}", sourcePath)
+
+    return sourcePath
 
 
-def build(buildiOS, tempDirPath):
+def build(version, buildiOS, tempDirPath, jobs):
     print("Starting build...")
 
     if platform.system() != "Darwin" and buildiOS:
@@ -69,51 +91,40 @@ def build(buildiOS, tempDirPath):
         print("Please build manually on Windows.")
         return
 
-    createDirectories(tempDirPath)
-
-    os.chdir(tempDirPath)
-
-    # get the latest code
-    cmd = [gitPath, "clone", f"{gitUrl}"]
-    runCmd(cmd)
-
-    sourceDir = os.path.join(os.getcwd(), "libsodium")
-    os.chdir(sourceDir)
-
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/{version}", "-b", f"{version}"]
-    runCmd(cmd)
+    sourceDir = downloadSource(version, tempDirPath)
 
     cmd = [shPath, "autogen.sh"]
-    runCmd(cmd)
+    runCmd(cmd, sourceDir)
 
     if platform.system() == "Darwin":
         if buildiOS:
             cmd = [shPath, "./dist-build/ios.sh"]
         else:
             cmd = [shPath, "./dist-build/osx.sh"]
-        runCmd(cmd)
+        runCmd(cmd, sourceDir)
     elif platform.system() == "Linux":
         installDir = os.path.join(sourceDir, "libsodium-linux")
 
         cmd = [shPath, "./configure", f"--prefix={installDir}"]
-        runCmd(cmd)
+        runCmd(cmd, sourceDir)
 
         cmd = [makePath]
-        runCmd(cmd)
+        if jobs is not None:
+            cmd.append(f"-j{jobs}")
+        runCmd(cmd, sourceDir)
 
         cmd = [makePath, "check"]
-        runCmd(cmd)
+        if jobs is not None:
+            cmd.append(f"-j{jobs}")
+        runCmd(cmd, sourceDir)
 
         cmd = [makePath, "install"]
-        runCmd(cmd)
-
-    os.chdir(cwd)
+        runCmd(cmd, sourceDir)
 
     print("Finished build.")
 
 
-def saveResults(buildiOS, tempDirPath):
+def saveResults(version, buildiOS, libraryDir, tempDirPath):
     if platform.system() == "Windows":
         # building on Windows is manual
         return
@@ -134,21 +145,21 @@ def saveResults(buildiOS, tempDirPath):
 
     platformLibName = getPlatformLibName(buildiOS)
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-    saveBinaries(destLibDir, platformLibName, resultsPath)
+    saveBinaries(version, destLibDir, platformLibName, resultsPath)
 
     print("Saved results.")
 
 
-def saveBinaries(destLibDir, platformLibName, resultsPath):
+def saveBinaries(version, destLibDir, platformLibName, resultsPath):
     createDirectories(destLibDir)
 
     resultsLibDir = os.path.join(resultsPath, "lib")
     resultsIncludeDir = os.path.join(resultsPath, "include")
     resultsIncludesDir = os.path.join(resultsIncludeDir, "sodium")
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     with zipfile.ZipFile(zipDir, "w") as zip:
         for root, dirs, files in os.walk(resultsLibDir):
@@ -170,37 +181,34 @@ def getPlatformLibName(buildiOS):
     return platform.system()
 
 
-def getZipPath(destLibDir, platformLibName):
+def getZipPath(version, destLibDir, platformLibName):
     return os.path.join(destLibDir, f"{version}_{platformLibName}.zip")
 
 
-def doesNeedBuilding(buildiOS):
+def doesNeedBuilding(version, buildiOS, libraryDir):
     platformLibName = getPlatformLibName(buildiOS)
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     isBuilt = os.path.exists(zipDir)
 
     return not isBuilt
 
 
-def tryAndDownloadBinaries(buildiOS):
-    
+def tryAndDownloadBinaries(version, buildiOS, libraryDir):
     # as we build both ios and ios simulator together, try and
     # download them together
     if platform.system() == "Darwin":
-        result = downloadBinaries(buildiOS)
+        result = downloadBinaries(version, buildiOS, libraryDir)
         return result
     else:
-        result = downloadBinaries(False)
+        result = downloadBinaries(version, False, libraryDir)
         return result
 
 
-def downloadBinaries(buildiOS):
-    print("Trying to download pre-built binaries...")
-
+def getBinaryURL(version, buildiOS):
     sdlDownloadURLWindows = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/libSodium_{version}/{version}_Windows.zip"
     sdlDownloadURLDarwin = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/libSodium_{version}/{version}_Darwin.zip"
     sdlDownloadURLiOS = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/libSodium_{version}/{version}_iOS.zip"
@@ -219,55 +227,136 @@ def downloadBinaries(buildiOS):
     elif systemName == "Linux":
         url = sdlDownloadURLLinux
     else:
-        print(f"Unknown system name: {systemName}")
-        return False
+        return ""
+
+    return url
+
+
+def downloadBinaries(version, buildiOS, libraryDir):
+    print("Trying to download pre-built binaries...")
+
+    url = getBinaryURL(version, buildiOS)
 
     if url == "":
+        print(f"Unknown system name: {platform.system()}")
+        return False
+
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
         return False
 
     platformLibName = getPlatformLibName(buildiOS)
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
-    zipDir = getZipPath(destLibDir, platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
-    result = downloadBinary(url, zipDir)
+    result = downloadBinary(url, zipDir, version, platformLibName)
 
     print("Finished trying.")
 
     return result
 
 
-def downloadBinary(url, outputPath):
+def downloadBinary(url, outputPath, version, platformName):
     print(f"Trying to download url: '{url}' to path: '{outputPath}'")
 
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{outputPath}", f"{url}"]
-
-    if runCmdIgnoreError(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("libsodium", version, platformName, url, outputPath)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
 
-print(f"Building libSoduim version {version}...")
 
-args = configureArguments()
+def download(version=None, buildiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
+    tempDirPath = os.path.join(libraryDir, "__temp")
 
-cwd = os.getcwd()
-tempDirPath = os.path.join(cwd, "__temp")
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return
 
-if doesNeedBuilding(args.ios):
-    if tryAndDownloadBinaries(args.ios):
+    if tryAndDownloadBinaries(version, buildiOS, libraryDir):
         print("Downloaded pre-built binaries.")
     else:
-        build(args.ios, tempDirPath)
+        downloadSource(version, tempDirPath)
+
+
+def getDownloads(version=None, buildiOS=False, libraryDir=libraryDir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return []
+
+    url = getBinaryURL(version, buildiOS)
+
+    if url == "":
+        return []
+
+    platformLibName = getPlatformLibName(buildiOS)
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("libsodium", version, platformLibName, url, zipDir)]
+
+
+def plan(version=None, buildiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return []
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    # a previous run already fell back to building from source
+    if isSourceDownloaded(version, tempDirPath):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    # no pre-built binaries have been published, going by the indexes
+    # already fetched
+    if not mirrors.isAvailable(getBinaryURL(version, buildiOS), fetchIndexes=False):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    platformLibName = getPlatformLibName(buildiOS)
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("download", zipDir, downloader.getKnownSize(getBinaryURL(version, buildiOS)))]
+
+
+def run(version=None, buildiOS=False, libraryDir=libraryDir, jobs=None):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print(f"Building libSoduim version {version}...")
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    if doesNeedBuilding(version, buildiOS, libraryDir):
+        download(version, buildiOS, libraryDir)
+
+        if doesNeedBuilding(version, buildiOS, libraryDir):
+            build(version, buildiOS, tempDirPath, jobs)
+
+            saveResults(version, buildiOS, libraryDir, tempDirPath)
+    else:
+        print("libSodium is already built...")
+
+    print(f"Built libSodium version {version}.")
+
 
-        saveResults(args.ios, tempDirPath)
-else:
-    print("libSodium is already built...")
+if __name__ == "__main__":
+    args = configureArguments()
 
-print(f"Built libSodium version {version}.")
\ No newline at end of file
+    run(args.version, args.ios)
@@ -4,7 +4,9 @@ import platform
 import argparse
 import zipfile
 
-sdlVersion = "1.0.18"
+defaultVersion = "1.0.18"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -77,25 +79,25 @@ def getPlatformName(buildForiOS):
     return platformName
 
 
-def getBinaryOutPath(buildForiOS):
+def getBinaryOutPath(buildForiOS, libraryDir):
     platformName = getPlatformName(buildForiOS)
 
-    binaryOut = os.path.join(os.getcwd(), "lib", platformName)
+    binaryOut = os.path.join(libraryDir, "lib", platformName)
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath, buildForiOS):
+def getOutputZipPath(version, binaryOutPath, buildForiOS):
     platformName = getPlatformName(buildForiOS)
 
-    zipPath = os.path.join(binaryOutPath, f"{sdlVersion}_{platformName}.zip")
+    zipPath = os.path.join(binaryOutPath, f"{version}_{platformName}.zip")
 
     return zipPath
 
 
-def install(path, buildForiOS):
-    binaryPath = getBinaryOutPath(buildForiOS)
-    zipPath = getOutputZipPath(binaryPath, buildForiOS)
+def install(version, path, buildForiOS, libraryDir):
+    binaryPath = getBinaryOutPath(buildForiOS, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS)
 
     installDir = getFullInstallDir(path, buildForiOS)
 
@@ -105,16 +107,50 @@ def install(path, buildForiOS):
         zip.extractall(installDir)
 
 
-print("Installing libSodium...")
+def isInstalled(path, version=None, buildForiOS=False):
+    return isSDLAlreadyInstalled(path, buildForiOS)
+
+
+def getArtifactPaths(version=None, buildForiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    binaryPath = getBinaryOutPath(buildForiOS, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS)
+
+    return [zipPath]
+
+
+def plan(path, version=None, buildForiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isSDLAlreadyInstalled(path, buildForiOS):
+        return []
+
+    binaryPath = getBinaryOutPath(buildForiOS, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, buildForiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing libSodium...")
+
+    if isSDLAlreadyInstalled(path, buildForiOS):
+        print("libSodium already installed.")
+    else:
+        install(version, path, buildForiOS, libraryDir)
 
-args = configureArguments()
+    print("Installed libSodium.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isSDLAlreadyInstalled(args.path, args.ios):
-    print("libSodium already installed.")
-else:
-    install(args.path, args.ios)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed libSodium.")
+    run(args.path, args.version, args.ios)
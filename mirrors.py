@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import threading
+import http.client
+import concurrent.futures
+
+import artifactcache
+import artifactindex
+import downloader
+import extractor
+
+# pre-built binaries are published as GitHub releases, with the same layout
+# of `<Lib>_<version>/<version>_<Platform>.zip` under each of these. A mirror
+# holds copies of them under that same layout, below its own URL
+releaseURLs = [
+    "https://github.com/snowmeltarcade/project-dependencies/releases/download/",
+    "https://github.com/richardjhughes/project-dependencies/releases/download/",
+]
+
+# mirrors are listed, in order of preference, in PROJECT_DEPENDENCIES_MIRRORS
+# separated by spaces, or in mirrors.json in the root of the repository
+mirrorsVariable = "PROJECT_DEPENDENCIES_MIRRORS"
+mirrorsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mirrors.json")
+
+# each mirror is timed fetching the start of the first file asked of it. The
+# mirror expected to fetch a file of `referenceSize` soonest is tried first
+probeSize = 256 * 1024
+probeTimeout = 10
+referenceSize = 32 * 1024 * 1024
+
+# mirror URL to when it was timed and its (latency, throughput), or None if
+# it could not be reached. Mirrors are timed again once their timing is this
+# old, in seconds, so a long running process notices mirrors slowing down or
+# coming back
+probeMaxAge = 10 * 60
+probes = {}
+probesLock = threading.Lock()
+
+
+def getMirrors():
+    mirrors = os.environ.get(mirrorsVariable)
+
+    if mirrors is not None:
+        mirrors = mirrors.split()
+    else:
+        try:
+            with open(mirrorsPath) as mirrorsFile:
+                mirrors = json.load(mirrorsFile)
+        except (OSError, ValueError):
+            mirrors = []
+
+    return [m if m.endswith("/") else f"{m}/" for m in mirrors]
+
+
+def getReleaseURL(url):
+    # the releases `url` was published to, or None if it is not a pre-built
+    # binary of this repository
+    for releaseURL in releaseURLs:
+        if url.startswith(releaseURL):
+            return releaseURL
+
+    return None
+
+
+def getCandidates(url):
+    # every copy of `url` as (mirror, URL), in order of preference. The
+    # original comes last, with its releases as its mirror
+    releaseURL = getReleaseURL(url)
+
+    if releaseURL is None:
+        return [(None, url)]
+
+    releasePath = url[len(releaseURL):]
+
+    return [(mirror, f"{mirror}{releasePath}") for mirror in getMirrors()] + [(releaseURL, url)]
+
+
+def getPublishedCandidates(url, fetchIndexes=True):
+    # the same as getCandidates, leaving out the copies that the index of
+    # their mirror says are not there
+    releaseURL = getReleaseURL(url)
+
+    if releaseURL is None:
+        return getCandidates(url)
+
+    releasePath = url[len(releaseURL):]
+
+    return [(mirror, candidateURL) for mirror, candidateURL in getCandidates(url) if artifactindex.isPublished(mirror, releasePath, fetchIndexes) is not False]
+
+
+def isAvailable(url, fetchIndexes=True):
+    # whether `url` can be downloaded from anywhere, without trying to. Only
+    # False if every index says it is missing. Without `fetchIndexes`, only
+    # indexes already fetched are used, for planning
+    return len(getPublishedCandidates(url, fetchIndexes)) > 0
+
+
+def probe(url):
+    # times fetching the start of `url`. Raises downloader.HTTPStatusError if
+    # it is not there
+    start = time.monotonic()
+
+    finalURL, key, connection, response = downloader.openURL(url, headers={"Range": f"bytes=0-{probeSize - 1}"}, timeout=probeTimeout)
+
+    latency = time.monotonic() - start
+
+    try:
+        size = len(response.read(probeSize))
+    except (http.client.HTTPException, OSError):
+        connection.close()
+        raise
+
+    elapsed = max(time.monotonic() - start - latency, 0.001)
+
+    # a server that ignored the range is sending the whole file
+    if response.status == 206:
+        response.read()
+        downloader.finishResponse(key, connection, response)
+    else:
+        connection.close()
+
+    return latency, size / elapsed
+
+
+def getProbe(mirror, url):
+    with probesLock:
+        if mirror in probes and time.monotonic() - probes[mirror][0] <= probeMaxAge:
+            return probes[mirror][1]
+
+    try:
+        result = probe(url)
+    except downloader.HTTPStatusError:
+        # the mirror answered, but without this file. That says nothing about
+        # how fast it is
+        return None
+    except (downloader.DownloadError, http.client.HTTPException, OSError) as error:
+        print(f"Mirror `{mirror}` could not be reached: {error}")
+        result = None
+
+    with probesLock:
+        probes[mirror] = (time.monotonic(), result)
+
+    return result
+
+
+def getEstimatedTime(result):
+    latency, throughput = result
+
+    return latency + referenceSize / max(throughput, 1)
+
+
+def rankCandidates(candidates):
+    # the candidates from fastest to slowest. Those that could not be reached,
+    # or are missing, are left out
+    if len(candidates) == 1:
+        return [candidateURL for mirror, candidateURL in candidates]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        results = list(executor.map(lambda c: getProbe(c[0], c[1]), candidates))
+
+    ranked = []
+
+    # the order mirrors were listed in breaks ties
+    for index, ((mirror, candidateURL), result) in enumerate(zip(candidates, results)):
+        if result is not None:
+            ranked.append((getEstimatedTime(result), index, candidateURL))
+
+    return [candidateURL for estimatedTime, index, candidateURL in sorted(ranked)]
+
+
+def fetch(url, expectedDigest, fetchCandidate):
+    # calls `fetchCandidate` with each copy of `url`, fastest first, until one
+    # succeeds. Files are cached by their original URL, so a cached file is
+    # used without timing any mirror
+    if expectedDigest is not None and artifactcache.getBlob(url, expectedDigest) is not None:
+        return fetchCandidate(url)
+
+    published = getPublishedCandidates(url)
+
+    # the same as isAvailable, decided without a single request for the file
+    # itself
+    if len(published) == 0:
+        raise downloader.DownloadError(f"`{url}` has not been published")
+
+    candidates = rankCandidates(published)
+
+    if len(candidates) == 0:
+        # nothing answered, so the original gives the most useful error
+        candidates = [url]
+
+    lastError = None
+
+    for candidateURL in candidates:
+        try:
+            return fetchCandidate(candidateURL)
+        except downloader.DownloadError as error:
+            if candidateURL != candidates[-1]:
+                print(f"{error}, trying the next mirror...")
+
+            lastError = error
+
+    raise lastError
+
+
+def download(url, outputPath, expectedDigest=None, onProgress=None):
+    # the same as downloader.download, from the fastest mirror of `url`
+    return fetch(url, expectedDigest, lambda candidateURL: downloader.download(candidateURL, outputPath, expectedDigest=expectedDigest, cacheKey=url, onProgress=onProgress))
+
+
+def downloadAndExtract(url, outputDir, stripComponents=0, expectedDigest=None):
+    # the same as extractor.downloadAndExtract, from the fastest mirror of `url`
+    return fetch(url, expectedDigest, lambda candidateURL: extractor.downloadAndExtract(candidateURL, outputDir, stripComponents, expectedDigest=expectedDigest, cacheKey=url))
@@ -1,14 +1,23 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 
-version = "1.11.1"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import mirrors
+import downloader
+
+defaultVersion = "1.11.1"
 
 gitPath = shutil.which("git")
 cmakePath = shutil.which("cmake")
-curlPath = shutil.which("curl")
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -41,38 +50,23 @@ def runCmd(cmd, cwd=None):
     subprocess.run(cmd, cwd=cwd)
 
 
-def runCmdIgnoreError(cmd):
-    print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
-
-
-def getZipPath(destLibDir, platformLibName):
+def getZipPath(version, destLibDir, platformLibName):
     return os.path.join(destLibDir, f"{version}_{platformLibName}.zip")
 
 
-def doesNeedBuilding():
+def doesNeedBuilding(version, libraryDir):
     platformLibName = platform.system()
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     isBuilt = os.path.exists(zipDir)
 
     return not isBuilt
 
 
-def downloadBinaries():
-    print("Trying to download pre-built binaries...")
-
+def getBinaryURL(version):
     # we will just download the prebuilt releases from github
     downloadURLWindows = f"https://github.com/ninja-build/ninja/releases/download/v{version}/ninja-win.zip"
     downloadURLDarwin = f"https://github.com/ninja-build/ninja/releases/download/v{version}/ninja-mac.zip"
@@ -88,53 +82,106 @@ def downloadBinaries():
     elif system_name == "Linux":
         url = downloadURLLinux
     else:
-        print(f"Unknown system name: {system_name}")
-        return False
+        return ""
+
+    return url
+
+
+def downloadBinaries(version, libraryDir):
+    print("Trying to download pre-built binaries...")
+
+    url = getBinaryURL(version)
 
     if url == "":
+        print(f"Unknown system name: {platform.system()}")
+        return False
+
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
         return False
 
     platformLibName = platform.system()
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
-    zipDir = getZipPath(destLibDir, platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
-    result = downloadBinary(url, zipDir)
+    result = downloadBinary(url, zipDir, version, platformLibName)
 
     print("Finished trying.")
 
     return result
 
 
-def downloadBinary(url, output_path):
+def downloadBinary(url, output_path, version, platformName):
     print(f"Trying to download url: '{url}' to path: '{output_path}'")
 
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{output_path}", f"{url}"]
-
-    if runCmdIgnoreError(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("ninja", version, platformName, url, output_path)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
+
+
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, libraryDir):
+        return []
+
+    url = getBinaryURL(version)
+
+    if url == "":
+        return []
+
+    platformLibName = platform.system()
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
-print(f"Building Ninja version {version}...")
+    return [("ninja", version, platformLibName, url, zipDir)]
 
-args = configureArguments()
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
+def plan(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-cwd = os.getcwd()
-tempDirPath = os.path.join(cwd, "__temp")
+    if not doesNeedBuilding(version, libraryDir):
+        return []
 
-if doesNeedBuilding():
-    if downloadBinaries():
-        print("Downloaded pre-built binaries.")
+    platformLibName = platform.system()
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("download", zipDir, downloader.getKnownSize(getBinaryURL(version)))]
+
+
+def run(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print(f"Building Ninja version {version}...")
+
+    if doesNeedBuilding(version, libraryDir):
+        if downloadBinaries(version, libraryDir):
+            print("Downloaded pre-built binaries.")
+        else:
+            print("Failed to download pre-build binaries.")
     else:
-        print("Failed to download pre-build binaries.")
-else:
-    print("Ninja is already built...")
+        print("Ninja is already built...")
+
+    print(f"Built Ninja version {version}.")
+
+
+if __name__ == "__main__":
+    args = configureArguments()
 
-print(f"Built Ninja version {version}.")
\ No newline at end of file
+    run(args.version)
@@ -7,7 +7,9 @@ import subprocess
 
 chmodPath = shutil.which("chmod")
 
-version = "1.11.1"
+defaultVersion = "1.11.1"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -64,15 +66,15 @@ def isAlreadyInstalled(path):
     return filesExist
 
 
-def getBinaryOutPath():
+def getBinaryOutPath(libraryDir):
     platformName = platform.system()
 
-    binaryOut = os.path.join(os.getcwd(), "lib", platformName)
+    binaryOut = os.path.join(libraryDir, "lib", platformName)
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath):
+def getOutputZipPath(version, binaryOutPath):
     platformName = platform.system()
 
     zipPath = os.path.join(binaryOutPath, f"{version}_{platformName}.zip")
@@ -80,9 +82,9 @@ def getOutputZipPath(binaryOutPath):
     return zipPath
 
 
-def install(path):
-    binaryPath = getBinaryOutPath()
-    zipPath = getOutputZipPath(binaryPath)
+def install(version, path, libraryDir):
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
 
     installDir = getFullInstallDir(path)
 
@@ -99,16 +101,50 @@ def install(path):
         runCmd(cmd)
 
 
-print("Installing Ninja...")
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    return [zipPath]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing Ninja...")
+
+    if isAlreadyInstalled(path):
+        print("Ninja already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed Ninja.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("Ninja already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed Ninja.")
\ No newline at end of file
+    run(args.path, args.version)
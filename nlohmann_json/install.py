@@ -1,14 +1,24 @@
 import os
+import sys
+import json
 import shutil
 import platform
 import argparse
 import subprocess
-import zipfile
 
-version = "3.9.1"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gitsource
+
+defaultVersion = "3.9.1"
 gitURL = "https://github.com/nlohmann/json.git"
 
-gitPath = shutil.which("git")
+# the headers are all that is installed, under the same paths as in the
+# repository
+includePaths = ["include", "single_include"]
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -48,59 +58,130 @@ def getFullInstallDir(path):
     return installDir
 
 
-def isAlreadyInstalled(path):
-    installDir = getFullInstallDir(path)
+def getManifestPath(path):
+    return os.path.join(getFullInstallDir(path), "manifest.json")
+
+
+def isAlreadyInstalled(path, version):
+    # the manifest is written last, so it is only there once everything it
+    # lists has been installed
+    try:
+        with open(getManifestPath(path)) as manifestFile:
+            manifest = json.load(manifestFile)
+    except (OSError, ValueError):
+        return False
+
+    return manifest.get("version") == version and manifest.get("paths") == includePaths
+
 
-    filesExist = os.path.exists(installDir)
+def getTempDirPath(libraryDir):
+    return os.path.join(libraryDir, "__temp", "nlohmann_json")
 
-    return filesExist
 
+def getSourcePath(libraryDir):
+    return os.path.join(getTempDirPath(libraryDir), "json")
 
-def install(path):
-    cwd = os.getcwd()
+
+def getBranchPath(version, libraryDir):
+    # checking out the version creates a branch named after it
+    return os.path.join(getSourcePath(libraryDir), ".git", "refs", "heads", f"v{version}")
+
+
+def isSourceDownloaded(version, libraryDir):
+    return os.path.exists(getBranchPath(version, libraryDir))
+
+
+def downloadSource(version, libraryDir):
+    sourcePath = getSourcePath(libraryDir)
+
+    if isSourceDownloaded(version, libraryDir):
+        print("Source already downloaded.")
+        return sourcePath
 
     # get the source code
-    tempDirPath = os.path.join(cwd, "__temp", "nlohmann_json")
+    tempDirPath = getTempDirPath(libraryDir)
     createDirectories(tempDirPath)
 
-    os.chdir(tempDirPath)
+    # only the version we want, not the whole history
+    gitsource.cloneTag(gitURL, f"v{version}", f"v{version}", sourcePath, checkout=False)
 
-    cmd = [gitPath, "clone", f"{gitURL}"]
-    runCmd(cmd)
+    return sourcePath
 
-    os.chdir(os.path.join(os.getcwd(), "json"))
 
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/v{version}", "-b", f"v{version}"]
-    runCmd(cmd)
+def install(version, path, libraryDir):
+    repoPath = downloadSource(version, libraryDir)
 
     installDir = getFullInstallDir(path)
 
-    # copy the code
-    # git archive will only create a package file from the repo, so
-    # package as a zip then unzip to the install directory
-    archivePath = os.path.join(cwd, "__temp", "nlohmann_json.zip")
-    cmd = [gitPath, "archive", "--output", f"{archivePath}", "HEAD"]
-    runCmd(cmd)
+    # the headers are written straight from git into the install directory,
+    # without checking out, archiving or extracting the rest of the repository
+    files = gitsource.archive(repoPath, f"refs/heads/v{version}", includePaths, installDir)
+
+    if files is None:
+        print("Failed to install nlohmann json.")
+        return
+
+    with open(getManifestPath(path), "w") as manifestFile:
+        json.dump({"version": version, "paths": includePaths, "files": files}, manifestFile, indent=4)
+
+
+def download(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path, version):
+        return
+
+    downloadSource(version, libraryDir)
+
+
+def isInstalled(path, version=None):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    return isAlreadyInstalled(path, version)
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    # the branch holds the commit that was checked out
+    return [getBranchPath(version, libraryDir)]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path, version):
+        return []
+
+    steps = []
+
+    if not isSourceDownloaded(version, libraryDir):
+        steps.append(("download", gitURL, None))
+
+    steps.append(("extract", getFullInstallDir(path), None))
 
-    createDirectories(installDir)
+    return steps
 
-    with zipfile.ZipFile(archivePath, "r") as zip:
-        zip.extractall(installDir)
 
-    os.chdir(cwd)
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
+    print("Installing nlohmann json...")
 
-print("Installing nlohmann json...")
+    if isAlreadyInstalled(path, version):
+        print("nlohmann json already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed nlohmann json.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("nlohmann json already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed nlohmann json.")
\ No newline at end of file
+    run(args.path, args.version)
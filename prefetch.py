@@ -0,0 +1,187 @@
+import os
+import asyncio
+import threading
+import urllib.parse
+import concurrent.futures
+
+import digests
+import mirrors
+import downloader
+
+# every file is fetched at once, but only this many from the same host at a
+# time. Each download already opens several connections of its own, and
+# hosts such as GitHub slow down clients that open too many, but this is
+# still enough for every binary a project usually needs
+defaultPerHost = 8
+
+# how often, in seconds, the progress of all the downloads is printed
+progressInterval = 2
+
+
+def formatSize(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def getHost(url):
+    # the host a file will be fetched from: the fastest mirror holding it,
+    # or its original URL's. The mirrors are only timed once, so this costs
+    # nothing when the download itself picks the mirror again
+    candidates = mirrors.rankCandidates(mirrors.getPublishedCandidates(url))
+
+    return urllib.parse.urlsplit(candidates[0] if len(candidates) > 0 else url).netloc
+
+
+def createHostLimits(perHost):
+    return {
+        "lock": threading.Lock(),
+        "perHost": perHost,
+        # host to the semaphore limiting the downloads from it
+        "semaphores": {},
+    }
+
+
+def getHostLimit(hostLimits, host):
+    with hostLimits["lock"]:
+        return hostLimits["semaphores"].setdefault(host, threading.Semaphore(hostLimits["perHost"]))
+
+
+def createProgress(downloads):
+    return {
+        "lock": threading.Lock(),
+        "files": len(downloads),
+        "finished": 0,
+        "failed": 0,
+        "received": {},
+        "sizes": {},
+    }
+
+
+def recordSize(progress, outputPath, size):
+    with progress["lock"]:
+        progress["sizes"][outputPath] = size
+
+
+def recordChunks(progress, outputPath):
+    # called from the download threads
+    def onProgress(size):
+        with progress["lock"]:
+            progress["received"][outputPath] = progress["received"].get(outputPath, 0) + size
+
+    return onProgress
+
+
+def recordFinished(progress, outputPath, succeeded):
+    with progress["lock"]:
+        if succeeded:
+            progress["finished"] += 1
+
+            # cached and resumed files arrive without being counted chunk by
+            # chunk
+            progress["received"][outputPath] = os.path.getsize(outputPath)
+        else:
+            progress["failed"] += 1
+
+
+def formatProgress(progress):
+    with progress["lock"]:
+        received = sum(progress["received"].values())
+        sizes = list(progress["sizes"].values())
+        done = progress["finished"] + progress["failed"]
+
+        # a file whose size is not known yet makes the total unknown too
+        if len(sizes) < progress["files"] or None in sizes:
+            total = "unknown"
+        else:
+            total = formatSize(sum(sizes))
+
+        return f"Prefetched {done} of {progress['files']} files, {formatSize(received)} of {total}."
+
+
+async def reportProgress(progress):
+    while True:
+        await asyncio.sleep(progressInterval)
+
+        print(formatProgress(progress))
+
+
+async def fetchSize(loop, executor, progress, url, outputPath):
+    size = await loop.run_in_executor(executor, downloader.getDownloadSize, url)
+
+    recordSize(progress, outputPath, size)
+
+
+def fetchFile(progress, hostLimits, download):
+    library, version, platformName, url, outputPath = download
+
+    # the mirror is only known once the mirrors have been timed, so the limit
+    # is taken on the download's own thread
+    with getHostLimit(hostLimits, getHost(url)):
+        digests.download(library, version, platformName, url, outputPath, onProgress=recordChunks(progress, outputPath))
+
+
+async def fetchDownload(loop, executor, progress, hostLimits, download):
+    url = download[3]
+    outputPath = download[4]
+
+    # the downloads themselves block, so each runs on its own thread while
+    # the loop keeps track of them all
+    try:
+        await loop.run_in_executor(executor, fetchFile, progress, hostLimits, download)
+    except Exception as error:
+        # anything that goes wrong is left for the library's own download
+        # stage, rather than stopping every other prefetch
+        print(f"Failed to prefetch `{url}`: {error}")
+        recordFinished(progress, outputPath, False)
+        return False
+
+    recordFinished(progress, outputPath, True)
+
+    return True
+
+
+async def fetchAll(downloads, perHost):
+    loop = asyncio.get_running_loop()
+    progress = createProgress(downloads)
+    hostLimits = createHostLimits(perHost)
+
+    # every download has a thread, as those waiting on their host's limit
+    # hold theirs. Sizes are asked for alongside the downloads, on threads
+    # of their own, so the downloads do not wait for them
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(downloads)) as executor, concurrent.futures.ThreadPoolExecutor(max_workers=len(downloads)) as sizeExecutor:
+        reporter = asyncio.ensure_future(reportProgress(progress))
+
+        try:
+            sizes = [fetchSize(loop, sizeExecutor, progress, d[3], d[4]) for d in downloads]
+            fetches = [fetchDownload(loop, executor, progress, hostLimits, d) for d in downloads]
+
+            results = await asyncio.gather(*fetches, *sizes)
+        finally:
+            reporter.cancel()
+
+    print(formatProgress(progress))
+
+    return [d[3] for d, succeeded in zip(downloads, results) if not succeeded]
+
+
+def run(downloads, perHost=defaultPerHost):
+    # fetches every download, given as (library, version, platform, url,
+    # path), at the same time. Returns the URLs that failed, which are left
+    # for the libraries' own download stages to retry or build instead
+    unique = {}
+
+    # projects that want the same version share one download
+    for download in downloads:
+        unique.setdefault(download[4], download)
+
+    downloads = list(unique.values())
+
+    if len(downloads) == 0:
+        return []
+
+    print(f"Prefetching {len(downloads)} pre-built binaries...")
+
+    failed = asyncio.run(fetchAll(downloads, max(1, perHost)))
+
+    print("Prefetched pre-built binaries.")
+
+    return failed
@@ -16,8 +16,18 @@ def install():
     runCmd(cmd)
 
 
-print("Installing SAIL...")
+def plan():
+    # brew decides whether it is already installed
+    return [("install", "happyseafox/sail/sail", None)]
 
-install()
 
-print("Installed SAIL.")
+def run():
+    print("Installing SAIL...")
+
+    install()
+
+    print("Installed SAIL.")
+
+
+if __name__ == "__main__":
+    run()
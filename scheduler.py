@@ -0,0 +1,207 @@
+import os
+import threading
+import concurrent.futures
+
+
+def readFirstLine(path):
+    try:
+        with open(path) as file:
+            return file.readline().strip()
+    except OSError:
+        return None
+
+
+def getMachineBudget():
+    # the cores and memory this process may use. The kernel reports these
+    # under /proc, and a container may be limited further by its cgroup
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    cpuMax = readFirstLine("/sys/fs/cgroup/cpu.max")
+    if cpuMax is not None and not cpuMax.startswith("max"):
+        quota, period = cpuMax.split()
+        cores = max(1, min(cores, int(quota) // int(period)))
+
+    memory = None
+
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                name, value = line.split(":", 1)
+
+                if name == "MemAvailable":
+                    memory = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+
+    memoryMax = readFirstLine("/sys/fs/cgroup/memory.max")
+    if memoryMax is not None and memoryMax.isdigit():
+        memory = int(memoryMax) if memory is None else min(memory, int(memoryMax))
+
+    return {"cores": cores, "memory": memory}
+
+
+def getGrant(needs, budget, granted):
+    # how many cores to give a task, or None if it should wait. A task is
+    # given at least half of the cores it asks for, unless nothing else is
+    # holding any, so a large build is not started on a single core
+    if len(granted) == 0:
+        return max(1, min(needs.get("cores", 1), budget["cores"]))
+
+    availableCores = budget["cores"] - sum(cores for cores, memory in granted.values())
+    wantedCores = min(needs.get("cores", 1), budget["cores"])
+
+    if availableCores < max(1, wantedCores // 2):
+        return None
+
+    if budget["memory"] is not None:
+        availableMemory = budget["memory"] - sum(memory for cores, memory in granted.values())
+
+        if needs.get("memory", 0) > availableMemory:
+            return None
+
+    return max(1, min(wantedCores, availableCores))
+
+
+def getRunnableTasks(tasks, finished, running):
+    runnable = []
+
+    for name, (function, dependencies, stage, needs) in tasks.items():
+        if name in finished or name in running:
+            continue
+
+        if all(d in finished or d not in tasks for d in dependencies):
+            runnable.append(name)
+
+    return runnable
+
+
+def createPool(stageLimits, budget=None):
+    # the limits, budget and workers shared by every runTasks call given this
+    # pool, so calls running at the same time keep within them between them
+    if budget is None:
+        budget = getMachineBudget()
+
+    return {
+        "stageLimits": stageLimits,
+        "budget": budget,
+        # held while tasks are started and finished, and notified whenever a
+        # task finishes so calls waiting for room can try again
+        "condition": threading.Condition(),
+        # (call, task name) to the cores and memory it was given
+        "granted": {},
+        # stage to how many of its tasks are running
+        "stages": {},
+        "executor": concurrent.futures.ThreadPoolExecutor(max_workers=max(1, sum(stageLimits.values()))),
+    }
+
+
+def notifyPool(pool):
+    with pool["condition"]:
+        pool["condition"].notify_all()
+
+
+def startTasks(tasks, pool, call, finished, running):
+    # starts every task that is free to run and has room in the pool.
+    # Returns the tasks that were free to run, started or not
+    runnable = getRunnableTasks(tasks, finished, running.values())
+
+    for name in runnable:
+        function, dependencies, stage, needs = tasks[name]
+
+        if pool["stages"].get(stage, 0) >= max(1, pool["stageLimits"].get(stage, 1)):
+            continue
+
+        cores = None
+
+        if len(needs) > 0:
+            cores = getGrant(needs, pool["budget"], pool["granted"])
+            if cores is None:
+                continue
+
+            pool["granted"][(call, name)] = (cores, needs.get("memory", 0))
+
+        pool["stages"][stage] = pool["stages"].get(stage, 0) + 1
+
+        future = pool["executor"].submit(function, cores)
+        future.add_done_callback(lambda f: notifyPool(pool))
+
+        running[future] = name
+
+    return runnable
+
+
+def runTasks(tasks, stageLimits, budget=None, pool=None):
+    # `tasks` maps a task name to a tuple of the function to call, the names
+    # of the tasks that must finish before it starts, the stage it belongs
+    # to and the cores and memory it expects to use. Dependencies on names
+    # not in `tasks` are ignored, so callers can declare every edge and only
+    # pass the tasks that are actually needed.
+    # `stageLimits` maps each stage to how many of its tasks may run at once,
+    # so a stage that is waiting on the network does not hold back a stage
+    # that is waiting on the CPU.
+    # Tasks that declare the cores and memory they expect to use are only
+    # started once `budget` has room for them. Each function is called with
+    # the number of cores it was given, or None if it declared nothing.
+    # Given a `pool` from createPool, its limits and budget are used instead,
+    # and shared with every other call running with the same pool.
+    # Tasks are started in the order they are given whenever they are free to
+    # run, so with one worker per stage this is the same as calling them in
+    # order.
+    # A task that fails still counts as done for the tasks waiting on it, just
+    # as a failed library never stopped the next one from being installed.
+    finished = set()
+    failed = set()
+    running = {}
+
+    ownsPool = pool is None
+
+    if ownsPool:
+        pool = createPool(stageLimits, budget)
+
+    # tells this call's grants apart from those of other calls with the same
+    # task names
+    call = object()
+
+    try:
+        with pool["condition"]:
+            while len(finished) < len(tasks):
+                runnable = startTasks(tasks, pool, call, finished, running)
+
+                if len(running) == 0 and len(runnable) == 0:
+                    # only possible if the dependencies contain a cycle
+                    remaining = [n for n in tasks if n not in finished]
+                    print(f"Unable to schedule tasks with circular dependencies: {remaining}")
+                    failed.update(remaining)
+                    break
+
+                done = [f for f in running if f.done()]
+
+                # woken when any task in the pool finishes, this call's or
+                # another's, as either can make room
+                if len(done) == 0:
+                    pool["condition"].wait()
+                    continue
+
+                for future in done:
+                    name = running.pop(future)
+                    pool["granted"].pop((call, name), None)
+                    pool["stages"][tasks[name][2]] -= 1
+
+                    try:
+                        future.result()
+                    except Exception as error:
+                        print(f"Failed to run `{name}`: {error}")
+                        failed.add(name)
+
+                    finished.add(name)
+
+                # other calls may have been waiting for what was released
+                pool["condition"].notify_all()
+    finally:
+        if ownsPool:
+            pool["executor"].shutdown()
+
+    return [n for n in tasks if n in failed]
@@ -1,18 +1,27 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import mirrors
+import downloader
+import gitsource
+
 sdlVersion = "2.6.3"
 sdlGitURL = "https://github.com/libsdl-org/SDL_image.git"
 
-gitPath = shutil.which("git")
-curlPath = shutil.which("curl")
 shPath = shutil.which("sh")
 makePath = shutil.which("make")
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
@@ -45,39 +54,40 @@ def runCmd(cmd, cwd=None):
     subprocess.run(cmd, cwd=cwd)
 
 
-def runCmdIgnoreError(cmd):
-    print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
+def getSourcePath(tempDirPath):
+    return os.path.join(tempDirPath, "SDL_image")
 
 
-def build(buildiOS, tempDirPath):
-    print("Starting build...")
+def isSourceDownloaded(version, tempDirPath):
+    # checking out the version creates a branch named after it
+    branchPath = os.path.join(getSourcePath(tempDirPath), ".git", "refs", "heads", f"release-{version}")
 
-    if platform.system() != "Darwin" and buildiOS:
-        print("Can only build iOS on MacOS.")
-        return
+    return os.path.exists(branchPath)
+
+
+def downloadSource(version, tempDirPath):
+    sourcePath = getSourcePath(tempDirPath)
+
+    if isSourceDownloaded(version, tempDirPath):
+        print("Source already downloaded.")
+        return sourcePath
 
     createDirectories(tempDirPath)
 
-    os.chdir(tempDirPath)
+    # only the version we want, not the whole history
+    gitsource.cloneTag(sdlGitURL, f"release-{version}", f"release-{version}", sourcePath)
 
-    # get the latest SDL code
-    cmd = [gitPath, "clone", f"{sdlGitURL}"]
-    runCmd(cmd)
+    return sourcePath
 
-    os.chdir(os.path.join(os.getcwd(), "SDL_image"))
 
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/release-{sdlVersion}", "-b", f"release-{sdlVersion}"]
-    runCmd(cmd)
+def build(version, buildiOS, tempDirPath, jobs):
+    print("Starting build...")
+
+    if platform.system() != "Darwin" and buildiOS:
+        print("Can only build iOS on MacOS.")
+        return
+
+    sdlPath = downloadSource(version, tempDirPath)
 
     if platform.system() == "Windows":
         print("Please build manually using Visual Studio.")
@@ -88,25 +98,25 @@ def build(buildiOS, tempDirPath):
         return
     
     cmd = [shPath, "autogen.sh"]
-    runCmd(cmd)
+    runCmd(cmd, sdlPath)
 
     installPath = os.path.join(tempDirPath, "install")
 
     cmd = [shPath, "./configure", f"--prefix={installPath}"]
-    runCmd(cmd)
+    runCmd(cmd, sdlPath)
 
     cmd = [makePath]
-    runCmd(cmd)
+    if jobs is not None:
+        cmd.append(f"-j{jobs}")
+    runCmd(cmd, sdlPath)
 
     cmd = [makePath, "install"]
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    runCmd(cmd, sdlPath)
 
     print("Finished build.")
 
 
-def saveResults(buildiOS, tempDirPath):
+def saveResults(version, buildiOS, libraryDir, tempDirPath):
     print("Saving results...")
 
     if buildiOS:
@@ -127,19 +137,19 @@ def saveResults(buildiOS, tempDirPath):
 
         platformLibName = getPlatformLibName(False, False)
 
-        destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+        destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-        saveBinaries(destLibDir, includePath, platformLibName, buildDir)
+        saveBinaries(version, destLibDir, includePath, platformLibName, buildDir)
         
         print("Saved results for current platform...")
 
     print("Saved results.")
 
 
-def saveBinaries(destLibDir, includePath, platformLibName, buildDir):
+def saveBinaries(version, destLibDir, includePath, platformLibName, buildDir):
     createDirectories(destLibDir)
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     with zipfile.ZipFile(zipDir, "w") as zip:
         for root, dirs, files in os.walk(includePath):
@@ -162,45 +172,42 @@ def getPlatformLibName(buildiOS, buildiOSSimulator):
     return platform.system()
 
 
-def getZipPath(destLibDir, platformLibName):
-    return os.path.join(destLibDir, f"{sdlVersion}_{platformLibName}.zip")
+def getZipPath(version, destLibDir, platformLibName):
+    return os.path.join(destLibDir, f"{version}_{platformLibName}.zip")
 
 
-def doesNeedBuilding(buildiOS):
+def doesNeedBuilding(version, buildiOS, libraryDir):
     # only check if the iOS builds are here
     platformLibName = getPlatformLibName(buildiOS, False)
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
 
-    zipDir = getZipPath(destLibDir, platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
     isBuilt = os.path.exists(zipDir)
 
     return not isBuilt
 
 
-def tryAndDownloadBinaries(buildiOS):
-    
+def tryAndDownloadBinaries(version, buildiOS, libraryDir):
     # as we build both ios and ios simulator together, try and
     # download them together
     if platform.system() == "Darwin" and buildiOS:
-        if not downloadBinaries(True, False):
+        if not downloadBinaries(version, True, False, libraryDir):
             return False
-        result = downloadBinaries(False, True)
+        result = downloadBinaries(version, False, True, libraryDir)
         return result
     else:
-        result = downloadBinaries(False, False)
+        result = downloadBinaries(version, False, False, libraryDir)
         return result
 
 
-def downloadBinaries(buildiOS, buildiOSSimulator):
-    print("Trying to download pre-built binaries...")
-
-    sdlDownloadURLWindows = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{sdlVersion}/{sdlVersion}_Windows.zip"
-    sdlDownloadURLDarwin = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{sdlVersion}/{sdlVersion}_Darwin.zip"
-    sdlDownloadURLiOS = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{sdlVersion}/{sdlVersion}_iOS.zip"
-    sdlDownloadURLiOSSimulator = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{sdlVersion}/{sdlVersion}_iOS_Simulator.zip"
-    sdlDownloadURLLinux = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{sdlVersion}/{sdlVersion}_Linux.zip"
+def getBinaryURL(version, buildiOS, buildiOSSimulator):
+    sdlDownloadURLWindows = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{version}/{version}_Windows.zip"
+    sdlDownloadURLDarwin = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{version}/{version}_Darwin.zip"
+    sdlDownloadURLiOS = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{version}/{version}_iOS.zip"
+    sdlDownloadURLiOSSimulator = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{version}/{version}_iOS_Simulator.zip"
+    sdlDownloadURLLinux = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/SDL_image_{version}/{version}_Linux.zip"
 
     url = ""
 
@@ -217,55 +224,143 @@ def downloadBinaries(buildiOS, buildiOSSimulator):
     elif system_name == "Linux":
         url = sdlDownloadURLLinux
     else:
-        print(f"Unknown system name: {system_name}")
-        return False
+        return ""
+
+    return url
+
+
+def downloadBinaries(version, buildiOS, buildiOSSimulator, libraryDir):
+    print("Trying to download pre-built binaries...")
+
+    url = getBinaryURL(version, buildiOS, buildiOSSimulator)
 
     if url == "":
+        print(f"Unknown system name: {platform.system()}")
+        return False
+
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
         return False
 
     platformLibName = getPlatformLibName(buildiOS, buildiOSSimulator)
 
-    destLibDir = os.path.join(os.getcwd(), "lib", platformLibName)
-    zipDir = getZipPath(destLibDir, platformLibName)
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+    zipDir = getZipPath(version, destLibDir, platformLibName)
 
-    result = downloadBinary(url, zipDir)
+    result = downloadBinary(url, zipDir, version, platformLibName)
 
     print("Finished trying.")
 
     return result
 
 
-def downloadBinary(url, output_path):
+def downloadBinary(url, output_path, version, platformName):
     print(f"Trying to download url: '{url}' to path: '{output_path}'")
 
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{output_path}", f"{url}"]
-
-    if runCmdIgnoreError(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("sdl_image", version, platformName, url, output_path)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
 
-print(f"Building SDL image version {sdlVersion}...")
 
-args = configureArguments()
+def download(version=None, buildiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = sdlVersion
 
-if args.version is not None and len(args.version) > 0:
-    sdlVersion = args.version
+    tempDirPath = os.path.join(libraryDir, "__temp")
 
-cwd = os.getcwd()
-tempDirPath = os.path.join(cwd, "__temp")
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return
 
-if doesNeedBuilding(args.build_ios):
-    if tryAndDownloadBinaries(args.build_ios):
+    if tryAndDownloadBinaries(version, buildiOS, libraryDir):
         print("Downloaded pre-built binaries.")
     else:
-        build(args.build_ios, tempDirPath)
+        downloadSource(version, tempDirPath)
+
+
+def getDownloads(version=None, buildiOS=False, libraryDir=libraryDir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if version is None or len(version) <= 0:
+        version = sdlVersion
+
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return []
+
+    variants = [(True, False), (False, True)] if platform.system() == "Darwin" and buildiOS else [(False, False)]
+
+    downloads = []
+
+    for variantiOS, variantiOSSimulator in variants:
+        url = getBinaryURL(version, variantiOS, variantiOSSimulator)
+
+        if url == "":
+            continue
+
+        platformLibName = getPlatformLibName(variantiOS, variantiOSSimulator)
+
+        destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+        zipDir = getZipPath(version, destLibDir, platformLibName)
+
+        downloads.append(("sdl_image", version, platformLibName, url, zipDir))
+
+    return downloads
+
+
+def plan(version=None, buildiOS=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = sdlVersion
+
+    if not doesNeedBuilding(version, buildiOS, libraryDir):
+        return []
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    # a previous run already fell back to building from source
+    if isSourceDownloaded(version, tempDirPath):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    # no pre-built binaries have been published, going by the indexes
+    # already fetched
+    if not mirrors.isAvailable(getBinaryURL(version, buildiOS, False), fetchIndexes=False):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    platformLibName = getPlatformLibName(buildiOS, False)
+
+    destLibDir = os.path.join(libraryDir, "lib", platformLibName)
+
+    zipDir = getZipPath(version, destLibDir, platformLibName)
+
+    return [("download", zipDir, downloader.getKnownSize(getBinaryURL(version, buildiOS, False)))]
+
+
+def run(version=None, buildiOS=False, libraryDir=libraryDir, jobs=None):
+    if version is None or len(version) <= 0:
+        version = sdlVersion
+
+    print(f"Building SDL image version {version}...")
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    if doesNeedBuilding(version, buildiOS, libraryDir):
+        download(version, buildiOS, libraryDir)
+
+        if doesNeedBuilding(version, buildiOS, libraryDir):
+            build(version, buildiOS, tempDirPath, jobs)
+
+            saveResults(version, buildiOS, libraryDir, tempDirPath)
+    else:
+        print("SDL image is already built...")
+
+    print(f"Built SDL image version {version}.")
+
 
-        saveResults(args.build_ios, tempDirPath)
-else:
-    print("SDL image is already built...")
+if __name__ == "__main__":
+    args = configureArguments()
 
-print(f"Built SDL image version {sdlVersion}.")
\ No newline at end of file
+    run(args.version, args.build_ios)
@@ -6,6 +6,8 @@ import zipfile
 
 sdlImageVersion = "2.6.3"
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-p", "--path", action="store", required=True, help="path to install in")
@@ -76,25 +78,25 @@ def getPlatformName(buildForiOS, buildForiOSSimulator):
     return platformName
 
 
-def getBinaryOutPath(buildForiOS, buildForiOSSimulator):
+def getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir):
     platformName = getPlatformName(buildForiOS, buildForiOSSimulator)
 
-    binaryOut = os.path.join(os.getcwd(), "lib", platformName)
+    binaryOut = os.path.join(libraryDir, "lib", platformName)
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath, buildForiOS, buildForiOSSimulator):
+def getOutputZipPath(version, binaryOutPath, buildForiOS, buildForiOSSimulator):
     platformName = getPlatformName(buildForiOS, buildForiOSSimulator)
 
-    zipPath = os.path.join(binaryOutPath, f"{sdlImageVersion}_{platformName}.zip")
+    zipPath = os.path.join(binaryOutPath, f"{version}_{platformName}.zip")
 
     return zipPath
 
 
-def install(path, buildForiOS, buildForiOSSimulator):
-    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator)
-    zipPath = getOutputZipPath(binaryPath, buildForiOS, buildForiOSSimulator)
+def install(version, path, buildForiOS, buildForiOSSimulator, libraryDir):
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS, buildForiOSSimulator)
 
     installDir = getFullInstallDir(path, buildForiOS, buildForiOSSimulator)
 
@@ -104,16 +106,50 @@ def install(path, buildForiOS, buildForiOSSimulator):
         zip.extractall(installDir)
 
 
-print("Installing SDL image...")
+def isInstalled(path, version=None, buildForiOS=False, buildForiOSSimulator=False):
+    return isSDLAlreadyInstalled(path, buildForiOS, buildForiOSSimulator)
+
+
+def getArtifactPaths(version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = sdlImageVersion
+
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS, buildForiOSSimulator)
+
+    return [zipPath]
+
+
+def plan(path, version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = sdlImageVersion
+
+    if isSDLAlreadyInstalled(path, buildForiOS, buildForiOSSimulator):
+        return []
+
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath, buildForiOS, buildForiOSSimulator)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = sdlImageVersion
+
+    print("Installing SDL image...")
+
+    if isSDLAlreadyInstalled(path, buildForiOS, buildForiOSSimulator):
+        print("SDL image already installed.")
+    else:
+        install(version, path, buildForiOS, buildForiOSSimulator, libraryDir)
 
-args = configureArguments()
+    print("Installed SDL image.")
 
-if args.version is not None and len(args.version) > 0:
-    sdlVersion = args.version
 
-if isSDLAlreadyInstalled(args.path, args.ios, args.ios_simulator):
-    print("SDL image already installed.")
-else:
-    install(args.path, args.ios, args.ios_simulator)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed SDL image.")
\ No newline at end of file
+    run(args.path, args.version, args.ios, args.ios_simulator)
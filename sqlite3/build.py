@@ -1,18 +1,27 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
-version = "3.35.5"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import mirrors
+import downloader
+import gitsource
+
+defaultVersion = "3.35.5"
 gitUrl = "https://github.com/sqlite/sqlite.git"
 
-gitPath = shutil.which("git")
-curlPath = shutil.which("curl")
 shPath = shutil.which("sh")
 makePath = shutil.which("make")
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
@@ -44,70 +53,71 @@ def runCmd(cmd, cwd=None):
     subprocess.run(cmd, cwd=cwd)
 
 
-def runCmdIgnoreError(cmd):
-    print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
+def getSourcePath(tempDirPath):
+    return os.path.join(tempDirPath, "sqlite")
 
 
-def build(tempDirPath):
-    print("Starting build...")
+def isSourceDownloaded(version, tempDirPath):
+    # checking out the version creates a branch named after it
+    branchPath = os.path.join(getSourcePath(tempDirPath), ".git", "refs", "heads", f"{version}")
 
-    if platform.system() == "Windows":
-        print("Building on Windows is not supported.")
-        return
+    return os.path.exists(branchPath)
+
+
+def downloadSource(version, tempDirPath):
+    sourcePath = getSourcePath(tempDirPath)
+
+    if isSourceDownloaded(version, tempDirPath):
+        print("Source already downloaded.")
+        return sourcePath
 
     createDirectories(tempDirPath)
 
-    os.chdir(tempDirPath)
+    # only the version we want, not the whole history
+    gitsource.cloneTag(gitUrl, f"{version}", f"{version}", sourcePath)
 
-    # get the latest code
-    cmd = [gitPath, "clone", f"{gitUrl}"]
-    runCmd(cmd)
+    return sourcePath
 
-    os.chdir(os.path.join(os.getcwd(), "sqlite"))
 
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/{version}", "-b", f"{version}"]
-    runCmd(cmd)
+def build(version, tempDirPath, jobs):
+    print("Starting build...")
+
+    if platform.system() == "Windows":
+        print("Building on Windows is not supported.")
+        return
+
+    sourceDir = downloadSource(version, tempDirPath)
 
     cmd = [shPath, "./configure"]
-    runCmd(cmd)
+    runCmd(cmd, sourceDir)
 
     cmd = [makePath, "sqlite3.c"]
-    runCmd(cmd)
-
-    os.chdir(cwd)
+    if jobs is not None:
+        cmd.append(f"-j{jobs}")
+    runCmd(cmd, sourceDir)
 
     print("Finished build.")
 
 
-def saveResults(tempDirPath):
+def saveResults(version, libraryDir, tempDirPath):
     print("Saving results...")
 
     resultsPath = os.path.join(tempDirPath, "sqlite")
 
-    destLibDir = os.path.join(os.getcwd(), "lib")
+    destLibDir = os.path.join(libraryDir, "lib")
 
     # for CMakeLists.txt
-    supportingFilesPath = os.getcwd()
+    supportingFilesPath = libraryDir
 
-    saveBinaries(supportingFilesPath, destLibDir, resultsPath)
+    saveBinaries(version, supportingFilesPath, destLibDir, resultsPath)
 
     print("Saved results.")
 
 
-def saveBinaries(supportingFilesPath, destLibDir, resultsPath):
+def saveBinaries(version, supportingFilesPath, destLibDir, resultsPath):
     createDirectories(destLibDir)
 
-    zipDir = getZipPath(destLibDir)
+    zipDir = getZipPath(version, destLibDir)
 
     with zipfile.ZipFile(zipDir, "w") as zip:
         zip.write(os.path.join(supportingFilesPath, "CMakeLists.txt"), os.path.join("CMakeLists.txt"))
@@ -116,71 +126,141 @@ def saveBinaries(supportingFilesPath, destLibDir, resultsPath):
         zip.write(os.path.join(resultsPath, "sqlite3.c"), os.path.join("src", "sqlite3.c"))
 
 
-def getZipPath(destLibDir):
+def getZipPath(version, destLibDir):
     return os.path.join(destLibDir, f"{version}.zip")
 
 
-def doesNeedBuilding():
-    destLibDir = os.path.join(os.getcwd(), "lib")
+def doesNeedBuilding(version, libraryDir):
+    destLibDir = os.path.join(libraryDir, "lib")
 
-    zipDir = getZipPath(destLibDir)
+    zipDir = getZipPath(version, destLibDir)
 
     isBuilt = os.path.exists(zipDir)
 
     return not isBuilt
 
 
-def downloadBinaries():
-    print("Trying to download pre-built binaries...")
-
+def getBinaryURL(version):
     downloadURL = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/sqlite3_{version}/{version}.zip"
 
     url = downloadURL
 
+    return url
+
+
+def downloadBinaries(version, libraryDir):
+    print("Trying to download pre-built binaries...")
+
+    url = getBinaryURL(version)
+
     if url == "":
         return False
 
-    destLibDir = os.path.join(os.getcwd(), "lib")
-    zipDir = getZipPath(destLibDir)
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
+        return False
+
+    destLibDir = os.path.join(libraryDir, "lib")
+    zipDir = getZipPath(version, destLibDir)
 
-    result = downloadBinary(url, zipDir)
+    result = downloadBinary(url, zipDir, version, "any")
 
     print("Finished trying.")
 
     return result
 
 
-def downloadBinary(url, outputPath):
+def downloadBinary(url, outputPath, version, platformName):
     print(f"Trying to download url: '{url}' to path: '{outputPath}'")
 
-    cmd = [curlPath, "--create-dirs", "-Lo", f"{outputPath}", f"{url}"]
-
-    if runCmdIgnoreError(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("sqlite3", version, platformName, url, outputPath)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
 
-print(f"Building sqlite3 version {version}...")
 
-args = configureArguments()
+def download(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
+    tempDirPath = os.path.join(libraryDir, "__temp")
 
-cwd = os.getcwd()
-tempDirPath = os.path.join(cwd, "__temp")
+    if not doesNeedBuilding(version, libraryDir):
+        return
 
-if doesNeedBuilding():
-    if downloadBinaries():
+    if downloadBinaries(version, libraryDir):
         print("Downloaded pre-built binaries.")
     else:
-        build(tempDirPath)
+        downloadSource(version, tempDirPath)
+
+
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, libraryDir):
+        return []
+
+    destLibDir = os.path.join(libraryDir, "lib")
+    zipDir = getZipPath(version, destLibDir)
+
+    return [("sqlite3", version, "any", getBinaryURL(version), zipDir)]
+
+
+def plan(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if not doesNeedBuilding(version, libraryDir):
+        return []
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    # a previous run already fell back to building from source
+    if isSourceDownloaded(version, tempDirPath):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    # no pre-built binaries have been published, going by the indexes
+    # already fetched
+    if not mirrors.isAvailable(getBinaryURL(version), fetchIndexes=False):
+        return [("build", getSourcePath(tempDirPath), None)]
+
+    destLibDir = os.path.join(libraryDir, "lib")
+
+    zipDir = getZipPath(version, destLibDir)
+
+    return [("download", zipDir, downloader.getKnownSize(getBinaryURL(version)))]
+
+
+def run(version=None, libraryDir=libraryDir, jobs=None):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print(f"Building sqlite3 version {version}...")
+
+    tempDirPath = os.path.join(libraryDir, "__temp")
+
+    if doesNeedBuilding(version, libraryDir):
+        download(version, libraryDir)
+
+        if doesNeedBuilding(version, libraryDir):
+            build(version, tempDirPath, jobs)
+
+            saveResults(version, libraryDir, tempDirPath)
+    else:
+        print("sqlite3 is already built...")
+
+    print(f"Built sqlite3 version {version}.")
+
 
-        saveResults(tempDirPath)
-else:
-    print("sqlite3 is already built...")
+if __name__ == "__main__":
+    args = configureArguments()
 
-print(f"Built sqlite3 version {version}.")
\ No newline at end of file
+    run(args.version)
@@ -4,7 +4,9 @@ import platform
 import argparse
 import zipfile
 
-version = "3.35.5"
+defaultVersion = "3.35.5"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -40,21 +42,21 @@ def isAlreadyInstalled(path):
 
     return filesExist
 
-def getBinaryOutPath():
-    binaryOut = os.path.join(os.getcwd(), "lib")
+def getBinaryOutPath(libraryDir):
+    binaryOut = os.path.join(libraryDir, "lib")
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath):
+def getOutputZipPath(version, binaryOutPath):
     zipPath = os.path.join(binaryOutPath, f"{version}.zip")
 
     return zipPath
 
 
-def install(path):
-    binaryPath = getBinaryOutPath()
-    zipPath = getOutputZipPath(binaryPath)
+def install(version, path, libraryDir):
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
 
     installDir = getFullInstallDir(path)
 
@@ -64,16 +66,50 @@ def install(path):
         zip.extractall(installDir)
 
 
-print("Installing sqlite3...")
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    return [zipPath]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    binaryPath = getBinaryOutPath(libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    print("Installing sqlite3...")
+
+    if isAlreadyInstalled(path):
+        print("sqlite3 already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed sqlite3.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("sqlite3 already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed sqlite3.")
+    run(args.path, args.version)
@@ -1,49 +1,36 @@
 import os
+import sys
+import json
 import shutil
 import subprocess
 import argparse
 import platform
 import zipfile
 
-cwd = os.getcwd()
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-v8_version = "9.0"
+import digests
+import mirrors
+import downloader
 
-v8_source_dir = os.path.join(cwd, "v8")
-depot_tools_dir = os.path.join(v8_source_dir, "depot_tools")
+default_v8_version = "9.0"
 
-out_dir = os.path.join(cwd, "out")
-build_dir = os.path.join(out_dir, f"v8_{v8_version}")
-
-build_env = os.environ
-build_env["PATH"] = depot_tools_dir + ":" + build_env["PATH"]
-
-build_env["DEPOT_TOOLS_WIN_TOOLCHAIN"] = "0"
+library_dir = os.path.dirname(os.path.abspath(__file__))
 
 git_path = shutil.which("git")
-curl_path = shutil.which("curl")
-
-def run_cmd(cmd):
-    print(f"Running command: {cmd}")
-    subprocess.run(cmd)
 
+# the phases of a source build that are checkpointed, in the order they run
+phase_order = ["download_source", "setup_build", "do_build"]
 
-def run_cmd_env(cmd, env):
+def run_cmd(cmd, cwd=None):
     print(f"Running command: {cmd}")
-    subprocess.run(cmd, env=env)
+    return subprocess.run(cmd, cwd=cwd).returncode == 0
 
 
-def run_cmd_ignore_error(cmd):
+def run_cmd_env(cmd, env, cwd=None):
     print(f"Running command: {cmd}")
-    try:
-        subprocess.run(cmd, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print(f"Failed to run cmd: {cmd}")
-        return False
-    else:
-        print(f"Failed to run cmd with unknown error: {cmd}")
-        return False
+    return subprocess.run(cmd, env=env, cwd=cwd).returncode == 0
 
 
 def make_dir(dir):
@@ -64,32 +51,132 @@ def remove_dir(dir):
         print(f"Removed dir: {dir}")
 
 
-def download_source():
+def get_source_dir(library_dir):
+    return os.path.join(library_dir, "v8")
+
+
+def get_checkout_dir(library_dir):
+    return os.path.join(get_source_dir(library_dir), "v8")
+
+
+def get_depot_tools_dir(library_dir):
+    return os.path.join(get_source_dir(library_dir), "depot_tools")
+
+
+def get_out_dir(library_dir):
+    return os.path.join(library_dir, "out")
+
+
+def get_build_dir(v8_version, library_dir):
+    return os.path.join(get_out_dir(library_dir), f"v8_{v8_version}")
+
+
+def get_build_env(library_dir):
+    build_env = os.environ.copy()
+    build_env["PATH"] = get_depot_tools_dir(library_dir) + os.pathsep + build_env["PATH"]
+
+    build_env["DEPOT_TOOLS_WIN_TOOLCHAIN"] = "0"
+
+    return build_env
+
+
+def get_phases_path(v8_version, library_dir):
+    return os.path.join(get_out_dir(library_dir), f"v8_{v8_version}_phases.json")
+
+
+def load_phases(v8_version, library_dir):
+    # each finished phase mapped to the inputs it finished with
+    try:
+        with open(get_phases_path(v8_version, library_dir)) as phases_file:
+            return json.load(phases_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_phases(phases, v8_version, library_dir):
+    phases_path = get_phases_path(v8_version, library_dir)
+    partial_path = f"{phases_path}.part"
+
+    make_dir(os.path.dirname(phases_path))
+
+    with open(partial_path, "w") as phases_file:
+        json.dump(phases, phases_file, indent=4)
+
+    os.replace(partial_path, phases_path)
+
+
+def is_phase_complete(phase, inputs, v8_version, library_dir):
+    return load_phases(v8_version, library_dir).get(phase) == inputs
+
+
+def start_phase(phase, v8_version, library_dir):
+    # a phase being redone means every phase after it has to be redone too
+    phases = load_phases(v8_version, library_dir)
+
+    for p in phase_order[phase_order.index(phase):]:
+        phases.pop(p, None)
+
+    save_phases(phases, v8_version, library_dir)
+
+
+def complete_phase(phase, inputs, v8_version, library_dir):
+    phases = load_phases(v8_version, library_dir)
+    phases[phase] = inputs
+
+    save_phases(phases, v8_version, library_dir)
+
+
+def is_source_downloaded(v8_version, library_dir):
+    # checking out the version creates a branch named after it
+    branch_path = os.path.join(get_checkout_dir(library_dir), ".git", "refs", "heads", "branch-heads", v8_version)
+
+    return os.path.exists(branch_path)
+
+
+def download_source(v8_version, library_dir):
+    inputs = {"v8_version": v8_version}
+
+    if is_phase_complete("download_source", inputs, v8_version, library_dir) and is_source_downloaded(v8_version, library_dir):
+        print("Source already downloaded.")
+        return
+
     print("Downloading source...")
 
-    make_dir(v8_source_dir)
+    start_phase("download_source", v8_version, library_dir)
 
-    os.chdir(v8_source_dir)
+    v8_source_dir = get_source_dir(library_dir)
+    depot_tools_dir = get_depot_tools_dir(library_dir)
+    build_env = get_build_env(library_dir)
 
-    run_cmd([git_path, "clone", "https://chromium.googlesource.com/chromium/tools/depot_tools.git"])
+    make_dir(v8_source_dir)
+
+    # each step is skipped if an earlier run got past it, so an interrupted
+    # download carries on from where it stopped
+    if not os.path.isdir(depot_tools_dir):
+        run_cmd([git_path, "clone", "https://chromium.googlesource.com/chromium/tools/depot_tools.git"], v8_source_dir)
 
     depot_tools_gclient = os.path.join(depot_tools_dir, "gclient.bat" if platform.system() == "Windows" else "gclient")
     depot_tools_fetch = os.path.join(depot_tools_dir, "fetch.bat" if platform.system() == "Windows" else "fetch")
 
-    run_cmd_env([depot_tools_gclient], build_env)
-    run_cmd_env([depot_tools_fetch, "v8"], build_env)
+    v8_checkout_dir = get_checkout_dir(library_dir)
 
-    os.chdir(os.path.join(v8_source_dir, "v8"))
+    if not os.path.isdir(os.path.join(v8_checkout_dir, ".git")):
+        run_cmd_env([depot_tools_gclient], build_env, v8_source_dir)
+        run_cmd_env([depot_tools_fetch, "v8"], build_env, v8_source_dir)
 
-    run_cmd([git_path, "fetch"])
-    run_cmd([git_path, "checkout", "-b", f"branch-heads/{v8_version}"])
+    if not is_source_downloaded(v8_version, library_dir):
+        run_cmd([git_path, "fetch"], v8_checkout_dir)
+        run_cmd([git_path, "checkout", "-b", f"branch-heads/{v8_version}"], v8_checkout_dir)
 
-    run_cmd_env([depot_tools_gclient, "sync"], build_env)
+    # only a sync that finished counts, as being on the branch does not mean
+    # its dependencies were all fetched
+    if run_cmd_env([depot_tools_gclient, "sync"], build_env, v8_checkout_dir):
+        complete_phase("download_source", inputs, v8_version, library_dir)
 
     print("Source downloaded.")
 
 
-def setup_build(build_for_ios, build_for_ios_simulator):
+def setup_build(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
     print("Setting up build...")
 
     is_clang = "false" if platform.system() == "Windows" else "true"
@@ -113,45 +200,71 @@ def setup_build(build_for_ios, build_for_ios_simulator):
     elif is_valid_ios_simulator_build_system:
         gn_settings = gn_settings_ios_simulator
 
-    depot_tools_gn = os.path.join(depot_tools_dir, "gn.bat" if platform.system() == "Windows" else "gn")
+    # every variant shares the same build directory, so the settings decide
+    # whether the build directory can be reused
+    inputs = {"v8_version": v8_version, "gn_settings": gn_settings}
+
+    if is_phase_complete("setup_build", inputs, v8_version, library_dir):
+        print("Build already setup.")
+        return
+
+    start_phase("setup_build", v8_version, library_dir)
 
-    run_cmd_env([depot_tools_gn, "gen", build_dir, gn_settings],
-                build_env)
+    depot_tools_gn = os.path.join(get_depot_tools_dir(library_dir), "gn.bat" if platform.system() == "Windows" else "gn")
+
+    if run_cmd_env([depot_tools_gn, "gen", get_build_dir(v8_version, library_dir), gn_settings],
+                   get_build_env(library_dir),
+                   get_checkout_dir(library_dir)):
+        complete_phase("setup_build", inputs, v8_version, library_dir)
 
     print("Build setup.")
 
 
-def do_build():
+def do_build(v8_version, library_dir, jobs):
     print("Performing build...")
 
-    os.chdir(build_dir)
+    # the build is only redone once the build has been setup again
+    inputs = {"v8_version": v8_version}
+
+    if is_phase_complete("do_build", inputs, v8_version, library_dir):
+        print("Already built.")
+        return
+
+    start_phase("do_build", v8_version, library_dir)
+
+    # out/v8_<version> is kept between runs, so an interrupted build carries
+    # on from where ninja stopped
+    depot_tools_ninja = os.path.join(get_depot_tools_dir(library_dir), "ninja.exe" if platform.system() == "Windows" else "ninja")
+    cmd = [depot_tools_ninja, "-v"]
+    if jobs is not None:
+        cmd += ["-j", f"{jobs}"]
 
-    depot_tools_ninja = os.path.join(depot_tools_dir, "ninja.exe" if platform.system() == "Windows" else "ninja")
-    run_cmd_env([depot_tools_ninja, "-v"], build_env)
+    if run_cmd_env(cmd, get_build_env(library_dir), get_build_dir(v8_version, library_dir)):
+        complete_phase("do_build", inputs, v8_version, library_dir)
 
     print("Built.")
 
 
-def save_results(build_for_ios, build_for_ios_simulator):
+def save_results(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
     print("Saving results...")
 
-    include_source = os.path.join(v8_source_dir, "v8", "include")
-    include_dest = os.path.join(cwd, "include")
+    include_source = os.path.join(get_source_dir(library_dir), "v8", "include")
+    include_dest = os.path.join(library_dir, "include")
 
     if os.path.isdir(include_dest):
         remove_dir(include_dest)
 
     shutil.copytree(include_source, include_dest)
 
-    list_source = os.path.join(build_dir, "obj")
+    list_source = os.path.join(get_build_dir(v8_version, library_dir), "obj")
     print(list_source)
 
     libs = os.listdir(list_source)
 
-    binary_out = get_binary_out_path(build_for_ios, build_for_ios_simulator)
+    binary_out = get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir)
     make_dir(binary_out)
 
-    zip_path = get_output_zip_path(binary_out)
+    zip_path = get_output_zip_path(v8_version, binary_out)
 
     with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_LZMA, allowZip64=True) as zip:
         for lib in libs:
@@ -163,7 +276,7 @@ def save_results(build_for_ios, build_for_ios_simulator):
     print("Results saved.")
 
 
-def get_binary_out_path(build_for_ios, build_for_ios_simulator):
+def get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir):
     platform_name = platform.system()
 
     if build_for_ios:
@@ -171,20 +284,23 @@ def get_binary_out_path(build_for_ios, build_for_ios_simulator):
     elif build_for_ios_simulator:
         platform_name = "iOS_Simulator"
 
-    binary_out = os.path.join(cwd, "lib", platform_name)
+    binary_out = os.path.join(library_dir, "lib", platform_name)
 
     return binary_out
 
 
-def get_output_zip_path(binary_out_path):
+def get_output_zip_path(v8_version, binary_out_path):
     zip_path = os.path.join(binary_out_path, f"v8_{v8_version}.zip")
 
     return zip_path
 
 
-def cleanup():
+def cleanup(library_dir):
     print("Cleaning up previous build files & folders...")
 
+    out_dir = get_out_dir(library_dir)
+    v8_source_dir = get_source_dir(library_dir)
+
     if os.path.isdir(out_dir):
         remove_dir(out_dir)
 
@@ -194,18 +310,16 @@ def cleanup():
     print("Cleaned up.")
 
 
-def does_need_building(build_for_ios, build_for_ios_simulator):
-    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator)
-    zip_path = get_output_zip_path(output_path)
+def does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir)
+    zip_path = get_output_zip_path(v8_version, output_path)
 
     needs_building = os.path.exists(zip_path)
 
     return not needs_building
 
 
-def try_and_download_binaries(build_for_ios, build_for_ios_simulator):
-    print("Trying to download pre-built binaries...")
-
+def get_binary_url(v8_version, build_for_ios, build_for_ios_simulator):
     v8_windows_binary_url = f"https://github.com/richardjhughes/project-dependencies/releases/download/v8_{v8_version}/v8_{v8_version}_Windows.zip"
     v8_darwin_binary_url = f"https://github.com/richardjhughes/project-dependencies/releases/download/v8_{v8_version}/v8_{v8_version}_Darwin.zip"
     v8_darwin_ios_binary_url = f"https://github.com/snowmeltarcade/project-dependencies/releases/download/v8_{v8_version}/v8_{v8_version}_iOS.zip"
@@ -227,65 +341,144 @@ def try_and_download_binaries(build_for_ios, build_for_ios_simulator):
     elif system_name == "Linux":
         url = v8_linux_binary_url
     else:
-        print(f"Unknown system name: {system_name}")
-        return False
+        return ""
+
+    return url
+
+
+def try_and_download_binaries(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+    print("Trying to download pre-built binaries...")
+
+    url = get_binary_url(v8_version, build_for_ios, build_for_ios_simulator)
 
     if url == "":
+        print(f"Unknown system name: {platform.system()}")
         return False
 
-    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator)
-    zip_path = get_output_zip_path(output_path)
+    if not mirrors.isAvailable(url):
+        print(f"No pre-built binaries have been published for `{url}`.")
+        return False
 
-    result = download_binary(url, zip_path)
+    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir)
+    zip_path = get_output_zip_path(v8_version, output_path)
+
+    result = download_binary(url, zip_path, v8_version, os.path.basename(output_path))
 
     print("Finished trying.")
 
     return result
 
 
-def download_binary(url, output_path):
+def download_binary(url, output_path, v8_version, platform_name):
     print(f"Trying to download url: '{url}' to path: '{output_path}'")
 
-    cmd = [curl_path, "--create-dirs", "-Lo", f"{output_path}", f"{url}"]
-
-    if run_cmd_ignore_error(cmd):
-        print(f"Downloaded binary: {url}")
-        return True
-    else:
+    try:
+        digests.download("v8", v8_version, platform_name, url, output_path)
+    except downloader.DownloadError as error:
+        print(error)
         print(f"Failed to download binary: {url}")
         return False
 
+    print(f"Downloaded binary: {url}")
+    return True
+
 
-print(f"Start building v8 version {v8_version}...")
+def download(v8_version=None, build_for_ios=False, build_for_ios_simulator=False, library_dir=library_dir):
+    if v8_version is None or len(v8_version) <= 0:
+        v8_version = default_v8_version
 
-parser = argparse.ArgumentParser(description="Build v8")
-parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
-parser.add_argument("-c", "--clean", action="store_true", default=False, help="Clean previous build files & folders")
-parser.add_argument("-ios", "--ios", action="store_true", default=False, help="Build for iOS. Note: Only valid for use when building on MacOS")
-parser.add_argument("-iossim", "--ios-simulator", action="store_true", default=False, help="Build for iOS. Note: Only valid for use when building on MacOS")
+    if not does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+        return
 
-args = parser.parse_args()
+    if try_and_download_binaries(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+        print("Downloaded binaries. Skipping build.")
+    else:
+        print("Failed to downlaod binaries. Downloading source...")
 
-if args.version is not None and len(args.version) > 0:
-    v8_version = args.version
+        download_source(v8_version, library_dir)
 
-if does_need_building(args.ios, args.ios_simulator):
-    if args.clean:
-        cleanup()
 
-    if try_and_download_binaries(args.ios, args.ios_simulator):
-        print("Downloaded binaries. Skipping build.")
+def get_downloads(v8_version=None, build_for_ios=False, build_for_ios_simulator=False, library_dir=library_dir):
+    # the pre-built binaries `download` would fetch, as (library, version,
+    # platform, url, path), so they can all be fetched ahead of time
+    if v8_version is None or len(v8_version) <= 0:
+        v8_version = default_v8_version
+
+    if not does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+        return []
+
+    url = get_binary_url(v8_version, build_for_ios, build_for_ios_simulator)
+
+    if url == "":
+        return []
+
+    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir)
+    zip_path = get_output_zip_path(v8_version, output_path)
+
+    return [("v8", v8_version, os.path.basename(output_path), url, zip_path)]
+
+
+def plan(v8_version=None, build_for_ios=False, build_for_ios_simulator=False, library_dir=library_dir):
+    if v8_version is None or len(v8_version) <= 0:
+        v8_version = default_v8_version
+
+    if not does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+        return []
+
+    # a previous run already fell back to building from source
+    if is_source_downloaded(v8_version, library_dir):
+        return [("build", get_build_dir(v8_version, library_dir), None)]
+
+    # no pre-built binaries have been published, going by the indexes
+    # already fetched
+    if not mirrors.isAvailable(get_binary_url(v8_version, build_for_ios, build_for_ios_simulator), fetchIndexes=False):
+        return [("build", get_build_dir(v8_version, library_dir), None)]
+
+    output_path = get_binary_out_path(build_for_ios, build_for_ios_simulator, library_dir)
+    zip_path = get_output_zip_path(v8_version, output_path)
+
+    return [("download", zip_path, downloader.getKnownSize(get_binary_url(v8_version, build_for_ios, build_for_ios_simulator)))]
+
+
+def run(v8_version=None, clean=False, build_for_ios=False, build_for_ios_simulator=False, library_dir=library_dir, jobs=None):
+    if v8_version is None or len(v8_version) <= 0:
+        v8_version = default_v8_version
+
+    print(f"Start building v8 version {v8_version}...")
+
+    if does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+        if clean:
+            cleanup(library_dir)
+
+        download(v8_version, build_for_ios, build_for_ios_simulator, library_dir)
+
+        if does_need_building(v8_version, build_for_ios, build_for_ios_simulator, library_dir):
+            print("Building...")
+
+            setup_build(v8_version, build_for_ios, build_for_ios_simulator, library_dir)
+
+            do_build(v8_version, library_dir, jobs)
+
+            save_results(v8_version, build_for_ios, build_for_ios_simulator, library_dir)
     else:
-        print("Failed to downlaod binaries. Building...")
+        print("v8 already built.")
+
+    print("v8 built.")
+
+
+def configure_arguments():
+    parser = argparse.ArgumentParser(description="Build v8")
+    parser.add_argument("-v", "--version", action="store", required=False, help="version to install")
+    parser.add_argument("-c", "--clean", action="store_true", default=False, help="Clean previous build files & folders")
+    parser.add_argument("-ios", "--ios", action="store_true", default=False, help="Build for iOS. Note: Only valid for use when building on MacOS")
+    parser.add_argument("-iossim", "--ios-simulator", action="store_true", default=False, help="Build for iOS. Note: Only valid for use when building on MacOS")
 
-        download_source()
+    args = parser.parse_args()
 
-        setup_build(args.ios, args.ios_simulator)
+    return args
 
-        do_build()
 
-        save_results(args.ios, args.ios_simulator)
-else:
-    print("v8 already built.")
+if __name__ == "__main__":
+    args = configure_arguments()
 
-print("v8 built.")
+    run(args.version, args.clean, args.ios, args.ios_simulator)
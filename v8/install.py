@@ -6,6 +6,8 @@ import zipfile
 
 v8Version = "9.0"
 
+libraryDir = os.path.dirname(os.path.abspath(__file__))
+
 def configureArguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-p", "--path", action="store", required=True, help="path to install in")
@@ -62,7 +64,7 @@ def isv8AlreadyInstalled(path, buildForiOS, buildForiOSSimulator):
     return filesExist
 
 
-def getBinaryOutPath(buildForiOS, buildForiOSSimulator):
+def getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir):
     platformName = platform.system()
 
     if buildForiOS:
@@ -70,20 +72,20 @@ def getBinaryOutPath(buildForiOS, buildForiOSSimulator):
     elif buildForiOSSimulator:
         platformName = "iOS_Simulator"
 
-    binaryOut = os.path.join(os.getcwd(), "lib", platformName)
+    binaryOut = os.path.join(libraryDir, "lib", platformName)
 
     return binaryOut
 
 
-def getOutputZipPath(binaryOutPath):
-    zipPath = os.path.join(binaryOutPath, f"v8_{v8Version}.zip")
+def getOutputZipPath(version, binaryOutPath):
+    zipPath = os.path.join(binaryOutPath, f"v8_{version}.zip")
 
     return zipPath
 
 
-def install(path, buildForiOS, buildForiOSSimulator):
-    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator)
-    zipPath = getOutputZipPath(binaryPath)
+def install(version, path, buildForiOS, buildForiOSSimulator, libraryDir):
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
 
     installDir = getFullInstallDir(path, buildForiOS, buildForiOSSimulator)
 
@@ -92,19 +94,53 @@ def install(path, buildForiOS, buildForiOSSimulator):
     with zipfile.ZipFile(zipPath, "r") as zip:
         zip.extractall(installDir)
 
-    shutil.copytree(os.path.join(os.getcwd(), "include"), os.path.join(path, "v8", "include"), dirs_exist_ok=True)
+    shutil.copytree(os.path.join(libraryDir, "include"), os.path.join(path, "v8", "include"), dirs_exist_ok=True)
+
+
+def isInstalled(path, version=None, buildForiOS=False, buildForiOSSimulator=False):
+    return isv8AlreadyInstalled(path, buildForiOS, buildForiOSSimulator)
+
+
+def getArtifactPaths(version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = v8Version
+
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    return [zipPath]
+
 
+def plan(path, version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = v8Version
 
-print("Installing v8...")
+    if isv8AlreadyInstalled(path, buildForiOS, buildForiOSSimulator):
+        return []
+
+    binaryPath = getBinaryOutPath(buildForiOS, buildForiOSSimulator, libraryDir)
+    zipPath = getOutputZipPath(version, binaryPath)
+
+    size = os.path.getsize(zipPath) if os.path.exists(zipPath) else None
+
+    return [("extract", zipPath, size)]
+
+
+def run(path, version=None, buildForiOS=False, buildForiOSSimulator=False, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = v8Version
+
+    print("Installing v8...")
+
+    if isv8AlreadyInstalled(path, buildForiOS, buildForiOSSimulator):
+        print("v8 already installed.")
+    else:
+        install(version, path, buildForiOS, buildForiOSSimulator, libraryDir)
 
-args = configureArguments()
+    print("Installed v8.")
 
-if args.version is not None and len(args.version) > 0:
-    v8Version = args.version
 
-if isv8AlreadyInstalled(args.path, args.ios, args.ios_simulator):
-    print("v8 already installed.")
-else:
-    install(args.path, args.ios, args.ios_simulator)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed v8.")
\ No newline at end of file
+    run(args.path, args.version, args.ios, args.ios_simulator)
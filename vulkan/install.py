@@ -1,14 +1,22 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
 import zipfile
 
-version = "1.2.198.1"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import digests
+import downloader
+
+defaultVersion = "1.2.198.1"
 installerExtension = "exe"
 
-curlPath = shutil.which("curl")
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -56,7 +64,7 @@ def isAlreadyInstalled(path):
     return filesExist
 
 
-def performInstall(tempDirPath, installPath):
+def performInstall(version, tempDirPath, installPath):
     if platform.system() == "Windows":
         return
     elif platform.system() == "Darwin":
@@ -82,15 +90,11 @@ def performInstall(tempDirPath, installPath):
         return
 
 
-def install(path):
-    cwd = os.getcwd()
+def getTempDirPath(version, libraryDir):
+    return os.path.join(libraryDir, "__temp", version)
 
-    # download the installer
-    tempDirPath = os.path.join(cwd, "__temp")
-    createDirectories(tempDirPath)
-
-    os.chdir(tempDirPath)
 
+def getInstallerURL(version):
     installerExtension = "exe"
     platformName = "windows"
 
@@ -101,26 +105,109 @@ def install(path):
         installerExtension = "tar.gz"
         platformName = "linux"
 
-    cmd = [curlPath, "-LO", f"https://sdk.lunarg.com/sdk/download/{version}/{platformName}/vulkan_sdk.{installerExtension}"]
-    runCmd(cmd)
+    return f"https://sdk.lunarg.com/sdk/download/{version}/{platformName}/vulkan_sdk.{installerExtension}"
+
+
+def getInstallerPath(version, libraryDir):
+    installerName = getInstallerURL(version).split("/")[-1]
+
+    return os.path.join(getTempDirPath(version, libraryDir), installerName)
+
+
+def downloadInstaller(version, libraryDir):
+    installerPath = getInstallerPath(version, libraryDir)
+
+    if os.path.exists(installerPath):
+        print("Vulkan SDK installer already downloaded.")
+        return True
 
+    try:
+        digests.download("vulkan", version, platform.system(), getInstallerURL(version), installerPath)
+    except downloader.DownloadError as error:
+        print(error)
+        return False
+
+    return True
+
+
+def install(version, path, libraryDir):
+    # download the installer
+    if not downloadInstaller(version, libraryDir):
+        print("Failed to download the Vulkan SDK installer.")
+        return
+
+    tempDirPath = getTempDirPath(version, libraryDir)
     installDir = getFullInstallDir(path)
 
-    performInstall(tempDirPath, installDir)
+    performInstall(version, tempDirPath, installDir)
+
+
+def download(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return
+
+    downloadInstaller(version, libraryDir)
+
+
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the files whose sha256 is checked, as (library, version, platform, url,
+    # path)
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    return [("vulkan", version, platform.system(), getInstallerURL(version), getInstallerPath(version, libraryDir))]
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    return [getInstallerPath(version, libraryDir)]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    steps = []
+
+    installerPath = getInstallerPath(version, libraryDir)
+
+    if not os.path.exists(installerPath):
+        steps.append(("download", getInstallerURL(version), downloader.getKnownSize(getInstallerURL(version))))
+
+    size = os.path.getsize(installerPath) if os.path.exists(installerPath) else None
+
+    steps.append(("extract", installerPath, size))
+
+    return steps
+
 
-    os.chdir(cwd)
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
+    print("Installing Vulkan SDK...")
 
-print("Installing Vulkan SDK...")
+    if isAlreadyInstalled(path):
+        print("Vulkan SDK already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed Vulkan SDK.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("Vulkan SDK already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed Vulkan SDK.")
+    run(args.path, args.version)
@@ -1,14 +1,20 @@
 import os
+import sys
 import shutil
 import platform
 import argparse
 import subprocess
-import zipfile
 
-version = "2.3.0"
-gitURL = "https://github.com/GPUOpen-LibrariesAndSDKs/VulkanMemoryAllocator.git"
+# shared modules live in the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-gitPath = shutil.which("git")
+import digests
+import downloader
+
+defaultVersion = "2.3.0"
+headerURL = "https://raw.githubusercontent.com/GPUOpen-LibrariesAndSDKs/VulkanMemoryAllocator/v{version}/src/vk_mem_alloc.h"
+
+libraryDir = os.path.dirname(os.path.abspath(__file__))
 
 def configureArguments():
     parser = argparse.ArgumentParser()
@@ -56,47 +62,123 @@ def isAlreadyInstalled(path):
     return filesExist
 
 
-def install(path):
-    cwd = os.getcwd()
+def getTempDirPath(libraryDir):
+    return os.path.join(libraryDir, "__temp", "vulkan_memory_allocator")
+
+
+def getHeaderURL(version):
+    # the src path is different to master
+    return headerURL.format(version=version)
+
+
+def getHeaderPath(version, libraryDir):
+    return os.path.join(getTempDirPath(libraryDir), version, "vk_mem_alloc.h")
+
 
-    # get the source code
-    tempDirPath = os.path.join(cwd, "__temp", "vulkan_memory_allocator")
-    createDirectories(tempDirPath)
+def isSourceDownloaded(version, libraryDir):
+    return os.path.exists(getHeaderPath(version, libraryDir))
 
-    os.chdir(tempDirPath)
 
-    cmd = [gitPath, "clone", f"{gitURL}"]
-    runCmd(cmd)
+def downloadSource(version, libraryDir):
+    headerPath = getHeaderPath(version, libraryDir)
 
-    vmaPath = os.path.join(os.getcwd(), "VulkanMemoryAllocator")
-    os.chdir(vmaPath)
+    if isSourceDownloaded(version, libraryDir):
+        print("Source already downloaded.")
+        return headerPath
 
-    # checkout the version we want
-    cmd = [gitPath, "checkout", f"tags/v{version}", "-b", f"v{version}"]
-    runCmd(cmd)
+    # the header is all that is used, so only it is downloaded, not the
+    # whole repository. It is checked against its recorded sha256, like the
+    # pre-built binaries
+    url = getHeaderURL(version)
+
+    print(f"Downloading `{url}`...")
+
+    try:
+        digests.download("vulkan_memory_allocator", version, "any", url, headerPath)
+    except downloader.DownloadError as error:
+        print(error)
+        print(f"Failed to download: {url}")
+        return None
+
+    return headerPath
+
+
+def install(version, path, libraryDir):
+    headerSrcPath = downloadSource(version, libraryDir)
+
+    if headerSrcPath is None:
+        return
 
     installDir = getFullInstallDir(path)
     createDirectories(installDir)
 
-    # the src path is different to master
-    header_src_path = os.path.join(vmaPath, "src", "vk_mem_alloc.h")
-    header_dest_path = os.path.join(installDir, "vk_mem_alloc.h")
+    headerDestPath = os.path.join(installDir, "vk_mem_alloc.h")
+
+    shutil.copyfile(headerSrcPath, headerDestPath)
+
+
+def download(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return
+
+    downloadSource(version, libraryDir)
+
+
+def isInstalled(path, version=None):
+    return isAlreadyInstalled(path)
+
+
+def getDownloads(version=None, libraryDir=libraryDir):
+    # the files whose sha256 is checked, as (library, version, platform, url,
+    # path)
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    return [("vulkan_memory_allocator", version, "any", getHeaderURL(version), getHeaderPath(version, libraryDir))]
+
+
+def getArtifactPaths(version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    return [getHeaderPath(version, libraryDir)]
+
+
+def plan(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
+
+    if isAlreadyInstalled(path):
+        return []
+
+    steps = []
+
+    if not isSourceDownloaded(version, libraryDir):
+        steps.append(("download", getHeaderPath(version, libraryDir), downloader.getKnownSize(getHeaderURL(version))))
+
+    steps.append(("extract", getFullInstallDir(path), None))
+
+    return steps
 
-    shutil.copyfile(header_src_path, header_dest_path)
 
-    os.chdir(cwd)
+def run(path, version=None, libraryDir=libraryDir):
+    if version is None or len(version) <= 0:
+        version = defaultVersion
 
+    print("Installing vulkan memory allocator...")
 
-print("Installing vulkan memory allocator...")
+    if isAlreadyInstalled(path):
+        print("vulkan memory allocator already installed.")
+    else:
+        install(version, path, libraryDir)
 
-args = configureArguments()
+    print("Installed vulkan memory allocator.")
 
-if args.version is not None and len(args.version) > 0:
-    version = args.version
 
-if isAlreadyInstalled(args.path):
-    print("vulkan memory allocator already installed.")
-else:
-    install(args.path)
+if __name__ == "__main__":
+    args = configureArguments()
 
-print("Installed vulkan memory allocator.")
+    run(args.path, args.version)